@@ -10,6 +10,8 @@ import json
 import threading
 import requests
 
+from order_execution import flatten
+
 COIN = "KRW-XRP"
 BUY_AMOUNT_KRW = 10000  # 1만원
 HOLD_SECONDS = 4 * 60   # 4분
@@ -43,23 +45,21 @@ def load_api_keys():
 
 
 def run_auto_sell(upbit):
-    """4분 대기 후 전량 시장가 매도"""
+    """4분 대기 후 전량 시장가 매도 (미체결 주문 취소 → 매도 → 체결 확인)"""
     try:
         time.sleep(HOLD_SECONDS)
-        balance = upbit.get_balance(COIN)
-        if balance and float(balance) > 0:
-            sell_result = upbit.sell_market_order(COIN, float(balance))
-            if sell_result and (not isinstance(sell_result, dict) or not sell_result.get("error")):
-                if "auto_sell_done" not in st.session_state:
-                    st.session_state.auto_sell_done = True
-                    st.session_state.auto_sell_message = "매도 완료"
-            else:
-                err = sell_result.get("error", {}) if isinstance(sell_result, dict) else {}
+        report = flatten(upbit, COIN)
+        if report["success"]:
+            if "auto_sell_done" not in st.session_state:
                 st.session_state.auto_sell_done = True
-                st.session_state.auto_sell_message = f"매도 실패: {err.get('message', sell_result)}"
-        else:
+                price_text = f" (체결가 {report['avg_price']:,.2f}원)" if report["avg_price"] else ""
+                st.session_state.auto_sell_message = f"매도 완료{price_text}"
+        elif report["reason"] == "매도할 수량 없음":
             st.session_state.auto_sell_done = True
             st.session_state.auto_sell_message = "매도할 수량 없음"
+        else:
+            st.session_state.auto_sell_done = True
+            st.session_state.auto_sell_message = f"매도 실패: {report['reason']}"
     except Exception as e:
         st.session_state.auto_sell_done = True
         st.session_state.auto_sell_message = f"매도 오류: {e}"
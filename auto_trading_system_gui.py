@@ -18,6 +18,7 @@ import tempfile
 import webbrowser
 from datetime import datetime, timedelta, timezone
 import pytz
+import numpy as np
 from rich.console import Console
 
 # 한국 시간대 설정
@@ -28,6 +29,22 @@ def get_kst_now():
     return datetime.now(KST)
 from rich.table import Table
 from rich.panel import Panel
+from fill_tracker import compute_vwap, create_fill_tracker
+from market_recorder import get_market_recorder, record_market_data, stop_market_recorder
+from order_manager import OrderManager
+from profit_ledger import ProfitLedger
+from run_journal import RunJournal, carry_journal, format_summary
+from scan_store import format_scan_row, get_scan_store
+from settings_store import SettingsStore
+from position_journal import PositionJournal, reconcile_positions
+from poll_scheduler import PollScheduler
+from position_ledger import PositionLedger
+from risk_engine import RiskEngine
+from depth_allocation import allocate_by_depth
+from exit_engine import EXIT_REASONS, ExitEngine, has_exit_rules, parse_exit_rules
+from order_execution import flatten, flatten_many, sliced_buy
+from tick_size import quantize
+from upbit_client import get_orders_by_uuids, get_shared_client
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 
@@ -37,48 +54,8 @@ from tkinter import ttk, scrolledtext, messagebox
 # ============================================================================
 
 CONFIG_FILE = "trading_config.json"
-
-def load_settings():
-    """설정 파일에서 설정값을 로드합니다."""
-    default_settings = {
-        "interval": "1",
-        "hour": "09",
-        "minute": "00",
-        "end_hour": "23",
-        "end_minute": "00",
-        "price_change_min": "0.2",
-        "price_change_max": "5.0",
-        "volume_change_min": "100",
-        "slippage": "0.3",
-        "max_spread": "0.2",
-        "day_candle_filter": False,
-        "auto_trade": False,
-        "sell_percentage": "3",
-        "sell_ratio": "절반",
-        "investment_ratio": "100",
-        "max_coins": "10",
-        "stop_loss": "5",
-        "exclude_coins": ""
-    }
-    
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                saved_settings = json.load(f)
-                # 기본값과 병합 (누락된 키가 있으면 기본값 사용)
-                default_settings.update(saved_settings)
-        except Exception as e:
-            print(f"설정 파일 로드 오류: {e}")
-    
-    return default_settings
-
-def save_settings(settings):
-    """설정값을 파일에 저장합니다."""
-    try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"설정 파일 저장 오류: {e}")
+# 설정 입력 변경 후 파일 저장까지 모으는 시간 (초)
+SETTINGS_SAVE_DELAY_SEC = 0.5
 
 
 # ============================================================================
@@ -142,6 +119,17 @@ class ToolTip:
 # API 키 관리
 # ============================================================================
 
+def get_api_json_path():
+    """DATA_DIR 또는 현재 디렉토리의 api.json 경로"""
+    data_dir = os.getenv("DATA_DIR", ".")
+    api_json_path = os.path.join(data_dir, "api.json")
+    
+    # DATA_DIR에 없으면 현재 디렉토리에서 찾기
+    if not os.path.exists(api_json_path):
+        api_json_path = "api.json"
+    return api_json_path
+
+
 def load_api_keys_from_json():
     """환경 변수 또는 api.json 파일에서 API 키를 읽어옵니다."""
     # 1. 환경 변수에서 먼저 확인 (Railway Secrets 우선)
@@ -153,15 +141,7 @@ def load_api_keys_from_json():
     
     # 2. api.json 파일에서 읽기
     try:
-        # DATA_DIR 또는 현재 디렉토리에서 api.json 찾기
-        data_dir = os.getenv("DATA_DIR", ".")
-        api_json_path = os.path.join(data_dir, "api.json")
-        
-        # DATA_DIR에 없으면 현재 디렉토리에서 찾기
-        if not os.path.exists(api_json_path):
-            api_json_path = "api.json"
-        
-        with open(api_json_path, "r", encoding="utf-8") as f:
+        with open(get_api_json_path(), "r", encoding="utf-8") as f:
             content = f.read()
             
         # JSON 형식이 아닌 경우를 대비하여 정규식으로 추출
@@ -182,6 +162,15 @@ def load_api_keys_from_json():
         return None, None
 
 
+def get_upbit_client():
+    """프로세스 공용 업비트 클라이언트를 반환합니다.
+
+    API 키는 처음 한 번만 읽고 api.json(또는 환경 변수)이 바뀐 경우에만 다시 읽습니다.
+    HTTP 연결과 서명 상태가 재사용됩니다. 키를 읽을 수 없으면 None을 반환합니다.
+    """
+    return get_shared_client(load_api_keys_from_json, get_api_json_path())
+
+
 # ============================================================================
 # 로그 출력 클래스 (GUI용)
 # ============================================================================
@@ -309,6 +298,7 @@ def get_all_upbit_coins(logger=None, exclude_coins=None):
         logger.log("원화마켓 코인 목록 수집 중...", "INFO")
     
     all_coins = pyupbit.get_tickers(fiat="KRW")
+    record_market_data('tickers', 'KRW', all_coins)
     filtered_coins = all_coins.copy()
     
     # 제외 코인 처리
@@ -343,11 +333,12 @@ def print_all_coin_list(coins, logger=None):
 
 
 def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000000, 
-                                       max_volume=None, interval_minutes=1, target_hour=9, target_minute=0, logger=None, stop_event=None):
+                                       max_volume=None, interval_minutes=1, target_hour=9, target_minute=0, logger=None, stop_event=None, journal=None):
     """거래대금 조건을 만족하는 코인 리스트를 출력하고, 1분봉 데이터도 함께 수집합니다.
     
     항상 1분봉만 사용하며, 정시 기준으로 비교합니다.
     예) 오후 7시면 6시59분봉과 7시00분봉 비교
+    journal(RunJournal)이 있으면 현재가/거래대금 배치 조회('ticker_sweep')와 1분봉 조회('candle_fetch')를 단계로 기록합니다.
     """
     if logger:
         logger.log("=" * 60, "INFO")
@@ -378,6 +369,8 @@ def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000
         logger.log(f"가격, 거래대금 및 1분봉 정보 확인 중...", "INFO")
     
     # 배치로 현재가 조회 (100개씩)
+    if journal:
+        journal.begin_stage('ticker_sweep')
     if logger:
         logger.log(f"현재가 배치 조회 중... (총 {len(coins)}개 코인)", "INFO")
     
@@ -392,6 +385,7 @@ def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000
         batch_coins = coins[i:i+batch_size]
         try:
             batch_prices = pyupbit.get_current_price(batch_coins)
+            record_market_data('current_price', i // batch_size, batch_prices)
             if isinstance(batch_prices, dict):
                 all_prices.update(batch_prices)
             time.sleep(0.1)  # API 제한 고려
@@ -418,6 +412,7 @@ def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000
             response = requests.get(url, params=params)
             if response.status_code == 200:
                 ticker_list = response.json()
+                record_market_data('ticker', i // batch_size, ticker_list)
                 for ticker in ticker_list:
                     market = ticker.get('market', '')
                     if market:
@@ -427,6 +422,9 @@ def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000
             continue
     
     # 필터링 및 분봉 데이터 수집
+    if journal:
+        journal.candidates('ticker_sweep', len(all_tickers))
+        journal.begin_stage('candle_fetch')
     for idx, coin in enumerate(coins, 1):
         if stop_event and stop_event.is_set():
             if logger:
@@ -460,6 +458,7 @@ def print_coins_under_price_and_volume(coins, max_price=None, min_volume=1000000
                 try:
                     # 항상 1분봉만 사용 (충분히 넉넉하게 가져오기)
                     df_candle = pyupbit.get_ohlcv(coin, interval="minute1", count=200)
+                    record_market_data('minute1', coin, df_candle)
                     if df_candle is not None and not df_candle.empty:
                         target_date_df = df_candle[df_candle.index.date == target_date]
                         if not target_date_df.empty:
@@ -722,9 +721,11 @@ def get_market_buy_percentage(coin, buy_amount=10000000, max_spread=0.2, return_
         url = "https://api.upbit.com/v1/orderbook"
         params = {"markets": coin}
         response = requests.get(url, params=params)
+        snapshot_time = time.time()
         
         if response.status_code == 200:
             orderbook_list = response.json()
+            record_market_data('orderbook', coin, orderbook_list)
             
             if orderbook_list and len(orderbook_list) > 0:
                 orderbook = orderbook_list[0]
@@ -822,7 +823,10 @@ def get_market_buy_percentage(coin, buy_amount=10000000, max_spread=0.2, return_
                     'total_quantity': total_quantity,
                     'total_cost': total_cost,
                     'filled_asks_count': len(filled_asks),
-                    'spread_pct': spread_pct  # 호가스프레드 추가
+                    'spread_pct': spread_pct,  # 호가스프레드 추가
+                    'highest_bid': highest_bid,
+                    'asks': asks,  # 호가 스냅샷 (가격 오름차순 [(가격, 수량)])
+                    'snapshot_time': snapshot_time  # 호가 조회 시각 (time.time())
                 }
                 if return_detail:
                     return {'ok': True, 'data': data}
@@ -866,7 +870,10 @@ def print_all_coins_market_buy_analysis(rising_coins, buy_amount=10000000, max_s
                 'avg_price': result['avg_price'],
                 'price_diff_pct': result['price_diff_pct'],
                 'filled_asks_count': result['filled_asks_count'],
-                'spread_pct': result.get('spread_pct', 0)  # 호가스프레드 추가
+                'spread_pct': result.get('spread_pct', 0),  # 호가스프레드 추가
+                'highest_bid': result.get('highest_bid'),
+                'asks': result.get('asks'),  # 매수 단계에서 재사용하는 호가 스냅샷
+                'snapshot_time': result.get('snapshot_time')
             })
             details.append({
                 'stage': 5,
@@ -1101,70 +1108,31 @@ def get_profit_result_html(profit_results):
     """
 
 def get_slippage_result_html(filtered_results, max_slippage, csv_filename=None):
-    """슬리피지 필터링 결과를 HTML로 변환"""
+    """슬리피지 필터링 결과를 HTML로 변환 (표시 형식은 scan_store.format_scan_row와 동일)"""
     # 테이블 행 생성
     rows_html = ""
-    result_count = 0
-    
-    if csv_filename and os.path.exists(csv_filename):
-        # CSV 파일에서 읽기
-        try:
-            with open(csv_filename, 'r', encoding='utf-8-sig') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    result_count += 1
-                    # 일봉 필터링: O(통과) / X(미통과) only
-                    day_filter_value = (row.get('일봉필터링', '') or row.get('매수추천', '') or '').strip().upper()
-                    passed = day_filter_value == 'O'
-                    day_filter_html = '<span style="color: #10B981; font-weight: bold; font-size: 16px;">O</span>' if passed else '<span style="color: #EF4444; font-weight: bold; font-size: 16px;">X</span>'
-                    rows_html += f"""
-                    <tr>
-                        <td>{row.get('순위', '')}</td>
-                        <td>{row.get('코인', '')}</td>
-                        <td style="text-align: center;">{day_filter_html}</td>
-                        <td>{row.get('가격변동률', '')}</td>
-                        <td>{row.get('거래량변동률', '')}</td>
-                        <td style="text-align: right;">{row.get('최저매도가', '')}</td>
-                        <td style="text-align: right;">{row.get('평균매수가', '')}</td>
-                        <td>{row.get('슬리피지', '')}</td>
-                        <td>{row.get('호가스프레드', '')}</td>
-                        <td style="text-align: center;">{row.get('소진호가수', '')}</td>
-                    </tr>
-                    """
-        except Exception as e:
-            print(f"CSV 파일 읽기 오류: {e}")
-            rows_html = '<tr><td colspan="8" style="text-align: center; color: red;">CSV 파일 읽기 오류</td></tr>'
-    else:
-        # 직접 데이터에서 생성
-        result_count = len(filtered_results) if filtered_results else 0
-        for idx, result in enumerate(filtered_results, 1):
-            coin = result.get('coin', '').replace("KRW-", "")
-            price_change = f"+{result.get('price_change', 0):.2f}%"
-            volume_change = f"+{result.get('volume_change', 0):.2f}%"
-            lowest_ask = f"{result.get('lowest_ask', 0):,.0f}원"
-            avg_price = f"{result.get('avg_price', 0):,.0f}원"
-            price_diff_pct = f"{result.get('price_diff_pct', 0):.4f}%"
-            spread_pct = f"{result.get('spread_pct', 0):.4f}%"
-            filled_count = f"{result.get('filled_asks_count', 0)}개"
-            
-            # 일봉 필터링: day_candle_pass(양봉비율 통과) O / 미통과 X
-            passed = result.get('day_candle_pass', False)
-            day_filter_html = '<span style="color: #10B981; font-weight: bold; font-size: 16px;">O</span>' if passed else '<span style="color: #EF4444; font-weight: bold; font-size: 16px;">X</span>'
-            
-            rows_html += f"""
-            <tr>
-                <td>{idx}</td>
-                <td>{coin}</td>
-                <td style="text-align: center;">{day_filter_html}</td>
-                <td>{price_change}</td>
-                <td>{volume_change}</td>
-                <td style="text-align: right;">{lowest_ask}</td>
-                <td style="text-align: right;">{avg_price}</td>
-                <td>{price_diff_pct}</td>
-                <td>{spread_pct}</td>
-                <td style="text-align: center;">{filled_count}</td>
-            </tr>
-            """
+    result_count = len(filtered_results) if filtered_results else 0
+    for idx, result in enumerate(filtered_results or [], 1):
+        row = format_scan_row(idx, result)
+        
+        # 일봉 필터링: day_candle_pass(양봉비율 통과) O / 미통과 X
+        passed = row['일봉필터링'] == 'O'
+        day_filter_html = '<span style="color: #10B981; font-weight: bold; font-size: 16px;">O</span>' if passed else '<span style="color: #EF4444; font-weight: bold; font-size: 16px;">X</span>'
+        
+        rows_html += f"""
+        <tr>
+            <td>{row['순위']}</td>
+            <td>{row['코인']}</td>
+            <td style="text-align: center;">{day_filter_html}</td>
+            <td>{row['가격변동률']}</td>
+            <td>{row['거래량변동률']}</td>
+            <td style="text-align: right;">{row['최저매도가']}</td>
+            <td style="text-align: right;">{row['평균매수가']}</td>
+            <td>{row['슬리피지']}</td>
+            <td>{row['호가스프레드']}</td>
+            <td style="text-align: center;">{row['소진호가수']}</td>
+        </tr>
+        """
     
     if not rows_html:
         rows_html = '<tr><td colspan="10" style="text-align: center; padding: 40px; color: #999;">데이터가 없습니다.</td></tr>'
@@ -1369,39 +1337,15 @@ def show_profit_popup(profit_results):
         traceback.print_exc()
 
 def write_slippage_csv_and_popup(filtered_results, max_slippage, logger=None, root=None):
-    """슬리피지 필터 결과를 CSV로 저장하고 팝업을 큐에 넣습니다. day_candle_pass 있으면 O/X 반영."""
+    """슬리피지 필터 결과를 저장소에 저장하고 CSV를 만든 뒤 팝업을 큐에 넣습니다. day_candle_pass 있으면 O/X 반영."""
     csv_filename = None
     if not filtered_results:
         return csv_filename
     try:
-        # 데이터 저장 디렉토리 (Railway Volume 지원)
-        data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir, exist_ok=True)
-        
-        timestamp = get_kst_now().strftime("%Y%m%d_%H%M%S")
-        csv_filename = os.path.join(data_dir, f"slippage_results_{timestamp}.csv")
-        with open(csv_filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            fieldnames = ['순위', '코인', '일봉필터링', '가격변동률', '거래량변동률', '최저매도가', '평균매수가', '슬리피지', '호가스프레드', '소진호가수']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for idx, result in enumerate(filtered_results, 1):
-                coin = result.get('coin', '').replace("KRW-", "")
-                price_change = f"+{result.get('price_change', 0):.2f}%"
-                volume_change = f"+{result.get('volume_change', 0):.2f}%"
-                lowest_ask = f"{result.get('lowest_ask', 0):,.0f}원"
-                avg_price = f"{result.get('avg_price', 0):,.0f}원"
-                price_diff_pct = f"{result.get('price_diff_pct', 0):.4f}%"
-                spread_pct = f"{result.get('spread_pct', 0):.4f}%"
-                filled_count = f"{result.get('filled_asks_count', 0)}개"
-                passed = result.get('day_candle_pass', False)
-                day_filter = "O" if passed else "X"
-                writer.writerow({
-                    '순위': idx, '코인': coin, '일봉필터링': day_filter,
-                    '가격변동률': price_change, '거래량변동률': volume_change,
-                    '최저매도가': lowest_ask, '평균매수가': avg_price,
-                    '슬리피지': price_diff_pct, '호가스프레드': spread_pct, '소진호가수': filled_count
-                })
+        # 숫자 그대로 저장 (DATA_DIR/scan_results.db), CSV는 저장된 데이터에서 생성
+        store = get_scan_store()
+        run_id = store.save_run(filtered_results, max_slippage)
+        csv_filename = store.export_csv(run_id)
         if logger:
             logger.log(f"CSV 파일 저장 완료: {csv_filename}", "SUCCESS")
     except Exception as e:
@@ -1520,6 +1464,7 @@ def filter_by_day_candle(filtered_results, min_bullish_ratio=0.4, logger=None, s
         try:
             # 최근 일봉 10개 가져오기
             df_day = pyupbit.get_ohlcv(coin, interval="day", count=10)
+            record_market_data('day', coin, df_day)
             
             if df_day is None or df_day.empty:
                 if logger:
@@ -1629,7 +1574,392 @@ def get_krw_balance(upbit):
         return 0
 
 
-def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, investment_ratio=100, max_coins=None, logger=None, purchased_coins_dict=None):
+# 업비트 API 요청 제한 (주문 API: 초당 8회, 그 외 EXCHANGE API: 초당 30회)
+ORDER_API_RATE_PER_SEC = 8
+EXCHANGE_API_RATE_PER_SEC = 30
+
+
+class RateLimiter:
+    """초당 요청 수를 제한하는 토큰 버킷 (여러 스레드에서 공유 가능)"""
+    def __init__(self, rate_per_sec, burst=None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst if burst is not None else rate_per_sec)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰을 하나 얻을 때까지 대기"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 5단계 호가 스냅샷을 매수 단계에서 재사용할 수 있는 최대 경과 시간 (초)
+SNAPSHOT_MAX_AGE_SEC = 3.0
+# 손절 모니터링 폴링 (poll_scheduler.py): 트리거에 가까운 코인일수록 짧은 간격으로 조회
+# 최대 간격은 기존 고정 주기(5초)를 넘지 않음 (WebSocket 감시가 끊겼거나 변동성 추정보다 급한 갭에 대비,
+# 트레일링 스탑/단계별 익절은 폴링으로만 확인)
+MONITOR_MIN_INTERVAL_SEC = 1
+MONITOR_MAX_INTERVAL_SEC = 5
+# 모니터링에 쓸 초당 최대 요청 수 (현재가 다건 조회 + 지정가 주문 다건 조회)
+MONITOR_REQUEST_BUDGET = 2.0
+# 폴링 주기/예산 사용량 로그 간격 (초)
+MONITOR_STATS_LOG_SEC = 60
+
+
+def get_snapshot_price(coin_info, max_age):
+    """5단계 호가 스냅샷의 최우선 매도호가를 반환합니다.
+
+    스냅샷이 없거나 max_age초보다 오래되었으면 None (현재가를 다시 조회해야 함)
+    """
+    if max_age is None or not coin_info.get('snapshot_time') or not coin_info.get('lowest_ask'):
+        return None
+    if time.time() - coin_info['snapshot_time'] > max_age:
+        return None
+    return coin_info['lowest_ask']
+
+
+def fetch_ask_ladders(coins, upbit=None):
+    """여러 마켓의 매도호가를 호가 요청 1회로 조회합니다.
+
+    upbit가 get_orderbook을 제공하면(모의 브로커) 그것을 사용합니다.
+
+    Returns:
+        {coin: [(가격, 수량), ...]} (가격 오름차순, 조회 실패한 코인은 제외)
+    """
+    if not coins:
+        return {}
+    if hasattr(upbit, 'get_orderbook'):
+        return {coin: upbit.get_orderbook(coin)['asks'] for coin in coins}
+    response = requests.get("https://api.upbit.com/v1/orderbook", params={"markets": ",".join(coins)})
+    response.raise_for_status()
+    ladders = {}
+    for orderbook in response.json():
+        record_market_data('orderbook', orderbook.get('market'), [orderbook])
+        asks = sorted(
+            (unit['ask_price'], unit['ask_size'])
+            for unit in orderbook.get('orderbook_units', [])
+            if unit.get('ask_price', 0) > 0 and unit.get('ask_size', 0) > 0
+        )
+        if asks:
+            ladders[orderbook['market']] = asks
+    return ladders
+
+
+def refresh_stale_snapshots(coin_list, max_age, upbit=None, logger=None):
+    """max_age초보다 오래된(또는 없는) 5단계 호가 스냅샷을 새로 조회한 호가로 바꿉니다.
+
+    호가 깊이 기반 배분 전에 호출합니다. 새 호가를 받지 못한 코인은 기존 스냅샷을 그대로 둡니다.
+
+    Returns:
+        새 코인 리스트 (갱신한 코인은 asks/lowest_ask/snapshot_time이 바뀐 복사본)
+    """
+    if max_age is None:
+        return coin_list
+    stale = [coin_info['coin'] for coin_info in coin_list if get_snapshot_price(coin_info, max_age) is None]
+    if not stale:
+        return coin_list
+    try:
+        ladders = fetch_ask_ladders(stale, upbit)
+    except Exception as e:
+        ladders = {}
+        if logger:
+            logger.log(f"호가 재조회 실패, 기존 스냅샷으로 배분합니다: {e}", "WARNING")
+    snapshot_time = time.time()
+    refreshed = []
+    for coin_info in coin_list:
+        asks = ladders.get(coin_info['coin'])
+        if asks:
+            coin_info = dict(coin_info, asks=asks, lowest_ask=asks[0][0], snapshot_time=snapshot_time)
+        refreshed.append(coin_info)
+    if logger:
+        logger.log(f"오래된 호가 스냅샷 재조회: {len(ladders)}/{len(stale)}개 ({max_age}초 초과)", "INFO")
+    return refreshed
+
+
+def fetch_current_prices(coins):
+    """여러 마켓의 현재가를 티커 요청 1회로 조회합니다.
+
+    Returns:
+        {coin: 현재가} (조회 실패한 코인은 제외)
+    """
+    if not coins:
+        return {}
+    coins = list(coins)
+    if len(coins) == 1:
+        # pyupbit는 티커 1개면 dict 대신 가격만 반환
+        price = pyupbit.get_current_price(coins[0])
+        return {coins[0]: price} if price else {}
+    prices = pyupbit.get_current_price(coins)
+    if not isinstance(prices, dict):
+        return {}
+    return {coin: price for coin, price in prices.items() if price}
+
+
+def find_stop_loss_coins(positions, current_prices, stop_loss_pct):
+    """보유 코인 전체의 손절 조건을 한 번에 계산합니다.
+
+    Args:
+        positions: {coin: {'buy_price', ...}} (purchased_coins)
+        current_prices: {coin: 현재가}
+        stop_loss_pct: 손절 기준 하락률 (%)
+
+    Returns:
+        {coin: {'current_price', 'stop_price', 'price_drop_pct'}} (손절 조건에 해당하는 코인만)
+    """
+    coins = [coin for coin, info in positions.items() if current_prices.get(coin) and info.get('buy_price')]
+    if not coins or stop_loss_pct is None:
+        return {}
+    buy_prices = np.array([positions[coin]['buy_price'] for coin in coins], dtype=float)
+    prices = np.array([current_prices[coin] for coin in coins], dtype=float)
+    # 손절 가격 (호가 단위 내림): 현재가는 항상 호가 단위이므로 비교가 정확함
+    stop_prices = quantize(buy_prices * (1 - stop_loss_pct / 100), 'floor')
+    drop_pcts = (buy_prices - prices) / buy_prices * 100
+    return {
+        coins[i]: {'current_price': current_prices[coins[i]], 'stop_price': float(stop_prices[i]), 'price_drop_pct': float(drop_pcts[i])}
+        for i in np.flatnonzero(prices <= stop_prices)
+    }
+
+
+def _unwrap_order_result(order_result):
+    """pyupbit 주문 결과(dict 또는 tuple/list)에서 주문 dict와 오류 메시지를 꺼냅니다."""
+    if not order_result:
+        return None, None
+    if isinstance(order_result, (tuple, list)):
+        order = order_result[0] if len(order_result) > 0 else None
+    else:
+        order = order_result
+    if not order or not isinstance(order, dict):
+        return None, None
+    error = order.get('error')
+    if isinstance(error, dict) and (error.get('name') or error.get('message')):
+        return order, error.get('name') or error.get('message')
+    return order, None
+
+
+def _buy_coins_concurrently(upbit, sorted_coin_list, buy_amount_per_coin, sell_percentage, sell_ratio, logger=None, purchased_coins_dict=None, max_workers=None, order_manager=None, snapshot_max_age=None, buy_amounts=None, sliced_execution=False, max_slippage=None):
+    """
+    코인들을 병렬로 매수합니다.
+
+    1단계: 주문 API 요청 제한 내에서 모든 시장가 매수 주문을 먼저 제출
+    2단계: 체결 확인과 지정가 매도 주문을 코인별로 병렬 처리
+
+    각 결과에는 매수 주문 제출부터 응답까지의 지연시간(submit_latency_ms)이 포함됩니다.
+    snapshot_max_age 이내의 호가 스냅샷이 있는 코인은 현재가를 다시 조회하지 않습니다.
+    buy_amounts({coin: 금액})가 있으면 코인별 금액으로, 없으면 buy_amount_per_coin으로 매수합니다.
+    sliced_execution=True면 시장가 매수 대신 슬리피지 max_slippage% 가격으로 제한된
+    IOC 지정가 주문 여러 개로 나누어 매수합니다 (order_execution.sliced_buy).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    order_limiter = RateLimiter(ORDER_API_RATE_PER_SEC)
+    fill_tracker = create_fill_tracker(upbit, limiter=RateLimiter(EXCHANGE_API_RATE_PER_SEC))
+    if max_workers is None:
+        max_workers = max(1, min(len(sorted_coin_list), ORDER_API_RATE_PER_SEC))
+
+    def failed(coin, reason, buy_order=None, status='failed', latency_ms=None):
+        return {
+            'coin': coin,
+            'coin_symbol': coin.replace("KRW-", ""),
+            'status': status,
+            'reason': reason,
+            'buy_order': buy_order,
+            'sell_order': None,
+            'submit_latency_ms': latency_ms
+        }
+
+    def amount_for(coin):
+        return buy_amounts.get(coin, 0) if buy_amounts is not None else buy_amount_per_coin
+
+    coins = [coin_info['coin'] for coin_info in sorted_coin_list]
+    under_min = [coin for coin in coins if amount_for(coin) < 5000]
+    if under_min:
+        if logger:
+            for coin in under_min:
+                logger.log(f"  {coin.replace('KRW-', '')}: 최소 주문 금액(5,000원) 미달: {amount_for(coin):,.0f}원", "ERROR")
+        if len(under_min) == len(coins):
+            return [failed(coin, f'최소 주문 금액 미달 ({amount_for(coin):,.0f}원)') for coin in coins]
+
+    # 매수 전 가격 확인: 최근 호가 스냅샷이 있으면 재사용, 오래된 코인만 한 번에 현재가 조회
+    current_prices = {}
+    for coin_info in sorted_coin_list:
+        snapshot_price = get_snapshot_price(coin_info, snapshot_max_age)
+        if snapshot_price:
+            current_prices[coin_info['coin']] = snapshot_price
+    stale_coins = [coin for coin in coins if coin not in current_prices]
+    if stale_coins:
+        try:
+            current_prices.update(fetch_current_prices(stale_coins))
+        except Exception:
+            pass
+    if logger and snapshot_max_age is not None:
+        logger.log(f"호가 스냅샷 사용: {len(coins) - len(stale_coins)}개, 현재가 재조회: {len(stale_coins)}개", "INFO")
+
+    # 1단계: 시장가 매수 주문 제출
+    # 반환: (coin, buy_order, error, latency_ms, fill) - fill은 분할 매수처럼 체결까지 확인된 경우에만
+    def submit_buy(coin):
+        if coin in under_min:
+            return coin, None, f'최소 주문 금액 미달 ({amount_for(coin):,.0f}원)', None, None
+        if not current_prices.get(coin):
+            return coin, None, '현재가 조회 실패', None, None
+        if sliced_execution:
+            submit_time = time.perf_counter()
+            sliced = sliced_buy(upbit, coin, amount_for(coin), current_prices[coin], max_slippage, limiter=order_limiter, fill_tracker=fill_tracker, order_manager=order_manager)
+            latency_ms = (time.perf_counter() - submit_time) * 1000
+            if not sliced['uuids']:
+                return coin, None, f"분할 매수 주문 실패: {sliced['error']}", latency_ms, None
+            if logger:
+                logger.log(f"  {coin.replace('KRW-', '')}: IOC 분할 매수 {sliced['filled_slices']}/{sliced['slices']}건 체결 (한도가 {sliced['limit_price']:,}원, 미체결 {sliced['unfilled_krw']:,.0f}원)", "INFO")
+            return coin, sliced['order'], None, latency_ms, sliced
+        order_limiter.acquire()
+        submit_time = time.perf_counter()
+        try:
+            order_result = upbit.buy_market_order(coin, amount_for(coin))
+        except Exception as e:
+            latency_ms = (time.perf_counter() - submit_time) * 1000
+            return coin, None, f'매수 주문 오류: {str(e)}', latency_ms, None
+        latency_ms = (time.perf_counter() - submit_time) * 1000
+        buy_order, error = _unwrap_order_result(order_result)
+        if error:
+            return coin, None, f'API 오류: {error}', latency_ms, None
+        if not buy_order:
+            return coin, None, '매수 주문 실패 - 결과 없음', latency_ms, None
+        if not buy_order.get('uuid'):
+            return coin, None, 'UUID 없음', latency_ms, None
+        if order_manager is not None:
+            order_manager.record_submit(buy_order, tag='entry', market=coin, side='bid')
+        return coin, buy_order, None, latency_ms, None
+
+    def submit_buy_safely(coin):
+        # 코인 1개의 예외가 executor.map 전체 결과를 잃게 하지 않도록 코인별로 처리
+        try:
+            return submit_buy(coin)
+        except Exception as e:
+            return coin, None, f'처리 오류: {str(e)}', None, None
+
+    if logger:
+        logger.log(f"시장가 매수 주문 병렬 제출 중... ({len(coins)}개, 초당 최대 {ORDER_API_RATE_PER_SEC}건)", "INFO")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 실행 기록(RunJournal)에 작업 스레드의 주문 요청도 포함
+        submissions = list(executor.map(carry_journal(submit_buy_safely), coins))
+
+    for coin, buy_order, error, latency_ms, _ in submissions:
+        if logger:
+            coin_symbol = coin.replace("KRW-", "")
+            if buy_order:
+                logger.log(f"  ✅ {coin_symbol}: 매수 주문 성공 (UUID: {buy_order['uuid'][:8]}..., 응답 {latency_ms:.0f}ms)", "SUCCESS")
+            elif latency_ms is None:
+                logger.log(f"  ❌ {coin_symbol}: {error}", "ERROR")
+            else:
+                logger.log(f"  ❌ {coin_symbol}: 매수 주문 실패: {error} (응답 {latency_ms:.0f}ms)", "ERROR")
+
+    # 2단계: 체결 확인 및 지정가 매도 주문
+    def confirm_and_place_sell(submission):
+        coin, buy_order, error, latency_ms, fill = submission
+        coin_symbol = coin.replace("KRW-", "")
+        if not buy_order:
+            return failed(coin, error, latency_ms=latency_ms)
+
+        if fill is None:
+            fill = fill_tracker.wait(buy_order['uuid'])
+            if order_manager is not None:
+                order_manager.apply_fill(fill)
+        if not fill['order']:
+            return failed(coin, '매수 체결 조회 실패', buy_order=buy_order, status='partial_fail', latency_ms=latency_ms)
+
+        avg_price = fill['avg_price']
+        executed_volume = fill['executed_volume']
+        if executed_volume <= 0:
+            return failed(coin, '매수 후 체결 수량 없음', buy_order=buy_order, status='partial_fail', latency_ms=latency_ms)
+
+        buy_amount = fill['funds'] if sliced_execution else amount_for(coin)
+        buy_price = avg_price or (buy_amount / executed_volume)
+
+        # 지정가 매도 가격은 실제 체결가 기준
+        sell_volume = executed_volume * sell_ratio
+        sell_price = quantize(buy_price * (1 + sell_percentage / 100), 'floor')
+
+        sell_order = None
+        sell_order_uuid = None
+        order_limiter.acquire()
+        try:
+            sell_order, sell_error = _unwrap_order_result(upbit.sell_limit_order(coin, sell_price, sell_volume))
+            if sell_error or not sell_order or not sell_order.get('uuid'):
+                if logger:
+                    logger.log(f"  {coin_symbol}: 지정가 매도 주문 실패: {sell_error or '주문 결과를 받을 수 없습니다.'}", "ERROR")
+                sell_order = None
+            else:
+                sell_order_uuid = sell_order['uuid']
+                if order_manager is not None:
+                    order_manager.record_submit(sell_order, tag='take_profit', market=coin, side='ask', price=sell_price, volume=sell_volume)
+        except Exception as e:
+            if logger:
+                logger.log(f"  {coin_symbol}: 지정가 매도 주문 오류: {e}", "ERROR")
+            sell_order = None
+
+        if logger:
+            reference_price = current_prices.get(coin)
+            slip_text = f", 기준가 대비 {(buy_price / reference_price - 1) * 100:+.3f}%" if reference_price else ""
+            logger.log(f"  {coin_symbol}: 체결 매수가 {buy_price:.4f}원{slip_text}, 수량 {executed_volume:.8f}, 지정가 매도 {sell_price:,}원 (+{sell_percentage}%)", "INFO")
+
+        if purchased_coins_dict is not None:
+            purchased_coins_dict[coin] = {
+                'buy_price': buy_price,
+                'buy_time': get_kst_now(),
+                'buy_amount': buy_amount,
+                'buy_quantity': executed_volume,
+                'coin_balance': executed_volume,
+                'sell_order_uuid': sell_order_uuid,
+                'sell_price_limit': sell_price,
+                'sell_volume': sell_volume,
+                'limit_sell_quantity': 0
+            }
+
+        return {
+            'coin': coin,
+            'coin_symbol': coin_symbol,
+            'status': 'success',
+            'current_price': buy_price,
+            'buy_price': buy_price,
+            'buy_amount': buy_amount,
+            'buy_order': buy_order,
+            'sell_price': sell_price,
+            'sell_order': sell_order,
+            'submit_latency_ms': latency_ms
+        }
+
+    def confirm_and_place_sell_safely(submission):
+        # 매수 주문은 이미 거래소에 있으므로 한 코인의 오류로 다른 코인의 포지션 기록/지정가 매도를 잃지 않도록 코인별로 처리
+        coin, buy_order, _, latency_ms, _ = submission
+        try:
+            return confirm_and_place_sell(submission)
+        except Exception as e:
+            if logger:
+                logger.log(f"  {coin.replace('KRW-', '')}: 처리 중 오류 발생: {e}", "ERROR")
+            return failed(coin, f'처리 오류: {str(e)}', buy_order=buy_order, status='partial_fail' if buy_order else 'failed', latency_ms=latency_ms)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(carry_journal(confirm_and_place_sell_safely), submissions))
+    fill_tracker.close()
+
+    if logger:
+        latencies = [r['submit_latency_ms'] for r in results if r.get('submit_latency_ms') is not None]
+        if latencies:
+            logger.log(f"매수 주문 응답 지연: 평균 {sum(latencies)/len(latencies):.0f}ms, 최대 {max(latencies):.0f}ms", "INFO")
+
+    return results
+
+
+def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, investment_ratio=100, max_coins=None, logger=None, purchased_coins_dict=None, concurrent=False, order_manager=None, snapshot_max_age=None, max_slippage=None, depth_allocation=False, sliced_execution=False):
     """
     6번 리스트의 코인들을 자동으로 매수하고 지정가 매도 주문을 겁니다.
     
@@ -1641,6 +1971,16 @@ def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, inv
         investment_ratio: 투자비중 (원화잔고의 몇%를 투자할지, %)
         max_coins: 최대 허용 코인개수 (None이면 모든 코인 매수)
         logger: 로거 객체
+        concurrent: True면 모든 매수 주문을 먼저 제출한 뒤 체결 확인/지정가 매도를 병렬 처리
+        order_manager: OrderManager 객체 (주문/체결 기록용, None이면 기록하지 않음)
+        snapshot_max_age: 5단계 호가 스냅샷 재사용 최대 경과 시간(초).
+            스냅샷이 이보다 새로우면 매수 전 현재가를 다시 조회하지 않음 (None이면 항상 재조회)
+            depth_allocation이면 이보다 오래된 스냅샷은 배분 전에 호가를 다시 조회
+        max_slippage: 허용 슬리피지 (%, depth_allocation에 사용)
+        depth_allocation: True면 코인별 매도호가 깊이에 맞춰 슬리피지 max_slippage% 이내로
+            살 수 있는 금액 한도 안에서 투자 금액을 배분 (균등 분할 대신)
+        sliced_execution: True면 시장가 매수 대신 max_slippage% 가격으로 제한된 IOC 지정가 주문으로
+            나누어 매수 (항상 병렬 경로로 실행)
     """
     if not coin_list:
         if logger:
@@ -1694,6 +2034,31 @@ def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, inv
     total_investment = krw_balance * (investment_ratio / 100)
     buy_amount_per_coin = total_investment / coin_count
     
+    # 호가 깊이 기반 배분: 얕은 호가는 슬리피지 한도까지만, 남는 금액은 깊은 호가 코인으로
+    buy_amounts = None
+    if depth_allocation and max_slippage is not None:
+        # 배분은 매수 직전 호가 기준 (snapshot_max_age초보다 오래된 5단계 스냅샷은 다시 조회)
+        sorted_coin_list = refresh_stale_snapshots(sorted_coin_list, snapshot_max_age, upbit=upbit, logger=logger)
+        allocation = allocate_by_depth(sorted_coin_list, total_investment, max_slippage)
+        buy_amounts = {coin: info['amount'] for coin, info in allocation.items()}
+        skipped = [coin_info for coin_info in sorted_coin_list if buy_amounts.get(coin_info['coin'], 0) <= 0]
+        sorted_coin_list = [coin_info for coin_info in sorted_coin_list if buy_amounts.get(coin_info['coin'], 0) > 0]
+        if logger:
+            logger.log(f"호가 깊이 기반 배분 (슬리피지 {max_slippage}% 이내):", "INFO")
+            for coin_info in sorted_coin_list:
+                info = allocation[coin_info['coin']]
+                capacity_text = "호가 정보 없음" if info['capacity'] == float('inf') else f"한도 {info['capacity']:,.0f}원"
+                logger.log(f"  {coin_info['coin'].replace('KRW-', '')}: {info['amount']:,.0f}원 ({capacity_text})", "INFO")
+            for coin_info in skipped:
+                logger.log(f"  {coin_info['coin'].replace('KRW-', '')}: 호가 깊이 부족으로 제외 (한도 {allocation[coin_info['coin']]['capacity']:,.0f}원)", "WARNING")
+        if not sorted_coin_list:
+            if logger:
+                logger.log("호가 깊이 조건을 만족하는 코인이 없습니다.", "WARNING")
+            return []
+        coin_count = len(sorted_coin_list)
+        total_investment = sum(buy_amounts[coin_info['coin']] for coin_info in sorted_coin_list)
+        buy_amount_per_coin = total_investment / coin_count
+    
     # 매도 비중 텍스트
     if sell_ratio == 1.0:
         sell_ratio_text = "전부"
@@ -1708,251 +2073,240 @@ def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, inv
         logger.log(f"투자비중: {investment_ratio}%", "INFO")
         logger.log(f"총 투자 금액: {total_investment:,.0f}원 (원화잔고의 {investment_ratio}%)", "INFO")
         logger.log(f"매수할 코인 개수: {coin_count}개", "INFO")
-        logger.log(f"코인당 매수 금액: {buy_amount_per_coin:,.0f}원", "INFO")
-        logger.log(f"매도 주문: 매수 수량의 {sell_ratio_text}을 현재가의 {sell_percentage}% 상승 가격에 지정가 매도", "INFO")
+        if buy_amounts is not None:
+            logger.log(f"코인당 매수 금액: 평균 {buy_amount_per_coin:,.0f}원 (호가 깊이 기반 배분)", "INFO")
+        else:
+            logger.log(f"코인당 매수 금액: {buy_amount_per_coin:,.0f}원", "INFO")
+        logger.log(f"매도 주문: 매수 수량의 {sell_ratio_text}을 체결가의 {sell_percentage}% 상승 가격에 지정가 매도", "INFO")
         logger.log("⚠️  실제 주문을 진행합니다!", "WARNING")
     
-    results = []
-    
-    for idx, coin_info in enumerate(sorted_coin_list, 1):
-        coin = coin_info['coin']
-        coin_symbol = coin.replace("KRW-", "")
-        
+    if sliced_execution and max_slippage is None:
         if logger:
-            logger.log(f"[{idx}/{coin_count}] {coin_symbol} 처리 중...", "INFO")
+            logger.log("분할 매수에는 슬리피지 한도(max_slippage)가 필요합니다. 시장가 매수로 진행합니다.", "WARNING")
+        sliced_execution = False
+    
+    if concurrent or sliced_execution:
+        results = _buy_coins_concurrently(upbit, sorted_coin_list, buy_amount_per_coin, sell_percentage, sell_ratio, logger=logger, purchased_coins_dict=purchased_coins_dict, order_manager=order_manager, snapshot_max_age=snapshot_max_age, buy_amounts=buy_amounts, sliced_execution=sliced_execution, max_slippage=max_slippage)
+    else:
+        results = []
+        fill_tracker = create_fill_tracker(upbit)
+    
+        for idx, coin_info in enumerate(sorted_coin_list, 1):
+            coin = coin_info['coin']
+            coin_symbol = coin.replace("KRW-", "")
+            if buy_amounts is not None:
+                buy_amount_per_coin = buy_amounts[coin]
         
-        try:
-            current_price = pyupbit.get_current_price(coin)
-            if not current_price:
-                if logger:
-                    logger.log(f"  {coin_symbol}: 현재가를 가져올 수 없습니다.", "ERROR")
-                results.append({
-                    'coin': coin,
-                    'coin_symbol': coin_symbol,
-                    'status': 'failed',
-                    'reason': '현재가 조회 실패',
-                    'buy_order': None,
-                    'sell_order': None
-                })
-                continue
-            
             if logger:
-                logger.log(f"  현재가: {current_price:,.2f}원", "INFO")
-                logger.log(f"  시장가 매수 중... ({buy_amount_per_coin:,.0f}원)", "INFO")
-            
+                logger.log(f"[{idx}/{coin_count}] {coin_symbol} 처리 중...", "INFO")
+        
             try:
-                if buy_amount_per_coin < 5000:
+                current_price = get_snapshot_price(coin_info, snapshot_max_age)
+                price_source = "호가 스냅샷"
+                if not current_price:
+                    current_price = pyupbit.get_current_price(coin)
+                    price_source = "현재가"
+                if not current_price:
                     if logger:
-                        logger.log(f"  최소 주문 금액(5,000원) 미달: {buy_amount_per_coin:,.0f}원", "ERROR")
+                        logger.log(f"  {coin_symbol}: 현재가를 가져올 수 없습니다.", "ERROR")
                     results.append({
                         'coin': coin,
                         'coin_symbol': coin_symbol,
                         'status': 'failed',
-                        'reason': f'최소 주문 금액 미달 ({buy_amount_per_coin:,.0f}원)',
+                        'reason': '현재가 조회 실패',
                         'buy_order': None,
                         'sell_order': None
                     })
                     continue
+            
+                if logger:
+                    logger.log(f"  {price_source}: {current_price:,.2f}원", "INFO")
+                    logger.log(f"  시장가 매수 중... ({buy_amount_per_coin:,.0f}원)", "INFO")
+            
+                try:
+                    if buy_amount_per_coin < 5000:
+                        if logger:
+                            logger.log(f"  최소 주문 금액(5,000원) 미달: {buy_amount_per_coin:,.0f}원", "ERROR")
+                        results.append({
+                            'coin': coin,
+                            'coin_symbol': coin_symbol,
+                            'status': 'failed',
+                            'reason': f'최소 주문 금액 미달 ({buy_amount_per_coin:,.0f}원)',
+                            'buy_order': None,
+                            'sell_order': None
+                        })
+                        continue
                 
-                buy_order_result = upbit.buy_market_order(coin, buy_amount_per_coin)
+                    buy_order_result = upbit.buy_market_order(coin, buy_amount_per_coin)
                 
-                if buy_order_result:
-                    if isinstance(buy_order_result, (tuple, list)):
-                        buy_order = buy_order_result[0] if len(buy_order_result) > 0 else None
-                    else:
-                        buy_order = buy_order_result
+                    if buy_order_result:
+                        if isinstance(buy_order_result, (tuple, list)):
+                            buy_order = buy_order_result[0] if len(buy_order_result) > 0 else None
+                        else:
+                            buy_order = buy_order_result
                     
-                    if buy_order and isinstance(buy_order, dict):
-                        error_name = buy_order.get('error', {}).get('name', '') if isinstance(buy_order.get('error'), dict) else None
-                        error_msg = buy_order.get('error', {}).get('message', '') if isinstance(buy_order.get('error'), dict) else None
-                        
-                        if error_name or error_msg:
-                            if logger:
-                                logger.log(f"  매수 주문 실패: {error_name or error_msg}", "ERROR")
-                            results.append({
-                                'coin': coin,
-                                'coin_symbol': coin_symbol,
-                                'status': 'failed',
-                                'reason': f'API 오류: {error_name or error_msg}',
-                                'buy_order': None,
-                                'sell_order': None
-                            })
-                            continue
-                        
-                        uuid = buy_order.get('uuid', '')
-                        if not uuid:
-                            if logger:
-                                logger.log(f"  매수 주문 실패: UUID가 없습니다.", "ERROR")
-                            results.append({
-                                'coin': coin,
-                                'coin_symbol': coin_symbol,
-                                'status': 'failed',
-                                'reason': 'UUID 없음',
-                                'buy_order': None,
-                                'sell_order': None
-                            })
-                            continue
+                        if buy_order and isinstance(buy_order, dict):
+                            error_name = buy_order.get('error', {}).get('name', '') if isinstance(buy_order.get('error'), dict) else None
+                            error_msg = buy_order.get('error', {}).get('message', '') if isinstance(buy_order.get('error'), dict) else None
                         
-                        if logger:
-                            logger.log(f"  ✅ 매수 주문 성공 (UUID: {uuid[:8]}...)", "SUCCESS")
-                        
-                        time.sleep(2)
+                            if error_name or error_msg:
+                                if logger:
+                                    logger.log(f"  매수 주문 실패: {error_name or error_msg}", "ERROR")
+                                results.append({
+                                    'coin': coin,
+                                    'coin_symbol': coin_symbol,
+                                    'status': 'failed',
+                                    'reason': f'API 오류: {error_name or error_msg}',
+                                    'buy_order': None,
+                                    'sell_order': None
+                                })
+                                continue
                         
-                        if uuid:
-                            orders = upbit.get_order(uuid)
-                            if orders:
-                                order_status = orders[0] if isinstance(orders, list) else orders
-                                final_state = order_status.get('state', '')
-                                executed_volume = order_status.get('executed_volume', '0')
+                            uuid = buy_order.get('uuid', '')
+                            if not uuid:
                                 if logger:
-                                    logger.log(f"  주문 상태: {final_state}, 체결 수량: {executed_volume}", "INFO")
+                                    logger.log(f"  매수 주문 실패: UUID가 없습니다.", "ERROR")
+                                results.append({
+                                    'coin': coin,
+                                    'coin_symbol': coin_symbol,
+                                    'status': 'failed',
+                                    'reason': 'UUID 없음',
+                                    'buy_order': None,
+                                    'sell_order': None
+                                })
+                                continue
                         
-                        time.sleep(1)
-                        coin_balance = upbit.get_balance(coin)
-                        if coin_balance and float(coin_balance) > 0:
                             if logger:
-                                logger.log(f"  매수된 수량: {coin_balance}", "SUCCESS")
-                            
-                            # 매수 가격 저장 (실제 체결 가격)
-                            buy_price = current_price  # 기본값: 현재가
-                            try:
-                                if uuid:
-                                    time.sleep(1)  # 체결 대기
-                                    orders = upbit.get_order(uuid, state="done")
-                                    if orders:
-                                        order = orders[0] if isinstance(orders, list) else orders
-                                        executed_volume = float(order.get('executed_volume', 0))
-                                        
-                                        # 체결 내역(trades)에서 실제 평균 매수가 계산
-                                        if executed_volume > 0:
-                                            trades = order.get('trades', [])
-                                            if trades and len(trades) > 0:
-                                                total_cost = 0
-                                                total_volume = 0
-                                                for trade in trades:
-                                                    # 업비트 API의 trades 구조: price, volume, funds (체결 금액)
-                                                    trade_price = float(trade.get('price', 0))
-                                                    trade_volume = float(trade.get('volume', 0))
-                                                    trade_funds = float(trade.get('funds', 0))  # 체결 금액 (수수료 포함 전)
-                                                    
-                                                    # funds가 있으면 funds 사용, 없으면 price * volume 사용
-                                                    if trade_funds > 0:
-                                                        total_cost += trade_funds
-                                                    elif trade_price > 0 and trade_volume > 0:
-                                                        total_cost += trade_price * trade_volume
-                                                    
-                                                    if trade_volume > 0:
-                                                        total_volume += trade_volume
-                                                
-                                                if total_volume > 0:
-                                                    buy_price = total_cost / total_volume
-                                                    if logger:
-                                                        logger.log(f"  실제 체결 매수가: {buy_price:.4f}원 (체결 수량: {total_volume:.8f})", "INFO")
-                                            else:
-                                                # trades가 없으면 executed_volume과 주문 금액으로 계산
-                                                # buy_amount_per_coin은 이미 수수료 제외 전 금액
-                                                if executed_volume > 0:
-                                                    buy_price = buy_amount_per_coin / executed_volume
-                                                    if logger:
-                                                        logger.log(f"  체결 내역 없음, 계산된 매수가: {buy_price:.4f}원", "WARNING")
-                            except Exception as e:
+                                logger.log(f"  ✅ 매수 주문 성공 (UUID: {uuid[:8]}...)", "SUCCESS")
+                            if order_manager is not None:
+                                order_manager.record_submit(buy_order, tag='entry', market=coin, side='bid')
+                        
+                            # 체결 확인 (고정 대기 없이 주문 종료 즉시 확인)
+                            fill = fill_tracker.wait(uuid)
+                            if order_manager is not None:
+                                order_manager.apply_fill(fill)
+                            if logger:
+                                logger.log(f"  주문 상태: {fill['state']}, 체결 수량: {fill['executed_volume']} ({fill['elapsed_ms']:.0f}ms)", "INFO")
+                        
+                            coin_balance = fill['executed_volume']
+                            if coin_balance <= 0:
+                                coin_balance = upbit.get_balance(coin)
+                            if coin_balance and float(coin_balance) > 0:
                                 if logger:
-                                    logger.log(f"  매수 체결 가격 조회 오류: {e}", "WARNING")
-                                buy_price = current_price
+                                    logger.log(f"  매수된 수량: {coin_balance}", "SUCCESS")
                             
-                            # 매수한 코인 정보 저장 (실시간 모니터링용)
-                            # 지정가 매도 주문 UUID는 아래에서 추가됨
-                            sell_order_uuid = None
+                                # 매수 가격 저장 (실제 체결 가격, 체결 내역 VWAP)
+                                buy_price = current_price  # 기본값: 현재가
+                                if fill['avg_price']:
+                                    buy_price = fill['avg_price']
+                                    if logger:
+                                        logger.log(f"  실제 체결 매수가: {buy_price:.4f}원 (체결 수량: {fill['executed_volume']:.8f})", "INFO")
+                                elif fill['executed_volume'] > 0:
+                                    # trades가 없으면 executed_volume과 주문 금액으로 계산
+                                    buy_price = buy_amount_per_coin / fill['executed_volume']
+                                    if logger:
+                                        logger.log(f"  체결 내역 없음, 계산된 매수가: {buy_price:.4f}원", "WARNING")
                             
-                            sell_volume = float(coin_balance) * sell_ratio
-                            sell_price = current_price * (1 + sell_percentage / 100)
+                                # 매수한 코인 정보 저장 (실시간 모니터링용)
+                                # 지정가 매도 주문 UUID는 아래에서 추가됨
+                                sell_order_uuid = None
                             
-                            if sell_price < 1000:
-                                sell_price = int(sell_price)
-                            elif sell_price < 10000:
-                                sell_price = int(sell_price / 10) * 10
-                            else:
-                                sell_price = int(sell_price / 100) * 100
+                                # 지정가 매도 가격은 실제 체결가 기준
+                                sell_volume = float(coin_balance) * sell_ratio
+                                sell_price = quantize(buy_price * (1 + sell_percentage / 100), 'floor')
                             
-                            if logger:
-                                logger.log(f"  지정가 매도 주문 중... (수량: {sell_volume}, 가격: {sell_price:,.0f}원, +{sell_percentage}%)", "INFO")
+                                if logger:
+                                    logger.log(f"  지정가 매도 주문 중... (수량: {sell_volume}, 가격: {sell_price:,}원, +{sell_percentage}%)", "INFO")
                             
-                            try:
-                                sell_order_result = upbit.sell_limit_order(coin, sell_price, sell_volume)
+                                try:
+                                    sell_order_result = upbit.sell_limit_order(coin, sell_price, sell_volume)
                                 
-                                if sell_order_result:
-                                    if isinstance(sell_order_result, (tuple, list)):
-                                        sell_order = sell_order_result[0] if len(sell_order_result) > 0 else None
-                                    else:
-                                        sell_order = sell_order_result
+                                    if sell_order_result:
+                                        if isinstance(sell_order_result, (tuple, list)):
+                                            sell_order = sell_order_result[0] if len(sell_order_result) > 0 else None
+                                        else:
+                                            sell_order = sell_order_result
                                     
-                                    if sell_order and isinstance(sell_order, dict):
-                                        error_name = sell_order.get('error', {}).get('name', '') if isinstance(sell_order.get('error'), dict) else None
-                                        error_msg = sell_order.get('error', {}).get('message', '') if isinstance(sell_order.get('error'), dict) else None
+                                        if sell_order and isinstance(sell_order, dict):
+                                            error_name = sell_order.get('error', {}).get('name', '') if isinstance(sell_order.get('error'), dict) else None
+                                            error_msg = sell_order.get('error', {}).get('message', '') if isinstance(sell_order.get('error'), dict) else None
                                         
-                                        if error_name or error_msg:
-                                            if logger:
-                                                logger.log(f"  매도 주문 실패: {error_name or error_msg}", "ERROR")
-                                            sell_order = None
-                                        else:
-                                            sell_uuid = sell_order.get('uuid', '')
-                                            if sell_uuid:
-                                                sell_order_uuid = sell_uuid  # UUID 저장
-                                                if logger:
-                                                    logger.log(f"  ✅ 매도 주문 성공 (UUID: {sell_uuid[:8]}...)", "SUCCESS")
-                                            else:
+                                            if error_name or error_msg:
                                                 if logger:
-                                                    logger.log(f"  매도 주문 실패: UUID가 없습니다.", "ERROR")
+                                                    logger.log(f"  매도 주문 실패: {error_name or error_msg}", "ERROR")
                                                 sell_order = None
-                                                sell_order_uuid = None
+                                            else:
+                                                sell_uuid = sell_order.get('uuid', '')
+                                                if sell_uuid:
+                                                    sell_order_uuid = sell_uuid  # UUID 저장
+                                                    if order_manager is not None:
+                                                        order_manager.record_submit(sell_order, tag='take_profit', market=coin, side='ask', price=sell_price, volume=sell_volume)
+                                                    if logger:
+                                                        logger.log(f"  ✅ 매도 주문 성공 (UUID: {sell_uuid[:8]}...)", "SUCCESS")
+                                                else:
+                                                    if logger:
+                                                        logger.log(f"  매도 주문 실패: UUID가 없습니다.", "ERROR")
+                                                    sell_order = None
+                                                    sell_order_uuid = None
+                                        else:
+                                            if logger:
+                                                logger.log(f"  매도 주문 실패: 주문 결과를 받을 수 없습니다.", "ERROR")
+                                            sell_order = None
                                     else:
-                                        if logger:
-                                            logger.log(f"  매도 주문 실패: 주문 결과를 받을 수 없습니다.", "ERROR")
                                         sell_order = None
-                                else:
+                                except Exception as e:
+                                    if logger:
+                                        logger.log(f"  매도 주문 오류: {e}", "ERROR")
                                     sell_order = None
-                            except Exception as e:
-                                if logger:
-                                    logger.log(f"  매도 주문 오류: {e}", "ERROR")
-                                sell_order = None
                             
-                            # 실제 체결된 매수가격 가져오기
-                            actual_buy_price = buy_price  # 위에서 계산한 실제 체결 가격
+                                # 실제 체결된 매수가격 가져오기
+                                actual_buy_price = buy_price  # 위에서 계산한 실제 체결 가격
                             
-                            # 매수한 코인 정보 저장 (실시간 모니터링용)
-                            if purchased_coins_dict is not None:
-                                purchased_coins_dict[coin] = {
-                                    'buy_price': actual_buy_price,
-                                    'buy_time': get_kst_now(),
-                                    'buy_amount': buy_amount_per_coin,
-                                    'buy_quantity': float(coin_balance),  # 원래 매수 수량 저장
-                                    'coin_balance': float(coin_balance),  # 현재 남은 수량 (지정가 매도로 줄어들 수 있음)
-                                    'sell_order_uuid': sell_order_uuid,  # 지정가 매도 주문 UUID 저장
-                                    'sell_price_limit': sell_price,  # 지정가 매도 가격 저장
-                                    'sell_volume': sell_volume,  # 지정가 매도 수량 저장
-                                    'limit_sell_quantity': 0  # 지정가 매도 체결 수량 (초기값 0)
-                                }
+                                # 매수한 코인 정보 저장 (실시간 모니터링용)
+                                if purchased_coins_dict is not None:
+                                    purchased_coins_dict[coin] = {
+                                        'buy_price': actual_buy_price,
+                                        'buy_time': get_kst_now(),
+                                        'buy_amount': buy_amount_per_coin,
+                                        'buy_quantity': float(coin_balance),  # 원래 매수 수량 저장
+                                        'coin_balance': float(coin_balance),  # 현재 남은 수량 (지정가 매도로 줄어들 수 있음)
+                                        'sell_order_uuid': sell_order_uuid,  # 지정가 매도 주문 UUID 저장
+                                        'sell_price_limit': sell_price,  # 지정가 매도 가격 저장
+                                        'sell_volume': sell_volume,  # 지정가 매도 수량 저장
+                                        'limit_sell_quantity': 0  # 지정가 매도 체결 수량 (초기값 0)
+                                    }
                             
-                            results.append({
-                                'coin': coin,
-                                'coin_symbol': coin_symbol,
-                                'status': 'success',
-                                'current_price': actual_buy_price,  # 실제 체결된 매수가격 사용
-                                'buy_price': actual_buy_price,  # 명시적으로 buy_price도 저장
-                                'buy_amount': buy_amount_per_coin,
-                                'buy_order': buy_order,
-                                'sell_price': sell_price,
-                                'sell_order': sell_order
-                            })
+                                results.append({
+                                    'coin': coin,
+                                    'coin_symbol': coin_symbol,
+                                    'status': 'success',
+                                    'current_price': actual_buy_price,  # 실제 체결된 매수가격 사용
+                                    'buy_price': actual_buy_price,  # 명시적으로 buy_price도 저장
+                                    'buy_amount': buy_amount_per_coin,
+                                    'buy_order': buy_order,
+                                    'sell_price': sell_price,
+                                    'sell_order': sell_order
+                                })
+                            else:
+                                if logger:
+                                    logger.log(f"  매수된 수량이 없습니다.", "WARNING")
+                                results.append({
+                                    'coin': coin,
+                                    'coin_symbol': coin_symbol,
+                                    'status': 'partial_fail',
+                                    'reason': '매수 후 잔고 없음',
+                                    'buy_order': buy_order,
+                                    'sell_order': None
+                                })
                         else:
                             if logger:
-                                logger.log(f"  매수된 수량이 없습니다.", "WARNING")
+                                logger.log(f"  매수 주문 실패: 주문 결과를 받을 수 없습니다.", "ERROR")
                             results.append({
                                 'coin': coin,
                                 'coin_symbol': coin_symbol,
-                                'status': 'partial_fail',
-                                'reason': '매수 후 잔고 없음',
-                                'buy_order': buy_order,
+                                'status': 'failed',
+                                'reason': '매수 주문 실패 - 결과 없음',
+                                'buy_order': None,
                                 'sell_order': None
                             })
                     else:
@@ -1962,46 +2316,36 @@ def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, inv
                             'coin': coin,
                             'coin_symbol': coin_symbol,
                             'status': 'failed',
-                            'reason': '매수 주문 실패 - 결과 없음',
+                            'reason': '매수 주문 실패',
                             'buy_order': None,
                             'sell_order': None
                         })
-                else:
+                except Exception as e:
                     if logger:
-                        logger.log(f"  매수 주문 실패: 주문 결과를 받을 수 없습니다.", "ERROR")
+                        logger.log(f"  매수 주문 오류: {e}", "ERROR")
                     results.append({
                         'coin': coin,
                         'coin_symbol': coin_symbol,
                         'status': 'failed',
-                        'reason': '매수 주문 실패',
+                        'reason': f'매수 주문 오류: {str(e)}',
                         'buy_order': None,
                         'sell_order': None
                     })
+            
+                if idx < coin_count:
+                    time.sleep(0.5)
             except Exception as e:
                 if logger:
-                    logger.log(f"  매수 주문 오류: {e}", "ERROR")
+                    logger.log(f"  {coin_symbol}: 처리 중 오류 발생: {e}", "ERROR")
                 results.append({
                     'coin': coin,
                     'coin_symbol': coin_symbol,
                     'status': 'failed',
-                    'reason': f'매수 주문 오류: {str(e)}',
+                    'reason': f'처리 오류: {str(e)}',
                     'buy_order': None,
                     'sell_order': None
                 })
-            
-            if idx < coin_count:
-                time.sleep(0.5)
-        except Exception as e:
-            if logger:
-                logger.log(f"  {coin_symbol}: 처리 중 오류 발생: {e}", "ERROR")
-            results.append({
-                'coin': coin,
-                'coin_symbol': coin_symbol,
-                'status': 'failed',
-                'reason': f'처리 오류: {str(e)}',
-                'buy_order': None,
-                'sell_order': None
-            })
+        fill_tracker.close()
     
     success_count = sum(1 for r in results if r['status'] == 'success')
     fail_count = len(results) - success_count
@@ -2051,8 +2395,17 @@ def buy_coins_from_list(upbit, coin_list, sell_percentage=3, sell_ratio=0.5, inv
 # 메인 실행 함수
 # ============================================================================
 
-def run_trading_process(interval_minutes, target_hour, target_minute, max_slippage, price_change_min, price_change_max, volume_change_min, enable_day_candle_filter, exclude_coins, enable_auto_trade, sell_percentage, sell_ratio, investment_ratio, max_coins, logger, stop_event, root, purchased_coins_dict=None, stop_loss_pct=None, max_spread=0.2):
-    """트레이딩 프로세스를 실행하는 함수"""
+def run_trading_process(interval_minutes, target_hour, target_minute, max_slippage, price_change_min, price_change_max, volume_change_min, enable_day_candle_filter, exclude_coins, enable_auto_trade, sell_percentage, sell_ratio, investment_ratio, max_coins, logger, stop_event, root, purchased_coins_dict=None, stop_loss_pct=None, max_spread=0.2, concurrent_orders=True, order_manager=None, snapshot_max_age=SNAPSHOT_MAX_AGE_SEC, depth_allocation=True, sliced_execution=False):
+    """트레이딩 프로세스를 실행하는 함수
+
+    concurrent_orders=True면 매수 주문을 병렬로 제출합니다 (buy_coins_from_list의 concurrent 모드).
+    snapshot_max_age초 이내의 5단계 호가 스냅샷은 매수 전 현재가 조회 대신 사용합니다.
+    depth_allocation=True면 투자 금액을 코인별 호가 깊이(max_slippage 이내)에 맞춰 배분합니다.
+    sliced_execution=True면 시장가 대신 max_slippage 가격 한도의 IOC 지정가 분할 매수를 사용합니다.
+    실행 1회의 단계별 시간/API 요청/후보 수는 DATA_DIR/run_journal.jsonl에 기록합니다 (run_journal.py).
+    """
+    journal = None
+    run_status, run_error = 'stopped', None
     try:
         # 중지 이벤트 확인
         if stop_event and stop_event.is_set():
@@ -2068,13 +2421,22 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
             return
         
         start_time = time.time()
-        
+        # 기준 시각 = 분석 시작 정각 (첫 주문까지의 지연 계산용)
+        journal = RunJournal()
+        journal.start(boundary=get_kst_now().replace(second=0, microsecond=0).timestamp())
+        journal.note(max_slippage=max_slippage, auto_trade=bool(enable_auto_trade))
+        # 이번 스캔에서 조회하는 시세 응답을 DATA_DIR/market_data에 기록 (재현/튜닝용)
+        scan_id = get_market_recorder().begin_scan()
+        logger.log(f"시세 데이터 기록 시작 (스캔 {scan_id})", "INFO")
+        
+        journal.begin_stage('market_list')
         logger.log("업비트 원화마켓 코인 정보 수집 중...", "INFO")
         # 제외 코인 문자열을 리스트로 변환 (예: "BTC,ETH,ONDO")
         exclude_list = []
         if exclude_coins:
             exclude_list = [s.strip() for s in exclude_coins.split(',') if s.strip()]
         coins = get_all_upbit_coins(logger, exclude_coins=exclude_list)
+        journal.candidates('market_list', len(coins))
         
         # 중지 이벤트 확인
         if stop_event and stop_event.is_set():
@@ -2091,8 +2453,10 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
             target_hour=target_hour,
             target_minute=target_minute,
             logger=logger,
-            stop_event=stop_event
+            stop_event=stop_event,
+            journal=journal
         )
+        journal.candidates('candle_fetch', len(final_filtered_coins))
         
         # 중지 이벤트 확인
         if stop_event and stop_event.is_set():
@@ -2100,30 +2464,38 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
             return
         
         if final_filtered_coins:
+            journal.begin_stage('change_filters')
             rising_coins = print_3minute_candles(
                 final_filtered_coins,
                 interval_minutes=interval_minutes,
                 target_hour=target_hour,
                 logger=logger
             )
+            journal.candidates('rising', len(rising_coins or []))
             
             if rising_coins:
                 filtered_coins = print_filtered_coins_by_price_volume(rising_coins, price_change_min=price_change_min, price_change_max=price_change_max, volume_change_min=volume_change_min, logger=logger)
+                journal.candidates('change_filters', len(filtered_coins or []))
                 
                 if filtered_coins:
+                    journal.begin_stage('orderbooks')
                     analysis_results = print_all_coins_market_buy_analysis(filtered_coins, buy_amount=10000000, max_spread=max_spread, logger=logger)
+                    journal.candidates('orderbooks', len(analysis_results or []))
                     
                     if analysis_results:
                         filtered_results = print_filtered_by_slippage(
                             analysis_results, max_slippage=max_slippage, logger=logger, root=root,
                             skip_csv_and_popup=enable_day_candle_filter
                         )
+                        journal.candidates('slippage', len(filtered_results or []))
                         
                         # 일봉 필터링 적용 (체크된 경우): 전체 리스트 반환, O/X 표시용
                         if filtered_results and enable_day_candle_filter:
+                            journal.begin_stage('day_candle')
                             filtered_results = filter_by_day_candle(filtered_results, min_bullish_ratio=0.4, logger=logger, stop_event=stop_event)
                             write_slippage_csv_and_popup(filtered_results, max_slippage, logger=logger, root=root)
                             filtered_results = [r for r in filtered_results if r.get('day_candle_pass')]
+                            journal.candidates('day_candle', len(filtered_results))
                         
                         # 자동매매가 활성화된 경우에만 실행
                         if filtered_results and enable_auto_trade:
@@ -2131,11 +2503,14 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
                             logger.log("💎 프리미엄 기능: 자동매매 실행", "SUCCESS")
                             logger.log("=" * 60, "INFO")
                             
-                            api_key, secret_key = load_api_keys_from_json()
-                            if api_key and secret_key:
+                            journal.begin_stage('buys')
+                            upbit = get_upbit_client()
+                            if upbit is not None:
                                 try:
-                                    upbit = pyupbit.Upbit(api_key, secret_key)
-                                    buy_coins_from_list(upbit, filtered_results, sell_percentage=sell_percentage, sell_ratio=sell_ratio, investment_ratio=investment_ratio, max_coins=max_coins, logger=logger, purchased_coins_dict=purchased_coins_dict)
+                                    buy_coins_from_list(upbit, filtered_results, sell_percentage=sell_percentage, sell_ratio=sell_ratio, investment_ratio=investment_ratio, max_coins=max_coins, logger=logger, purchased_coins_dict=purchased_coins_dict, concurrent=concurrent_orders, order_manager=order_manager, snapshot_max_age=snapshot_max_age, max_slippage=max_slippage, depth_allocation=depth_allocation, sliced_execution=sliced_execution)
+                                    if hasattr(upbit, 'signing_stats'):
+                                        stats = upbit.signing_stats()
+                                        logger.log(f"요청 서명: {stats['count']}회, 평균 {stats['avg_us']:.0f}us, 최대 {stats['max_us']:.0f}us", "INFO")
                                 except Exception as e:
                                     logger.log(f"자동 매수/매도 실행 중 오류 발생: {e}", "ERROR")
                             else:
@@ -2147,6 +2522,8 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
                             logger.log("자동매매를 사용하려면 '자동매매 (프리미엄)' 옵션을 체크하세요.", "INFO")
                             logger.log("=" * 60, "INFO")
         
+        journal.end_stage()
+        run_status = 'ok'
         elapsed_time = time.time() - start_time
         minutes = int(elapsed_time // 60)
         seconds = elapsed_time % 60
@@ -2160,9 +2537,18 @@ def run_trading_process(interval_minutes, target_hour, target_minute, max_slippa
             logger.log(f"처리 시간: {seconds:.2f}초", "INFO")
         logger.log("=" * 60, "INFO")
     except Exception as e:
+        run_status, run_error = 'error', e
         logger.log(f"프로세스 실행 중 오류 발생: {e}", "ERROR")
         import traceback
         logger.log(traceback.format_exc(), "ERROR")
+    finally:
+        # 중지/오류로 끝난 실행도 그 시점까지의 기록을 남김
+        if journal is not None:
+            try:
+                record = journal.finish(status=run_status, error=run_error)
+                logger.log(format_summary(record), "INFO")
+            except Exception as e:
+                logger.log(f"실행 기록 저장 오류: {e}", "WARNING")
 
 
 # ============================================================================
@@ -2207,14 +2593,27 @@ class TradingGUI:
         self.stop_event = threading.Event()
         self.popup_queue = queue.Queue()
         
+        # 장부 변경 저널 (DATA_DIR/position_journal.jsonl): 재시작 시 보유 코인 복원
+        self.position_journal = PositionJournal()
+        journal_state = self.position_journal.replay()
         # 매수한 코인 정보 저장 (실시간 모니터링용)
         # {coin: {'buy_price': float, 'buy_time': datetime, 'buy_amount': float}}
-        self.purchased_coins = {}
+        self.purchased_coins = PositionLedger(journal_state.get("purchased_coins"), name="purchased_coins", journal=self.position_journal)
         # 손절 또는 종료 시간에 매도된 코인 정보 저장 (수익률 계산용)
         # {coin: {'buy_price': float, 'sell_price': float, 'buy_amount': float, 'sell_amount': float, 'profit_pct': float, 'profit_amount': float, 'sell_time': datetime, 'sell_reason': str}}
-        self.sold_coins = {}
+        self.sold_coins = PositionLedger(journal_state.get("sold_coins"), name="sold_coins", journal=self.position_journal)
+        # 매도 체결 수익 장부 (DATA_DIR/profit_ledger.db, 체결 1건당 1행)
+        self.profit_ledger = ProfitLedger()
+        # 프로그램이 낸 모든 주문 (UUID 기준 상태/체결 추적)
+        self.order_manager = OrderManager()
         self.monitoring_thread = None
         self.monitoring_stop_event = threading.Event()
+        # WebSocket 실시간 손절 감시 (보유 코인만 구독)
+        self.risk_engine = None
+        self.exit_engine = None
+        self.poll_scheduler = None
+        self.stop_loss_lock = threading.Lock()
+        self.stop_loss_in_progress = set()
         
         # root 객체에 popup_queue 속성 추가 (다른 스레드에서 접근 가능하도록)
         self.root.popup_queue = self.popup_queue
@@ -2226,13 +2625,17 @@ class TradingGUI:
         self.end_hour = 23
         self.end_minute = 0
         
-        # 설정값 로드
-        self.settings = load_settings()
+        # 설정값 (타입 변환된 값, 변경은 모아서 백그라운드에서 원자적으로 저장)
+        self.settings = SettingsStore(CONFIG_FILE, save_delay=SETTINGS_SAVE_DELAY_SEC)
         
         self.schedule_auto_sell()
         
         self.setup_ui()
         
+        # 저널에서 복원한 보유 코인을 거래소 상태와 대조 (API 조회는 별도 스레드)
+        if self.purchased_coins or self.sold_coins:
+            threading.Thread(target=self.recover_positions, daemon=True).start()
+        
         # 설정값 변경 시 자동 저장을 위한 trace 추가
         self.setup_settings_trace()
         
@@ -2367,7 +2770,7 @@ class TradingGUI:
         ttk.Label(sell_label_frame, text="지정가 매도", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         sell_input_frame = ttk.Frame(sell_label_frame)
         sell_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.sell_percentage_var = tk.StringVar(value=self.settings.get("sell_percentage", "3"))
+        self.sell_percentage_var = tk.StringVar(value=self.settings.display("sell_percentage"))
         sell_entry = ttk.Entry(sell_input_frame, textvariable=self.sell_percentage_var, width=8, style='Custom.TEntry')
         sell_entry.pack(side=tk.LEFT)
         ttk.Label(sell_input_frame, text="%", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2378,7 +2781,7 @@ class TradingGUI:
         ttk.Label(sell_ratio_label_frame, text="매도 비중", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         sell_ratio_input_frame = ttk.Frame(sell_ratio_label_frame)
         sell_ratio_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.sell_ratio_var = tk.StringVar(value=self.settings.get("sell_ratio", "절반"))
+        self.sell_ratio_var = tk.StringVar(value=self.settings.display("sell_ratio"))
         sell_ratio_combo = ttk.Combobox(sell_ratio_input_frame, textvariable=self.sell_ratio_var,
                                       values=["전부", "절반", "3분의 1"],
                                       state="readonly", width=8)
@@ -2392,7 +2795,7 @@ class TradingGUI:
         ToolTip(investment_label, "원화잔고의 몇%를 투자할지")
         investment_input_frame = ttk.Frame(investment_label_frame)
         investment_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.investment_ratio_var = tk.StringVar(value=self.settings.get("investment_ratio", "100"))
+        self.investment_ratio_var = tk.StringVar(value=self.settings.display("investment_ratio"))
         investment_entry = ttk.Entry(investment_input_frame, textvariable=self.investment_ratio_var, width=8, style='Custom.TEntry')
         investment_entry.pack(side=tk.LEFT)
         ttk.Label(investment_input_frame, text="%", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2405,7 +2808,7 @@ class TradingGUI:
         ToolTip(max_coins_label, "필터링 결과 중 최대 매수할 코인 개수")
         max_coins_input_frame = ttk.Frame(max_coins_label_frame)
         max_coins_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.max_coins_var = tk.StringVar(value=self.settings.get("max_coins", "10"))
+        self.max_coins_var = tk.StringVar(value=self.settings.display("max_coins"))
         max_coins_entry = ttk.Entry(max_coins_input_frame, textvariable=self.max_coins_var, width=8, style='Custom.TEntry')
         max_coins_entry.pack(side=tk.LEFT)
         ttk.Label(max_coins_input_frame, text="개", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2418,7 +2821,7 @@ class TradingGUI:
         ToolTip(stop_loss_label, "매수 가격 대비 하락 시 전량 매도")
         stop_loss_input_frame = ttk.Frame(stop_loss_label_frame)
         stop_loss_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.stop_loss_var = tk.StringVar(value=self.settings.get("stop_loss", "5"))
+        self.stop_loss_var = tk.StringVar(value=self.settings.display("stop_loss"))
         stop_loss_entry = ttk.Entry(stop_loss_input_frame, textvariable=self.stop_loss_var, width=8, style='Custom.TEntry')
         stop_loss_entry.pack(side=tk.LEFT)
         ttk.Label(stop_loss_input_frame, text="%", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2431,13 +2834,13 @@ class TradingGUI:
         ToolTip(end_time_label, "당일 매수 코인 전량 매도")
         end_time_frame = ttk.Frame(end_time_label_frame)
         end_time_frame.pack(fill=tk.X, pady=(3, 0))
-        self.end_hour_var = tk.StringVar(value=self.settings.get("end_hour", "23"))
+        self.end_hour_var = tk.StringVar(value=self.settings.display("end_hour"))
         end_hour_combo = ttk.Combobox(end_time_frame, textvariable=self.end_hour_var,
                                      values=[f"{i:02d}" for i in range(24)],
                                      state="readonly", width=5)
         end_hour_combo.pack(side=tk.LEFT)
         ttk.Label(end_time_frame, text="시", style='Option.TLabel').pack(side=tk.LEFT, padx=(3, 5))
-        self.end_minute_var = tk.StringVar(value=self.settings.get("end_minute", "00"))
+        self.end_minute_var = tk.StringVar(value=self.settings.display("end_minute"))
         end_minute_combo = ttk.Combobox(end_time_frame, textvariable=self.end_minute_var,
                                        values=[f"{i:02d}" for i in range(60)],
                                        state="readonly", width=5)
@@ -2461,7 +2864,7 @@ class TradingGUI:
         ttk.Label(interval_label_frame, text="분봉 선택", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         interval_input_frame = ttk.Frame(interval_label_frame)
         interval_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.interval_var = tk.StringVar(value=self.settings.get("interval", "1"))
+        self.interval_var = tk.StringVar(value=self.settings.display("interval"))
         interval_combo = ttk.Combobox(interval_input_frame, textvariable=self.interval_var, 
                                      values=["1", "2", "3", "5", "15", "30", "60"], 
                                      state="readonly", width=8)
@@ -2474,13 +2877,13 @@ class TradingGUI:
         ttk.Label(time_label_frame, text="기준 시간", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         time_frame = ttk.Frame(time_label_frame)
         time_frame.pack(fill=tk.X, pady=(3, 0))
-        self.hour_var = tk.StringVar(value=self.settings.get("hour", "09"))
+        self.hour_var = tk.StringVar(value=self.settings.display("hour"))
         hour_combo = ttk.Combobox(time_frame, textvariable=self.hour_var,
                                  values=[f"{i:02d}" for i in range(24)],
                                  state="readonly", width=5)
         hour_combo.pack(side=tk.LEFT)
         ttk.Label(time_frame, text="시", style='Option.TLabel').pack(side=tk.LEFT, padx=(3, 5))
-        self.minute_var = tk.StringVar(value=self.settings.get("minute", "00"))
+        self.minute_var = tk.StringVar(value=self.settings.display("minute"))
         minute_combo = ttk.Combobox(time_frame, textvariable=self.minute_var,
                                     values=[f"{i:02d}" for i in range(60)],
                                     state="readonly", width=5)
@@ -2497,11 +2900,11 @@ class TradingGUI:
         ttk.Label(price_label_frame, text="가격 변동률", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         price_filter_frame = ttk.Frame(price_label_frame)
         price_filter_frame.pack(fill=tk.X, pady=(3, 0))
-        self.price_change_min_var = tk.StringVar(value=self.settings.get("price_change_min", "0.2"))
+        self.price_change_min_var = tk.StringVar(value=self.settings.display("price_change_min"))
         price_min_entry = ttk.Entry(price_filter_frame, textvariable=self.price_change_min_var, width=6, style='Custom.TEntry')
         price_min_entry.pack(side=tk.LEFT)
         ttk.Label(price_filter_frame, text=" % ~ ", style='Option.TLabel').pack(side=tk.LEFT)
-        self.price_change_max_var = tk.StringVar(value=self.settings.get("price_change_max", "5.0"))
+        self.price_change_max_var = tk.StringVar(value=self.settings.display("price_change_max"))
         price_max_entry = ttk.Entry(price_filter_frame, textvariable=self.price_change_max_var, width=6, style='Custom.TEntry')
         price_max_entry.pack(side=tk.LEFT)
         ttk.Label(price_filter_frame, text=" %", style='Option.TLabel').pack(side=tk.LEFT)
@@ -2512,7 +2915,7 @@ class TradingGUI:
         ttk.Label(volume_label_frame, text="거래량변동", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         volume_input_frame = ttk.Frame(volume_label_frame)
         volume_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.volume_change_min_var = tk.StringVar(value=self.settings.get("volume_change_min", "100"))
+        self.volume_change_min_var = tk.StringVar(value=self.settings.display("volume_change_min"))
         volume_entry = ttk.Entry(volume_input_frame, textvariable=self.volume_change_min_var, width=8, style='Custom.TEntry')
         volume_entry.pack(side=tk.LEFT)
         ttk.Label(volume_input_frame, text=" % 이상", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2523,7 +2926,7 @@ class TradingGUI:
         ttk.Label(slippage_label_frame, text="슬리피지", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         slippage_input_frame = ttk.Frame(slippage_label_frame)
         slippage_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.slippage_var = tk.StringVar(value=self.settings.get("slippage", "0.3"))
+        self.slippage_var = tk.StringVar(value=self.settings.display("slippage"))
         slippage_entry = ttk.Entry(slippage_input_frame, textvariable=self.slippage_var, width=8, style='Custom.TEntry')
         slippage_entry.pack(side=tk.LEFT)
         ttk.Label(slippage_input_frame, text="%", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2535,7 +2938,7 @@ class TradingGUI:
         ttk.Label(spread_label_frame, text="호가스프레드", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         spread_input_frame = ttk.Frame(spread_label_frame)
         spread_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.max_spread_var = tk.StringVar(value=self.settings.get("max_spread", "0.2"))
+        self.max_spread_var = tk.StringVar(value=self.settings.display("max_spread"))
         spread_entry = ttk.Entry(spread_input_frame, textvariable=self.max_spread_var, width=8, style='Custom.TEntry')
         spread_entry.pack(side=tk.LEFT)
         ttk.Label(spread_input_frame, text="%", style='Option.TLabel').pack(side=tk.LEFT, padx=(5, 0))
@@ -2547,7 +2950,7 @@ class TradingGUI:
         ttk.Label(exclude_label_frame, text="제외 코인", style='Option.TLabel', font=('맑은 고딕', 9, 'bold')).pack(anchor=tk.W)
         exclude_input_frame = ttk.Frame(exclude_label_frame)
         exclude_input_frame.pack(fill=tk.X, pady=(3, 0))
-        self.exclude_coins_var = tk.StringVar(value=self.settings.get("exclude_coins", ""))
+        self.exclude_coins_var = tk.StringVar(value=self.settings.display("exclude_coins"))
         exclude_entry = ttk.Entry(exclude_input_frame, textvariable=self.exclude_coins_var, width=20, style='Custom.TEntry')
         exclude_entry.pack(side=tk.LEFT)
         ToolTip(exclude_entry, "필터링에서 제외할 코인 심볼을 콤마로 구분해서 입력 (예: BTC,ETH,ONDO)")
@@ -2555,7 +2958,7 @@ class TradingGUI:
         # 일봉 필터링 체크박스
         day_candle_label_frame = ttk.Frame(row6_frame)
         day_candle_label_frame.pack(side=tk.LEFT, padx=(15, 0))
-        self.day_candle_filter_var = tk.BooleanVar(value=self.settings.get("day_candle_filter", False))
+        self.day_candle_filter_var = tk.BooleanVar(value=self.settings["day_candle_filter"])
         day_candle_check = ttk.Checkbutton(day_candle_label_frame, text="일봉 필터링", 
                                           variable=self.day_candle_filter_var)
         day_candle_check.pack(anchor=tk.W)
@@ -2731,6 +3134,7 @@ class TradingGUI:
         self.process_thread = threading.Thread(
             target=run_trading_process,
             args=(interval_minutes, target_hour, target_minute, max_slippage, price_change_min, price_change_max, volume_change_min, enable_day_candle_filter, exclude_coins, enable_auto_trade, sell_percentage, sell_ratio, investment_ratio, max_coins, self.logger, self.stop_event, self.root, self.purchased_coins, stop_loss_pct, max_spread),
+            kwargs={'order_manager': self.order_manager},
             daemon=True
         )
         self.process_thread.start()
@@ -2746,139 +3150,135 @@ class TradingGUI:
         
         self.stop_event.set()
         self.monitoring_stop_event.set()  # 모니터링 스레드도 중지
+        if self.risk_engine:
+            self.risk_engine.stop()
+            self.risk_engine = None
         self.is_running = False
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         
         self.logger.log("프로세스 중지 요청...", "WARNING")
     
+    def setting_vars(self):
+        """설정 키 → 입력 변수"""
+        return {
+            "interval": self.interval_var,
+            "hour": self.hour_var,
+            "minute": self.minute_var,
+            "end_hour": self.end_hour_var,
+            "end_minute": self.end_minute_var,
+            "price_change_min": self.price_change_min_var,
+            "price_change_max": self.price_change_max_var,
+            "volume_change_min": self.volume_change_min_var,
+            "slippage": self.slippage_var,
+            "max_spread": self.max_spread_var,
+            "day_candle_filter": self.day_candle_filter_var,
+            "exclude_coins": self.exclude_coins_var,
+            "auto_trade": self.auto_trade_var,
+            "sell_percentage": self.sell_percentage_var,
+            "sell_ratio": self.sell_ratio_var,
+            "investment_ratio": self.investment_ratio_var,
+            "max_coins": self.max_coins_var,
+            "stop_loss": self.stop_loss_var,
+        }
+    
     def setup_settings_trace(self):
-        """설정값 변경 시 자동 저장을 위한 trace 설정"""
-        def save_settings_callback(*args):
-            self.save_current_settings()
-        
-        # 모든 설정 변수에 trace 추가
-        self.interval_var.trace_add("write", save_settings_callback)
-        self.hour_var.trace_add("write", save_settings_callback)
-        self.minute_var.trace_add("write", save_settings_callback)
-        self.end_hour_var.trace_add("write", save_settings_callback)
-        self.end_minute_var.trace_add("write", save_settings_callback)
-        self.price_change_min_var.trace_add("write", save_settings_callback)
-        self.price_change_max_var.trace_add("write", save_settings_callback)
-        self.volume_change_min_var.trace_add("write", save_settings_callback)
-        self.slippage_var.trace_add("write", save_settings_callback)
-        self.max_spread_var.trace_add("write", save_settings_callback)
-        self.day_candle_filter_var.trace_add("write", save_settings_callback)
-        self.exclude_coins_var.trace_add("write", save_settings_callback)
-        self.auto_trade_var.trace_add("write", save_settings_callback)
-        self.sell_percentage_var.trace_add("write", save_settings_callback)
-        self.sell_ratio_var.trace_add("write", save_settings_callback)
-        self.investment_ratio_var.trace_add("write", save_settings_callback)
-        self.max_coins_var.trace_add("write", save_settings_callback)
-        self.stop_loss_var.trace_add("write", save_settings_callback)
+        """설정값 변경 시 자동 저장을 위한 trace 설정 (저장은 SettingsStore가 모아서 백그라운드에서 처리)"""
+        for key, var in self.setting_vars().items():
+            def save_settings_callback(*args, key=key, var=var):
+                try:
+                    self.settings.set_from_input(key, var.get())
+                except tk.TclError:
+                    # BooleanVar 등에서 일시적으로 읽을 수 없는 값
+                    pass
+            var.trace_add("write", save_settings_callback)
+        for error in self.settings.errors:
+            self.logger.log(f"설정 파일: {error}", "WARNING")
     
     def save_current_settings(self):
-        """현재 설정값을 파일에 저장"""
+        """현재 입력값을 설정에 반영하고 즉시 저장"""
         try:
-            settings = {
-                "interval": self.interval_var.get(),
-                "hour": self.hour_var.get(),
-                "minute": self.minute_var.get(),
-                "end_hour": self.end_hour_var.get(),
-                "end_minute": self.end_minute_var.get(),
-                "price_change_min": self.price_change_min_var.get(),
-                "price_change_max": self.price_change_max_var.get(),
-                "volume_change_min": self.volume_change_min_var.get(),
-                "slippage": self.slippage_var.get(),
-                "max_spread": self.max_spread_var.get(),
-                "day_candle_filter": self.day_candle_filter_var.get(),
-                "exclude_coins": self.exclude_coins_var.get(),
-                "auto_trade": self.auto_trade_var.get(),
-                "sell_percentage": self.sell_percentage_var.get(),
-                "sell_ratio": self.sell_ratio_var.get(),
-                "investment_ratio": self.investment_ratio_var.get(),
-                "max_coins": self.max_coins_var.get(),
-                "stop_loss": self.stop_loss_var.get()
-            }
-            save_settings(settings)
+            for key, var in self.setting_vars().items():
+                self.settings.set_from_input(key, var.get())
+            self.settings.flush()
         except Exception as e:
             print(f"설정 저장 오류: {e}")
     
     def on_closing(self):
         """프로그램 종료 시 설정 저장"""
         self.save_current_settings()
+        self.settings.close()
+        self.position_journal.close()
+        self.profit_ledger.close()
+        stop_market_recorder()
         self.root.destroy()
     
+    def recover_positions(self):
+        """재시작 시 저널에서 복원한 보유 코인을 잔고/주문 상태와 대조합니다."""
+        stats = self.position_journal.stats
+        self.logger.log(f"장부 복원: 보유 {len(self.purchased_coins)}개, 매도 기록 {len(self.sold_coins)}개 (이벤트 {stats['replayed_events']}건, {stats['replay_ms']:.1f}ms)", "INFO")
+        try:
+            if self.purchased_coins:
+                upbit = get_upbit_client()
+                if upbit is None:
+                    self.logger.log("API 키를 불러올 수 없어 복원된 보유 코인을 거래소와 대조하지 못했습니다.", "WARNING")
+                else:
+                    # 남아 있는 지정가 매도 주문은 주문 테이블에 등록 (전량 매도 시 취소 대상)
+                    summary = reconcile_positions(upbit, self.purchased_coins, logger=self.logger, order_manager=self.order_manager)
+                    self.logger.log(f"장부 대조 완료: 유지 {len(self.purchased_coins)}개, 제거 {len(summary['removed'])}개, 수량 조정 {len(summary['adjusted'])}개, 주문 추적 해제 {len(summary['orders_cleared'])}개, 주문 등록 {len(summary['orders_registered'])}개", "SUCCESS")
+            # 복원 직후 스냅샷으로 압축 (재시작이 반복되어도 저널이 커지지 않음)
+            self.position_journal.compact()
+        except Exception as e:
+            self.logger.log(f"장부 대조 중 오류: {e}", "ERROR")
+    
     def clear_log(self):
         """로그 지우기"""
         self.logger.clear()
         self.logger.log("로그가 지워졌습니다.", "INFO")
     
     def show_slippage_results(self):
-        """슬리피지 필터링 결과 CSV 파일을 날짜별로 선택해서 표시"""
+        """저장된 슬리피지 필터링 결과를 실행 시각별로 선택해서 표시"""
         import glob
         
         try:
-            # 데이터 저장 디렉토리 (Railway Volume 지원)
-            data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
-            # slippage_results_*.csv 파일 찾기
-            csv_files = glob.glob(os.path.join(data_dir, "slippage_results_*.csv"))
+            store = get_scan_store()
             
-            if not csv_files:
-                self.logger.log("저장된 슬리피지 필터링 결과가 없습니다.", "WARNING")
-                return
-            
-            # 파일명에서 날짜 추출하여 정렬 (최신순)
-            def extract_date(filename):
+            # 이전 버전이 만든 CSV 중 저장소에 없는 것만 한 번 옮김
+            data_dir = os.path.dirname(store.path)
+            for csv_file in glob.glob(os.path.join(data_dir, "slippage_results_*.csv")):
                 try:
-                    # slippage_results_YYYYMMDD_HHMMSS.csv 형식
-                    parts = filename.replace("slippage_results_", "").replace(".csv", "").split("_")
-                    if len(parts) >= 2:
-                        date_str = parts[0]  # YYYYMMDD
-                        time_str = parts[1]  # HHMMSS
-                        return (date_str, time_str)
-                    return ("", "")
-                except:
-                    return ("", "")
+                    store.import_legacy_csv(csv_file)
+                except Exception as e:
+                    self.logger.log(f"이전 슬리피지 결과 파일을 읽지 못했습니다 ({os.path.basename(csv_file)}): {e}", "WARNING")
             
-            # 날짜별로 정렬 (최신순)
-            csv_files.sort(key=lambda x: extract_date(x), reverse=True)
+            # 실행 목록 (최신순, 인덱스 조회)
+            runs = store.list_runs()
+            if not runs:
+                self.logger.log("저장된 슬리피지 필터링 결과가 없습니다.", "WARNING")
+                return
             
-            # 파일 선택 다이얼로그 표시
-            selected_file = self.show_file_selection_dialog(
-                csv_files, 
+            # 실행 선택 다이얼로그 표시 (run_id: YYYYMMDD_HHMMSS)
+            selected_run = self.show_file_selection_dialog(
+                [run['run_id'] for run in runs],
                 "슬리피지 필터링 결과 선택",
                 "표시할 슬리피지 필터링 결과를 선택하세요:"
             )
             
-            if not selected_file:
+            if not selected_run:
                 return
             
-            # CSV 파일 읽기
-            filtered_results = []
-            # 설정창에 입력한 슬리피지 수치 사용
-            try:
-                max_slippage = float(self.slippage_var.get())
-            except (ValueError, AttributeError):
-                max_slippage = 0.3  # 기본값
-            
-            with open(selected_file, 'r', encoding='utf-8-sig') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    filtered_results.append({
-                        'coin': f"KRW-{row['코인']}",
-                        'coin_symbol': row['코인'],
-                        'price_change': float(row['가격변동률'].replace('%', '').replace('+', '')),
-                        'volume_change': float(row['거래량변동률'].replace('%', '').replace('+', '')),
-                        'lowest_ask': float(row['최저매도가'].replace('원', '').replace(',', '')),
-                        'avg_price': float(row['평균매수가'].replace('원', '').replace(',', '')),
-                        'price_diff_pct': float(row['슬리피지'].replace('%', '').replace('+', '').replace('-', '')),
-                        'filled_count': int(row['소진호가수'].replace('개', ''))
-                    })
+            run, filtered_results = store.load_run(selected_run)
+            # 슬리피지 기준이 저장되지 않은 이전 결과는 설정창 값 사용
+            max_slippage = run.get('max_slippage') if run else None
+            if max_slippage is None:
+                try:
+                    max_slippage = float(self.slippage_var.get())
+                except (ValueError, AttributeError):
+                    max_slippage = 0.3  # 기본값
             
             if filtered_results:
-                self.logger.log(f"슬리피지 필터링 결과 표시 중... (파일: {selected_file}, 슬리피지: {max_slippage}%)", "INFO")
-                show_result_popup(self.root, filtered_results, max_slippage, selected_file)
+                self.logger.log(f"슬리피지 필터링 결과 표시 중... (실행: {selected_run}, 슬리피지: {max_slippage}%)", "INFO")
+                show_result_popup(self.root, filtered_results, max_slippage)
             else:
                 self.logger.log("슬리피지 필터링 결과 데이터가 비어있습니다.", "WARNING")
                 
@@ -2912,10 +3312,12 @@ class TradingGUI:
                     show_profit_popup(profit_results)
                     return
             
-            # 2. sold_coins가 비어있으면 CSV 파일에서 불러오기
+            # 2. sold_coins가 비어있으면 수익 장부 또는 이전 CSV 파일에서 불러오기
             # 데이터 저장 디렉토리 (Railway Volume 지원)
             data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
-            csv_files = glob.glob(os.path.join(data_dir, "profit_results_*.csv"))
+            # 수익 장부에 기록이 있는 거래일은 장부에서 바로 집계 (같은 날짜의 CSV보다 우선)
+            ledger_files = {os.path.join(data_dir, f"profit_results_{trade_date}.csv"): trade_date for trade_date in self.profit_ledger.dates()}
+            csv_files = sorted(set(glob.glob(os.path.join(data_dir, "profit_results_*.csv"))) | set(ledger_files))
             
             if not csv_files:
                 self.logger.log("당일 매매 수익률 데이터가 없습니다.", "WARNING")
@@ -2950,23 +3352,26 @@ class TradingGUI:
             if not selected_file:
                 return
             
-            # CSV 파일 읽기
-            with open(selected_file, 'r', encoding='utf-8-sig') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    coin = row['코인']
-                    profit_results.append({
-                        'coin': f"KRW-{coin}",
-                        'buy_price': float(row['매수가'].replace(',', '')),
-                        'sell_price': float(row['매도가'].replace(',', '')),
-                        'buy_amount': float(row['매수금액'].replace(',', '')),
-                        'sell_amount': float(row['매도금액'].replace(',', '')),
-                        'profit_pct': float(row['수익률'].replace('%', '')),
-                        'profit_amount': float(row['수익금액'].replace(',', ''))
-                    })
+            # 수익 장부 또는 CSV 파일 읽기
+            if selected_file in ledger_files:
+                profit_results = self.profit_ledger.daily_results(ledger_files[selected_file])
+            else:
+                with open(selected_file, 'r', encoding='utf-8-sig') as csvfile:
+                    reader = csv.DictReader(csvfile)
+                    for row in reader:
+                        coin = row['코인']
+                        profit_results.append({
+                            'coin': f"KRW-{coin}",
+                            'buy_price': float(row['매수가'].replace(',', '')),
+                            'sell_price': float(row['매도가'].replace(',', '')),
+                            'buy_amount': float(row['매수금액'].replace(',', '')),
+                            'sell_amount': float(row['매도금액'].replace(',', '')),
+                            'profit_pct': float(row['수익률'].replace('%', '')),
+                            'profit_amount': float(row['수익금액'].replace(',', ''))
+                        })
             
             if profit_results:
-                self.logger.log(f"CSV 파일에서 수익률 데이터 불러옴: {selected_file}", "INFO")
+                self.logger.log(f"수익률 데이터 불러옴: {selected_file}", "INFO")
                 self.logger.log(f"당일 매매 수익률 표시 중... (총 {len(profit_results)}개 코인)", "INFO")
                 show_profit_popup(profit_results)
             else:
@@ -3086,74 +3491,25 @@ class TradingGUI:
         
         return selected_file[0] if selected_file[0] else None
     
-    def save_profit_results_to_csv(self, profit_results=None):
-        """수익률 결과를 CSV 파일로 저장 (당일 데이터 업데이트 또는 새로 저장)"""
+    def record_profit_fill(self, coin, reason, volume, buy_price, sell_price, buy_amount, sell_amount):
+        """매도 체결 1건을 수익 장부(profit_ledger.db)에 추가 (CSV는 export_profit_results_csv로 생성)"""
         try:
-            # profit_results가 없으면 sold_coins에서 생성
-            if profit_results is None:
-                profit_results = []
-                for coin, info in self.sold_coins.items():
-                    profit_results.append({
-                        'coin': coin,
-                        'buy_price': info.get('buy_price', 0),
-                        'sell_price': info.get('sell_price', 0),
-                        'buy_amount': info.get('buy_amount', 0),
-                        'sell_amount': info.get('sell_amount', 0),
-                        'profit_pct': info.get('profit_pct', 0),
-                        'profit_amount': info.get('profit_amount', 0)
-                    })
-            
-            if not profit_results:
-                return
-            
-            # 데이터 저장 디렉토리 (Railway Volume 지원)
-            data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
-            
-            # 당일 날짜로 파일명 생성 (같은 날짜면 덮어쓰기)
-            today = get_kst_now().strftime("%Y%m%d")
-            csv_filename = os.path.join(data_dir, f"profit_results_{today}.csv")
-            
-            # 기존 파일이 있으면 읽어서 병합 (같은 코인은 최신 데이터로 업데이트)
-            existing_data = {}
-            if os.path.exists(csv_filename):
-                try:
-                    with open(csv_filename, 'r', encoding='utf-8-sig') as csvfile:
-                        reader = csv.DictReader(csvfile)
-                        for row in reader:
-                            coin = row['코인']
-                            existing_data[coin] = row
-                except:
-                    pass
-            
-            # 새 데이터로 업데이트
-            for result in profit_results:
-                coin = result.get('coin', '').replace("KRW-", "")
-                existing_data[coin] = {
-                    '코인': coin,
-                    '매수가': f"{result.get('buy_price', 0):,.2f}",
-                    '매도가': f"{result.get('sell_price', 0):,.2f}",
-                    '매수금액': f"{result.get('buy_amount', 0):,.0f}",
-                    '매도금액': f"{result.get('sell_amount', 0):,.0f}",
-                    '수익률': f"{result.get('profit_pct', 0):.2f}%",
-                    '수익금액': f"{result.get('profit_amount', 0):,.0f}"
-                }
-            
-            # CSV 파일로 저장
-            with open(csv_filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['코인', '매수가', '매도가', '매수금액', '매도금액', '수익률', '수익금액']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for coin_data in existing_data.values():
-                    writer.writerow(coin_data)
-            
-            self.logger.log(f"수익률 데이터 CSV 저장 완료: {csv_filename}", "SUCCESS")
+            self.profit_ledger.record_fill(coin, reason, volume, buy_price, sell_price, buy_amount, sell_amount)
+        except Exception as e:
+            self.logger.log(f"수익 장부 기록 오류 ({coin}): {e}", "ERROR")
+    
+    def export_profit_results_csv(self, trade_date=None):
+        """수익 장부의 거래일 코인별 합계를 profit_results_YYYYMMDD.csv로 저장 (기본: 오늘)"""
+        try:
+            csv_filename = self.profit_ledger.export_csv(trade_date)
+            if csv_filename:
+                self.logger.log(f"수익률 데이터 CSV 저장 완료: {csv_filename}", "SUCCESS")
+            return csv_filename
         except Exception as e:
             self.logger.log(f"수익률 데이터 CSV 저장 오류: {e}", "ERROR")
             import traceback
             traceback.print_exc()
+            return None
     
     def check_popup_queue(self):
         """팝업창 큐를 주기적으로 확인하여 팝업창 표시"""
@@ -3175,8 +3531,16 @@ class TradingGUI:
         # 100ms 후 다시 확인
         self.root.after(100, self.check_popup_queue)
     
+    @staticmethod
+    def _flatten_result(report, return_sell_price=False):
+        """flatten 결과(report)를 (성공 여부, 매도 가격, 매도 금액) 형식으로 변환"""
+        success = bool(report and report['success'])
+        if return_sell_price:
+            return (success, report['avg_price'], report['funds']) if success else (False, None, 0)
+        return success
+    
     def cancel_all_orders_and_sell_all(self, coin, logger=None, return_sell_price=False):
-        """특정 코인의 모든 미체결 주문 취소 후 전량 매도
+        """특정 코인의 모든 미체결 주문 취소 후 전량 매도 (order_execution.flatten 사용)
         
         Args:
             coin: 코인 티커 (예: "KRW-BTC")
@@ -3187,140 +3551,211 @@ class TradingGUI:
             return_sell_price가 False: 성공 여부 (bool)
             return_sell_price가 True: (성공 여부, 매도 가격, 매도 금액) 튜플
         """
+        coin_symbol = coin.replace("KRW-", "") if coin else "알 수 없음"
         try:
-            coin_symbol = coin.replace("KRW-", "")
-            api_key, secret_key = load_api_keys_from_json()
-            if not api_key or not secret_key:
+            upbit = get_upbit_client()
+            if upbit is None:
                 if logger:
                     logger.log(f"  {coin_symbol}: API 키를 불러올 수 없습니다.", "ERROR")
-                return (False, None) if return_sell_price else False
+                return self._flatten_result(None, return_sell_price)
+            report = flatten(upbit, coin, order_manager=self.order_manager, logger=logger)
+            return self._flatten_result(report, return_sell_price)
+        except Exception as e:
+            if logger:
+                logger.log(f"  {coin_symbol}: 처리 중 오류: {e}", "ERROR")
+            return self._flatten_result(None, return_sell_price)
+    
+    def execute_stop_loss(self, coin, info, current_price, price_drop_pct, reason='손절'):
+        """손절(전량 매도) 실행 (폴링 모니터, WebSocket 실시간 감시, 청산 엔진에서 공통 사용)
+
+        같은 코인에 대해 이미 손절이 진행 중이면 건너뜁니다.
+        reason: 로그와 sold_coins의 매도 사유 (손절, 트레일링 스탑, 보유시간 청산 등)
+
+        Returns:
+            True: 손절 처리 완료 (purchased_coins에서 제거됨)
+            False: 건너뜀 또는 매도 실패/체결 미확인 (purchased_coins 유지)
+        """
+        with self.stop_loss_lock:
+            if coin in self.stop_loss_in_progress or coin not in self.purchased_coins:
+                return False
+            self.stop_loss_in_progress.add(coin)
+            # 호출자가 가진 스냅샷 대신 최신 레코드 사용 (같은 주기의 부분 매도 반영)
+            info = self.purchased_coins.get(coin, info)
+        try:
+            buy_price = info['buy_price']
+            coin_symbol = coin.replace("KRW-", "")
+            self.logger.log(f"⚠️ {reason} 조건 발생: {coin_symbol} (매수가: {buy_price:,.2f}원, 현재가: {current_price:,.2f}원, 하락률: {price_drop_pct:.2f}%)", "WARNING")
+            self.logger.log(f"  {coin_symbol}: 미체결 주문 취소 및 전량 매도 실행 중...", "INFO")
             
-            upbit = pyupbit.Upbit(api_key, secret_key)
+            # 미체결 주문 취소 및 전량 매도 (매도 가격, 매도 금액 반환)
+            result = self.cancel_all_orders_and_sell_all(coin, logger=self.logger, return_sell_price=True)
             
-            # 모든 미체결 주문 조회 및 취소
-            orders = upbit.get_order(coin)
-            if orders:
-                if isinstance(orders, list):
-                    for order in orders:
-                        uuid = order.get('uuid', '')
-                        if uuid:
-                            try:
-                                upbit.cancel_order(uuid)
-                                if logger:
-                                    logger.log(f"  {coin_symbol}: 미체결 주문 취소 (UUID: {uuid[:8]}...)", "INFO")
-                            except Exception as e:
-                                if logger:
-                                    logger.log(f"  {coin_symbol}: 주문 취소 실패: {e}", "ERROR")
-                else:
-                    uuid = orders.get('uuid', '')
-                    if uuid:
-                        try:
-                            upbit.cancel_order(uuid)
-                            if logger:
-                                logger.log(f"  {coin_symbol}: 미체결 주문 취소 (UUID: {uuid[:8]}...)", "INFO")
-                        except Exception as e:
-                            if logger:
-                                logger.log(f"  {coin_symbol}: 주문 취소 실패: {e}", "ERROR")
+            if result and len(result) >= 2:
+                success = result[0]
+                sell_price = result[1] if len(result) > 1 else None
+                sell_amount = result[2] if len(result) > 2 else 0
             
-            time.sleep(1)
+                if success:
+                    self.logger.log(f"  ✅ {coin_symbol}: {reason} 매도 완료", "SUCCESS")
+                
+                    # 매도 가격이 없으면 현재가 사용
+                    if not sell_price:
+                        sell_price = current_price
+                
+                    # 손절된 코인 정보를 sold_coins에 저장 (수익률 계산용)
+                    buy_price = info.get('buy_price', 0)
+                    coin_balance = info.get('coin_balance', 0)  # 프로그램이 매수한 실제 수량
+                
+                    # 프로그램이 매수한 수량만으로 계산
+                    buy_amount = coin_balance * buy_price if coin_balance > 0 and buy_price > 0 else 0
+                
+                    # 매도 금액이 없으면 계산
+                    if sell_amount == 0:
+                        sell_amount = coin_balance * sell_price if coin_balance > 0 and sell_price else 0
+                
+                    # 수익률 계산: 매수가격과 매도가격 기준
+                    profit_pct = ((sell_price / buy_price) - 1) * 100 if buy_price > 0 else 0
+                    profit_amount = sell_amount - buy_amount
+                
+                    def record_sale(existing):
+                        if existing and existing.get('sell_reason') == EXIT_REASONS['take_profit']:
+                            # 단계별 익절로 일부 매도된 코인: 나머지 매도분을 합산
+                            existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount
+                            existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
+                            existing['sell_price'] = sell_price
+                            existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
+                            existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100 if existing['buy_amount'] > 0 else 0
+                            existing['sell_time'] = get_kst_now()
+                            existing['sell_reason'] = f"{existing['sell_reason']}+{reason}"
+                            return existing
+                        return {
+                            'buy_price': buy_price,
+                            'sell_price': sell_price,
+                            'buy_amount': buy_amount,
+                            'sell_amount': sell_amount,
+                            'coin_balance': coin_balance,  # 프로그램이 매수한 실제 수량 저장
+                            'profit_pct': profit_pct,
+                            'profit_amount': profit_amount,
+                            'sell_time': get_kst_now(),
+                            'sell_reason': reason
+                        }
+                    self.sold_coins.modify(coin, record_sale)
+                
+                    # 손절 체결을 수익 장부에 기록
+                    self.record_profit_fill(coin, reason, coin_balance, buy_price, sell_price, buy_amount, sell_amount)
+                
+                    # 처리 완료된 코인 제거 (진행 중 표시를 풀기 전에 제거하여 중복 매도 방지)
+                    self.purchased_coins.pop(coin, None)
+                    return True
+            # 매도 실패/체결 미확인: 보유 코인을 그대로 두어 다음 주기에 다시 시도
+            self.logger.log(f"  ❌ {coin_symbol}: {reason} 매도 실패 (보유 코인 유지)", "ERROR")
+            return False
+        finally:
+            with self.stop_loss_lock:
+                self.stop_loss_in_progress.discard(coin)
+    
+    def execute_exit_signals(self, coin, info, signals):
+        """청산 엔진 신호 처리 (전량 매도 또는 단계별 익절 부분 매도)
+
+        매도가 실패하면 그 신호와 이후 신호를 되돌려(abort_exit) 청산 상태(최고가/익절 단계)를 유지합니다.
+
+        Returns:
+            True: 전량 매도 완료 (purchased_coins에서 제거됨)
+        """
+        for index, signal in enumerate(signals):
+            reason = EXIT_REASONS[signal['reason']]
+            if signal['full']:
+                price_drop_pct = (info['buy_price'] - signal['price']) / info['buy_price'] * 100
+                if self.execute_stop_loss(coin, info, signal['price'], price_drop_pct, reason=reason):
+                    self.exit_engine.confirm_exit(coin)
+                    return True
+                self.exit_engine.abort_exit(coin, signals[index:])
+                return False
+            if self.execute_partial_exit(coin, info, signal['volume'], signal['price'], reason) is None:
+                self.exit_engine.abort_exit(coin, signals[index:])
+                return False
+        return False
+    
+    def execute_partial_exit(self, coin, info, volume, current_price, reason):
+        """단계별 익절 등 부분 시장가 매도 (청산 엔진 신호 처리)
+
+        지정가 익절 주문에 묶인 수량은 제외하고 매도 가능한 수량 한도로 매도합니다.
+
+        Returns:
+            매도 체결 수량 (최소 주문 금액 미만이라 건너뛰면 0, 매도 실패/진행 중이면 None)
+        """
+        coin_symbol = coin.replace("KRW-", "")
+        with self.stop_loss_lock:
+            if coin in self.stop_loss_in_progress or coin not in self.purchased_coins:
+                return None
+            self.stop_loss_in_progress.add(coin)
+            # 호출자가 가진 스냅샷 대신 최신 레코드 사용 (같은 주기의 부분 매도 반영)
+            info = self.purchased_coins.get(coin, info)
+        try:
+            upbit = get_upbit_client()
+            if upbit is None:
+                return None
+            available = float(upbit.get_balance(coin) or 0)
+            volume = min(volume, available, info.get('coin_balance', volume))
+            if volume * current_price < 5000:
+                self.logger.log(f"  {coin_symbol}: {reason} 매도 금액이 최소 주문 금액 미만이라 건너뜀 ({volume * current_price:,.0f}원)", "INFO")
+                return 0
             
-            # 전량 매도
-            coin_balance = upbit.get_balance(coin)
-            if coin_balance and float(coin_balance) > 0:
-                try:
-                    # 매도 전 현재가 확인 (매도 가격 추정용)
-                    current_price = pyupbit.get_current_price(coin)
-                    
-                    sell_result = upbit.sell_market_order(coin, float(coin_balance))
-                    if sell_result:
-                        if logger:
-                            logger.log(f"  {coin_symbol}: 전량 매도 주문 성공 (수량: {coin_balance})", "SUCCESS")
-                        
-                        # 매도 가격 및 매도 금액 확인 (실제 체결 내역에서 가져오기)
-                        sell_price = current_price if current_price else None
-                        sell_amount = 0
-                        sell_quantity = float(coin_balance)
-                        
-                        if sell_result and isinstance(sell_result, dict):
-                            uuid = sell_result.get('uuid', '')
-                            if uuid:
-                                time.sleep(2)  # 체결 대기
-                                try:
-                                    done_orders = upbit.get_order(uuid, state="done")
-                                    if done_orders:
-                                        order = done_orders[0] if isinstance(done_orders, list) else done_orders
-                                        executed_volume = float(order.get('executed_volume', 0))
-                                        
-                                        # 체결 내역(trades)에서 실제 평균 매도가 계산
-                                        if executed_volume > 0:
-                                            trades = order.get('trades', [])
-                                            if trades and len(trades) > 0:
-                                                total_revenue = 0
-                                                total_volume = 0
-                                                for trade in trades:
-                                                    # 업비트 API의 trades 구조: price, volume, funds (체결 금액)
-                                                    trade_price = float(trade.get('price', 0))
-                                                    trade_volume = float(trade.get('volume', 0))
-                                                    trade_funds = float(trade.get('funds', 0))  # 체결 금액 (수수료 포함 전)
-                                                    
-                                                    # funds가 있으면 funds 사용, 없으면 price * volume 사용
-                                                    if trade_funds > 0:
-                                                        total_revenue += trade_funds
-                                                    elif trade_price > 0 and trade_volume > 0:
-                                                        total_revenue += trade_price * trade_volume
-                                                    
-                                                    if trade_volume > 0:
-                                                        total_volume += trade_volume
-                                                
-                                                if total_volume > 0:
-                                                    sell_price = total_revenue / total_volume
-                                                    sell_amount = total_revenue
-                                                    if logger:
-                                                        logger.log(f"  실제 체결 매도가: {sell_price:.4f}원 (체결 수량: {total_volume:.8f})", "INFO")
-                                                else:
-                                                    sell_price = current_price if current_price else None
-                                                    sell_amount = executed_volume * sell_price if sell_price else 0
-                                            else:
-                                                # trades가 없으면 executed_volume과 현재가로 계산
-                                                sell_price = current_price if current_price else None
-                                                sell_amount = executed_volume * sell_price if sell_price else 0
-                                                if logger:
-                                                    logger.log(f"  체결 내역 없음, 현재가 사용: {sell_price:.4f}원", "WARNING")
-                                        else:
-                                            sell_price = current_price if current_price else None
-                                            sell_amount = sell_quantity * sell_price if sell_price else 0
-                                except Exception as e:
-                                    if logger:
-                                        logger.log(f"  매도 체결 가격 조회 오류: {e}", "WARNING")
-                                    sell_price = current_price if current_price else None
-                                    sell_amount = sell_quantity * sell_price if sell_price else 0
-                            else:
-                                sell_price = current_price if current_price else None
-                                sell_amount = sell_quantity * sell_price if sell_price else 0
-                        else:
-                            sell_price = current_price if current_price else None
-                            sell_amount = sell_quantity * sell_price if sell_price else 0
-                        
-                        if return_sell_price:
-                            return (True, sell_price, sell_amount)
-                        return True
-                    else:
-                        if logger:
-                            logger.log(f"  {coin_symbol}: 전량 매도 주문 실패", "ERROR")
-                        return (False, None, 0) if return_sell_price else False
-                except Exception as e:
-                    if logger:
-                        logger.log(f"  {coin_symbol}: 전량 매도 주문 오류: {e}", "ERROR")
-                    return (False, None) if return_sell_price else False
+            self.logger.log(f"💰 {reason} 조건 발생: {coin_symbol} (현재가: {current_price:,.2f}원, 매도 수량: {volume})", "INFO")
+            order, error = _unwrap_order_result(upbit.sell_market_order(coin, volume))
+            if error or not order or not order.get('uuid'):
+                self.logger.log(f"  ❌ {coin_symbol}: {reason} 매도 실패: {error}", "ERROR")
+                return None
+            self.order_manager.record_submit(order, tag='exit', market=coin, side='ask', volume=volume)
+            fill = create_fill_tracker(upbit).wait(order['uuid'], timeout=10)
+            self.order_manager.apply_fill(fill)
+            executed_volume = fill.get('executed_volume') or 0
+            if executed_volume <= 0:
+                self.logger.log(f"  ❌ {coin_symbol}: {reason} 매도 체결 확인 실패", "ERROR")
+                return None
+            sell_price = fill.get('avg_price') or current_price
+            sell_amount = fill.get('funds') or executed_volume * sell_price
+            
+            # 부분 매도 기록 (지정가 익절과 같은 방식으로 sold_coins에 합산)
+            buy_price = info.get('buy_price', 0)
+            buy_amount_for_sold = executed_volume * buy_price
+            def record_sale(existing):
+                if existing:
+                    existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount_for_sold
+                    existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
+                    existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
+                    existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100 if existing['buy_amount'] > 0 else 0
+                    return existing
+                return {
+                    'buy_price': buy_price,
+                    'sell_price': sell_price,
+                    'buy_amount': buy_amount_for_sold,
+                    'sell_amount': sell_amount,
+                    'profit_pct': ((sell_price / buy_price) - 1) * 100 if buy_price > 0 else 0,
+                    'profit_amount': sell_amount - buy_amount_for_sold,
+                    'sell_time': get_kst_now(),
+                    'sell_reason': reason
+                }
+            self.sold_coins.modify(coin, record_sale)
+            
+            remaining_balance = info.get('coin_balance', 0) - executed_volume
+            if remaining_balance * current_price < 5000:
+                self.purchased_coins.pop(coin, None)
             else:
-                if logger:
-                    logger.log(f"  {coin_symbol}: 매도할 수량이 없습니다.", "WARNING")
-                return (False, None) if return_sell_price else False
-        except Exception as e:
-            coin_symbol = coin.replace("KRW-", "") if coin else "알 수 없음"
-            if logger:
-                logger.log(f"  {coin_symbol}: 처리 중 오류: {e}", "ERROR")
-            return (False, None) if return_sell_price else False
+                self.purchased_coins.update_fields(coin, coin_balance=remaining_balance)
+            self.logger.log(f"  ✅ {coin_symbol}: {reason} 완료 ({executed_volume}개, 평균 {sell_price:,.2f}원), 남은 수량 {max(remaining_balance, 0)}개", "SUCCESS")
+            self.record_profit_fill(coin, reason, executed_volume, buy_price, sell_price, buy_amount_for_sold, sell_amount)
+            return executed_volume
+        finally:
+            with self.stop_loss_lock:
+                self.stop_loss_in_progress.discard(coin)
+    
+    def _on_risk_trigger(self, coin, event):
+        """WebSocket 실시간 감시에서 손절 조건 발생 시 호출 (매도 실패 시 False → RiskEngine이 다시 감시)"""
+        info = self.purchased_coins.get(coin)
+        if info:
+            return self.execute_stop_loss(coin, info, event['price'], event['price_drop_pct'])
+        return True
     
     def start_price_monitoring(self, stop_loss_pct):
         """실시간 가격 모니터링 스레드 시작"""
@@ -3331,22 +3766,55 @@ class TradingGUI:
         
         def monitor_prices():
             """실시간 가격 모니터링"""
+            last_stats_log = time.time()
             while not self.monitoring_stop_event.is_set():
                 try:
                     if not self.purchased_coins:
                         time.sleep(5)
                         continue
                     
-                    api_key, secret_key = load_api_keys_from_json()
-                    if not api_key or not secret_key:
+                    upbit = get_upbit_client()
+                    if upbit is None:
                         time.sleep(10)
                         continue
                     
-                    upbit = pyupbit.Upbit(api_key, secret_key)
+                    # WebSocket 감시 대상을 현재 보유 코인으로 갱신
+                    if self.risk_engine:
+                        self.risk_engine.set_positions(self.purchased_coins)
+                    
+                    # 이번 주기의 보유 코인 스냅샷 (다른 스레드의 갱신과 무관하게 일관된 상태, 잠금 없음)
+                    positions = self.purchased_coins.snapshot()
+                    if self.exit_engine:
+                        self.exit_engine.sync(positions)
+                    
+                    # 조회 시각이 된 코인만 확인 (트리거에 가까울수록 자주)
+                    due_positions = {coin: positions[coin] for coin in self.poll_scheduler.due_coins(list(positions))}
+                    
+                    # 지정가 매도 주문 상태를 다건 조회 1회로 확인
+                    sell_order_uuids = [info.get('sell_order_uuid') for info in due_positions.values() if info.get('sell_order_uuid')]
+                    try:
+                        sell_orders = get_orders_by_uuids(upbit, sell_order_uuids)
+                    except Exception as e:
+                        self.logger.log(f"지정가 매도 주문 일괄 조회 실패: {e}", "WARNING")
+                        sell_orders = {}
+                    
+                    # 보유 코인 현재가를 티커 요청 1회로 조회하고 손절 조건을 한 번에 계산
+                    try:
+                        current_prices = fetch_current_prices(list(due_positions.keys()))
+                    except Exception as e:
+                        self.logger.log(f"현재가 일괄 조회 실패: {e}", "WARNING")
+                        current_prices = {}
+                    self.poll_scheduler.record_cycle(requests=(1 if due_positions else 0) + (1 if sell_order_uuids else 0))
+                    stop_loss_coins = find_stop_loss_coins(due_positions, current_prices, stop_loss_pct)
+                    
+                    # 트레일링 스탑/단계별 익절/보유시간 청산: 코인별 상태를 가격 1건당 O(1)로 갱신
+                    exit_signals = {}
+                    if self.exit_engine:
+                        exit_signals = self.exit_engine.evaluate(current_prices)
                     
                     # 매수한 코인들 가격 확인 및 지정가 매도 체결 확인
                     coins_to_remove = []
-                    for coin, info in list(self.purchased_coins.items()):
+                    for coin, info in due_positions.items():
                         if self.monitoring_stop_event.is_set():
                             break
                         
@@ -3357,14 +3825,16 @@ class TradingGUI:
                             sell_order_uuid = info.get('sell_order_uuid')
                             if sell_order_uuid:
                                 try:
-                                    order_info = upbit.get_order(sell_order_uuid)
+                                    order_info = sell_orders.get(sell_order_uuid)
                                     if order_info:
                                         if isinstance(order_info, list):
                                             order_info = order_info[0] if len(order_info) > 0 else None
                                         
                                         if order_info:
-                                            order_state = order_info.get('state', '')
-                                            executed_volume = float(order_info.get('executed_volume', 0))
+                                            # 주문 관리 테이블 갱신 후 로컬 기록 기준으로 판단
+                                            record = self.order_manager.apply_order(order_info) or {}
+                                            order_state = record.get('state', order_info.get('state', ''))
+                                            executed_volume = record.get('executed_volume', float(order_info.get('executed_volume', 0)))
                                             
                                             # 지정가 매도가 완전히 체결된 경우 (done 상태이고 executed_volume > 0)
                                             if order_state == 'done' and executed_volume > 0:
@@ -3374,25 +3844,10 @@ class TradingGUI:
                                                 sell_price = info.get('sell_price_limit', 0)  # 기본값: 지정가
                                                 sell_amount = 0
                                                 
-                                                trades = order_info.get('trades', [])
-                                                if trades and len(trades) > 0:
-                                                    total_revenue = 0
-                                                    total_volume = 0
-                                                    for trade in trades:
-                                                        trade_funds = float(trade.get('funds', 0))
-                                                        trade_volume = float(trade.get('volume', 0))
-                                                        
-                                                        if trade_funds > 0:
-                                                            total_revenue += trade_funds
-                                                        elif float(trade.get('price', 0)) > 0 and trade_volume > 0:
-                                                            total_revenue += float(trade.get('price', 0)) * trade_volume
-                                                        
-                                                        if trade_volume > 0:
-                                                            total_volume += trade_volume
-                                                    
-                                                    if total_volume > 0:
-                                                        sell_price = total_revenue / total_volume
-                                                        sell_amount = total_revenue
+                                                vwap = {'avg_price': record.get('avg_price'), 'funds': record.get('funds', 0)} if record.get('avg_price') else compute_vwap(order_info)
+                                                if vwap['avg_price']:
+                                                    sell_price = vwap['avg_price']
+                                                    sell_amount = vwap['funds']
                                                 
                                                 # 매도 금액이 없으면 계산
                                                 if sell_amount == 0:
@@ -3419,18 +3874,18 @@ class TradingGUI:
                                                     
                                                     # 지정가 익절 정보를 sold_coins에 저장 (부분 매도 기록용)
                                                     # 같은 코인이 이미 sold_coins에 있으면 수익률 정보를 업데이트
-                                                    if coin in self.sold_coins:
-                                                        # 기존 정보에 추가 (여러 번 부분 매도 가능)
-                                                        existing = self.sold_coins[coin]
-                                                        existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount_for_sold
-                                                        existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
-                                                        existing['limit_sell_quantity'] = existing.get('limit_sell_quantity', 0) + limit_sell_quantity
-                                                        # 전체 수익률 재계산
-                                                        if existing['buy_amount'] > 0:
-                                                            existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100
-                                                            existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
-                                                    else:
-                                                        self.sold_coins[coin] = {
+                                                    def record_sale(existing):
+                                                        if existing:
+                                                            # 기존 정보에 추가 (여러 번 부분 매도 가능)
+                                                            existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount_for_sold
+                                                            existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
+                                                            existing['limit_sell_quantity'] = existing.get('limit_sell_quantity', 0) + limit_sell_quantity
+                                                            # 전체 수익률 재계산
+                                                            if existing['buy_amount'] > 0:
+                                                                existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100
+                                                                existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
+                                                            return existing
+                                                        return {
                                                             'buy_price': buy_price,
                                                             'buy_quantity': buy_quantity,
                                                             'limit_sell_price': sell_price,  # 지정가 매도 체결가격
@@ -3442,9 +3897,7 @@ class TradingGUI:
                                                             'sell_time': get_kst_now(),
                                                             'sell_reason': '지정가 익절'
                                                         }
-                                                    
-                                                    # purchased_coins에 지정가 매도 체결 수량 저장
-                                                    info['limit_sell_quantity'] = limit_sell_quantity
+                                                    self.sold_coins.modify(coin, record_sale)
                                                     
                                                     # 남은 수량 계산 및 업데이트
                                                     remaining_balance = buy_quantity - limit_sell_quantity
@@ -3452,95 +3905,90 @@ class TradingGUI:
                                                     if remaining_balance > 0:
                                                         # 남은 수량이 있으면 purchased_coins에서 coin_balance만 업데이트하고 제거하지 않음
                                                         # 지정가 매도 주문 UUID를 제거하여 더 이상 모니터링하지 않도록 함
-                                                        info['coin_balance'] = remaining_balance
-                                                        info['sell_order_uuid'] = None  # 지정가 매도 완료 표시
+                                                        # (지정가 매도 체결 수량과 함께 한 번에 갱신)
+                                                        self.purchased_coins.update_fields(
+                                                            coin,
+                                                            limit_sell_quantity=limit_sell_quantity,
+                                                            coin_balance=remaining_balance,
+                                                            sell_order_uuid=None  # 지정가 매도 완료 표시
+                                                        )
                                                         self.logger.log(f"  {coin_symbol}: 지정가 매도 완료 ({limit_sell_quantity}개), 남은 수량 {remaining_balance}개 (종료시간에 매도 예정)", "INFO")
                                                     else:
                                                         # 남은 수량이 없으면 purchased_coins에서 제거
                                                         coins_to_remove.append(coin)
                                                     
-                                                    # 지정가 익절 시에도 CSV 저장
-                                                    self.save_profit_results_to_csv()
+                                                    # 지정가 익절 체결을 수익 장부에 기록
+                                                    self.record_profit_fill(coin, '지정가 익절', limit_sell_quantity, buy_price, sell_price, buy_amount_for_sold, sell_amount)
                                                     
                                                     continue  # 다음 코인으로
                                 except Exception as e:
                                     # 주문 조회 실패는 무시하고 계속 진행
                                     pass
                             
-                            # 2. 손절 조건 확인
-                            current_price = pyupbit.get_current_price(coin)
-                            if not current_price:
+                            # 2. 손절 조건 확인 (주기 시작 시 일괄 계산한 결과 사용, WebSocket 감시에서 먼저 처리했으면 건너뜀)
+                            stop_loss = stop_loss_coins.get(coin)
+                            if stop_loss and self.execute_stop_loss(coin, info, stop_loss['current_price'], stop_loss['price_drop_pct']):
+                                coins_to_remove.append(coin)
                                 continue
                             
-                            buy_price = info['buy_price']
-                            price_drop_pct = ((buy_price - current_price) / buy_price) * 100
-                            
-                            # 손절 조건 확인
-                            if price_drop_pct >= stop_loss_pct:
-                                coin_symbol = coin.replace("KRW-", "")
-                                self.logger.log(f"⚠️ 손절 조건 발생: {coin_symbol} (매수가: {buy_price:,.2f}원, 현재가: {current_price:,.2f}원, 하락률: {price_drop_pct:.2f}%)", "WARNING")
-                                self.logger.log(f"  {coin_symbol}: 미체결 주문 취소 및 전량 매도 실행 중...", "INFO")
-                                
-                                # 미체결 주문 취소 및 전량 매도 (매도 가격, 매도 금액 반환)
-                                result = self.cancel_all_orders_and_sell_all(coin, logger=self.logger, return_sell_price=True)
-                                
-                                if result and len(result) >= 2:
-                                    success = result[0]
-                                    sell_price = result[1] if len(result) > 1 else None
-                                    sell_amount = result[2] if len(result) > 2 else 0
-                                    
-                                    if success:
-                                        self.logger.log(f"  ✅ {coin_symbol}: 손절 매도 완료", "SUCCESS")
-                                        
-                                        # 매도 가격이 없으면 현재가 사용
-                                        if not sell_price:
-                                            sell_price = current_price
-                                        
-                                        # 손절된 코인 정보를 sold_coins에 저장 (수익률 계산용)
-                                        buy_price = info.get('buy_price', 0)
-                                        coin_balance = info.get('coin_balance', 0)  # 프로그램이 매수한 실제 수량
-                                        
-                                        # 프로그램이 매수한 수량만으로 계산
-                                        buy_amount = coin_balance * buy_price if coin_balance > 0 and buy_price > 0 else 0
-                                        
-                                        # 매도 금액이 없으면 계산
-                                        if sell_amount == 0:
-                                            sell_amount = coin_balance * sell_price if coin_balance > 0 and sell_price else 0
-                                        
-                                        # 수익률 계산: 매수가격과 매도가격 기준
-                                        profit_pct = ((sell_price / buy_price) - 1) * 100 if buy_price > 0 else 0
-                                        profit_amount = sell_amount - buy_amount
-                                        
-                                        self.sold_coins[coin] = {
-                                            'buy_price': buy_price,
-                                            'sell_price': sell_price,
-                                            'buy_amount': buy_amount,
-                                            'sell_amount': sell_amount,
-                                            'coin_balance': coin_balance,  # 프로그램이 매수한 실제 수량 저장
-                                            'profit_pct': profit_pct,
-                                            'profit_amount': profit_amount,
-                                            'sell_time': get_kst_now(),
-                                            'sell_reason': '손절'
-                                        }
-                                        
-                                        # 손절 시에도 CSV 저장 (당일 데이터 업데이트)
-                                        self.save_profit_results_to_csv()
-                                    
-                                    coins_to_remove.append(coin)
-                                else:
-                                    self.logger.log(f"  ❌ {coin_symbol}: 손절 매도 실패", "ERROR")
+                            # 3. 청산 엔진 신호 (전량 매도 또는 단계별 익절 부분 매도)
+                            if exit_signals.get(coin) and self.execute_exit_signals(coin, info, exit_signals[coin]):
+                                coins_to_remove.append(coin)
                         except Exception as e:
                             self.logger.log(f"  {coin}: 가격 확인 중 오류: {e}", "ERROR")
+                            if self.exit_engine:
+                                self.exit_engine.abort_exit(coin)
                     
                     # 처리 완료된 코인 제거
                     for coin in coins_to_remove:
                         self.purchased_coins.pop(coin, None)
                     
-                    time.sleep(5)  # 5초마다 확인
+                    # 트리거까지의 거리와 변동성으로 코인별 다음 조회 시각 결정
+                    for coin, current_price in current_prices.items():
+                        info = self.purchased_coins.get(coin)
+                        if not info or not info.get('buy_price'):
+                            continue
+                        stop_prices = [quantize(info['buy_price'] * (1 - stop_loss_pct / 100), 'floor')]
+                        take_profit_prices = [info.get('sell_price_limit')] if info.get('sell_order_uuid') else []
+                        deadline = None
+                        if self.exit_engine:
+                            exit_stops, exit_take_profits, deadline = self.exit_engine.trigger_levels(coin)
+                            stop_prices.extend(exit_stops)
+                            take_profit_prices.extend(exit_take_profits)
+                        self.poll_scheduler.update(coin, current_price, stop_prices, take_profit_prices, deadline)
+                    
+                    if time.time() - last_stats_log >= MONITOR_STATS_LOG_SEC:
+                        last_stats_log = time.time()
+                        stats = self.poll_scheduler.stats()
+                        nearest = sorted(
+                            (item for item in stats['coins'].items() if item[1]['interval'] is not None),
+                            key=lambda item: item[1]['interval'],
+                        )[:3]
+                        nearest_text = ", ".join(
+                            f"{coin.replace('KRW-', '')} {item['interval']:.1f}초 (트리거까지 {item['distance_pct']:.2f}%)"
+                            for coin, item in nearest if item['distance_pct'] is not None
+                        )
+                        self.logger.log(f"폴링: 요청 {stats['used_rps']:.2f}/{stats['request_budget']}회/초, 주기 {stats['cycles_per_sec']:.2f}회/초, 최단 간격 {nearest_text or '-'}", "INFO")
+                    
+                    self.monitoring_stop_event.wait(self.poll_scheduler.next_wait())
                 except Exception as e:
                     self.logger.log(f"모니터링 중 오류: {e}", "ERROR")
                     time.sleep(10)
         
+        # 트레일링 스탑/단계별 익절/보유시간 청산 (설정 파일의 exit_rules, 고정 손절은 위 손절% 사용)
+        exit_rules = parse_exit_rules(self.settings.get("exit_rules"))
+        self.exit_engine = ExitEngine(**exit_rules) if has_exit_rules(exit_rules) else None
+        if self.exit_engine:
+            self.logger.log(f"청산 규칙: 트레일링 스탑 {exit_rules['trailing_stop_pct']}% (활성화 +{exit_rules['trailing_activation_pct']}%), 단계별 익절 {exit_rules['take_profit_levels']}, 최대 보유 {exit_rules['max_hold_minutes']}분", "INFO")
+        
+        # 코인별 폴링 간격 (트리거까지의 거리/변동성 기반, 요청 예산 내)
+        self.poll_scheduler = PollScheduler(request_budget=MONITOR_REQUEST_BUDGET, min_interval=MONITOR_MIN_INTERVAL_SEC, max_interval=MONITOR_MAX_INTERVAL_SEC)
+        
+        # 체결가 WebSocket으로 틱마다 손절 조건 확인 (REST 폴링은 지정가 체결 확인 및 예비 손절용)
+        self.risk_engine = RiskEngine(self._on_risk_trigger, stop_loss_pct=stop_loss_pct, logger=self.logger)
+        self.risk_engine.set_positions(self.purchased_coins)
+        self.risk_engine.start()
+        
         self.monitoring_thread = threading.Thread(target=monitor_prices, daemon=True)
         self.monitoring_thread.start()
         self.logger.log("실시간 가격 모니터링 시작 (손절%: {}%)".format(stop_loss_pct), "INFO")
@@ -3583,66 +4031,65 @@ class TradingGUI:
                             self.logger.log(f"종료 시간 ({self.end_hour:02d}:{self.end_minute:02d}): 당일 매수 코인 전량 매도 실행", "WARNING")
                             self.logger.log("=" * 60, "INFO")
                             
-                            api_key, secret_key = load_api_keys_from_json()
-                            if api_key and secret_key:
-                                upbit = pyupbit.Upbit(api_key, secret_key)
-                                
+                            upbit = get_upbit_client()
+                            if upbit is not None:
                                 # 수익률 계산을 위한 결과 리스트 (손절된 코인 포함)
                                 profit_results = []
                                 coins_to_remove = []
                                 
-                                # 1. 아직 매도되지 않은 코인들 전량 매도
+                                # 1. 아직 매도되지 않은 코인들 전량 매도 (미체결 주문 일괄 취소 → 병렬 매도 → 체결 일괄 확인)
+                                flatten_reports = {}
+                                if self.purchased_coins:
+                                    self.logger.log(f"  미체결 주문 취소 및 전량 매도 실행 중... ({len(self.purchased_coins)}개)", "INFO")
+                                    flatten_reports = flatten_many(upbit, list(self.purchased_coins.keys()), order_manager=self.order_manager, limiter=RateLimiter(ORDER_API_RATE_PER_SEC), logger=self.logger)
+                                
                                 for coin, info in list(self.purchased_coins.items()):
                                     coin_symbol = coin.replace("KRW-", "")
-                                    self.logger.log(f"  {coin_symbol}: 미체결 주문 취소 및 전량 매도 실행 중...", "INFO")
                                     
                                     buy_price = info.get('buy_price', 0)
                                     buy_amount = info.get('buy_amount', 0)
                                     
-                                    # 전량 매도 (매도 가격, 매도 금액 반환)
-                                    result = self.cancel_all_orders_and_sell_all(coin, logger=self.logger, return_sell_price=True)
+                                    # 전량 매도 결과 (매도 가격, 매도 금액)
+                                    success, sell_price, sell_amount = self._flatten_result(flatten_reports.get(coin), return_sell_price=True)
                                     
-                                    if result and len(result) >= 2:
-                                        success = result[0]
-                                        sell_price = result[1] if len(result) > 1 else None
-                                        sell_amount = result[2] if len(result) > 2 else 0
+                                    if success:
+                                        self.logger.log(f"  ✅ {coin_symbol}: 전량 매도 완료", "SUCCESS")
                                         
-                                        if success:
-                                            self.logger.log(f"  ✅ {coin_symbol}: 전량 매도 완료", "SUCCESS")
-                                            
-                                            # 매도 가격이 없으면 현재가 사용
-                                            if not sell_price:
-                                                sell_price = pyupbit.get_current_price(coin) or buy_price
-                                            
-                                            # 프로그램이 매수한 수량만으로 계산
-                                            coin_balance = info.get('coin_balance', 0)  # 프로그램이 매수한 실제 수량
-                                            buy_price = info.get('buy_price', 0)
-                                            
-                                            # 프로그램이 매수한 수량만으로 매수금액 계산
-                                            buy_amount = coin_balance * buy_price if coin_balance > 0 and buy_price > 0 else 0
-                                            
-                                            # 매도 금액이 없으면 계산
-                                            if sell_amount == 0:
-                                                sell_amount = coin_balance * sell_price if coin_balance > 0 and sell_price else 0
-                                            
-                                            # 수익률 계산: 매수가격과 매도가격 기준
-                                            profit_pct = ((sell_price / buy_price) - 1) * 100 if buy_price > 0 else 0
-                                            profit_amount = sell_amount - buy_amount
+                                        # 매도 가격이 없으면 현재가 사용
+                                        if not sell_price:
+                                            sell_price = pyupbit.get_current_price(coin) or buy_price
+                                        
+                                        # 프로그램이 매수한 수량만으로 계산
+                                        coin_balance = info.get('coin_balance', 0)  # 프로그램이 매수한 실제 수량
+                                        buy_price = info.get('buy_price', 0)
+                                        
+                                        # 프로그램이 매수한 수량만으로 매수금액 계산
+                                        buy_amount = coin_balance * buy_price if coin_balance > 0 and buy_price > 0 else 0
+                                        
+                                        # 매도 금액이 없으면 계산
+                                        if sell_amount == 0:
+                                            sell_amount = coin_balance * sell_price if coin_balance > 0 and sell_price else 0
+                                        
+                                        # 수익률 계산: 매수가격과 매도가격 기준
+                                        profit_pct = ((sell_price / buy_price) - 1) * 100 if buy_price > 0 else 0
+                                        profit_amount = sell_amount - buy_amount
+                                        
+                                        self.record_profit_fill(coin, '종료시간', coin_balance, buy_price, sell_price, buy_amount, sell_amount)
                                         
                                         # sold_coins에 저장 (지정가 매도 정보가 있으면 병합)
-                                        if coin in self.sold_coins:
-                                            # 기존 지정가 매도 정보와 병합
-                                            existing = self.sold_coins[coin]
-                                            existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount
-                                            existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
-                                            existing['coin_balance'] = existing.get('coin_balance', 0) + coin_balance
-                                            # 전체 수익률 재계산
-                                            if existing['buy_amount'] > 0:
-                                                existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100
-                                                existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
-                                            existing['sell_reason'] = existing.get('sell_reason', '') + ', 종료시간'
-                                        else:
-                                            self.sold_coins[coin] = {
+                                        def record_sale(existing):
+                                            if existing:
+                                                # 기존 지정가 매도 정보와 병합
+                                                existing['buy_amount'] = existing.get('buy_amount', 0) + buy_amount
+                                                existing['sell_amount'] = existing.get('sell_amount', 0) + sell_amount
+                                                existing['coin_balance'] = existing.get('coin_balance', 0) + coin_balance
+                                                # 전체 수익률 재계산
+                                                if existing['buy_amount'] > 0:
+                                                    existing['profit_pct'] = ((existing['sell_amount'] / existing['buy_amount']) - 1) * 100
+                                                    existing['profit_amount'] = existing['sell_amount'] - existing['buy_amount']
+                                                existing['sell_reason'] = existing.get('sell_reason', '') + ', 종료시간'
+                                                return existing
+                                            return {
                                                 'buy_price': buy_price,
                                                 'sell_price': sell_price,
                                                 'buy_amount': buy_amount,
@@ -3653,6 +4100,7 @@ class TradingGUI:
                                                 'sell_time': get_kst_now(),
                                                 'sell_reason': '종료시간'
                                             }
+                                        self.sold_coins.modify(coin, record_sale)
                                         
                                         profit_results.append({
                                             'coin': coin,
@@ -3666,7 +4114,8 @@ class TradingGUI:
                                         
                                         coins_to_remove.append(coin)
                                     else:
-                                        self.logger.log(f"  ❌ {coin_symbol}: 전량 매도 실패", "ERROR")
+                                        # 매도 실패/체결 미확인: 장부에 남겨 두고 다시 시도할 수 있도록 함
+                                        self.logger.log(f"  ❌ {coin_symbol}: 전량 매도 실패 (보유 코인 유지)", "ERROR")
                                 
                                 # 처리 완료된 코인 제거
                                 for coin in coins_to_remove:
@@ -3689,6 +4138,12 @@ class TradingGUI:
                                 
                                 self.logger.log("=" * 60, "INFO")
                                 self.logger.log(f"종료 시간 ({self.end_hour:02d}:{self.end_minute:02d}) 전량 매도 완료", "SUCCESS")
+                                bought = self.order_manager.total_filled(side='bid')
+                                sold = self.order_manager.total_filled(side='ask')
+                                self.logger.log(f"당일 체결 합계: 매수 {bought['count']}건 {bought['funds']:,.0f}원 / 매도 {sold['count']}건 {sold['funds']:,.0f}원", "INFO")
+                                for ledger in (self.purchased_coins, self.sold_coins):
+                                    stats = ledger.lock_stats()
+                                    self.logger.log(f"{ledger.name} 잠금: 쓰기 {stats['writes']}회, 경합 {stats['contended']}회 (대기 합계 {stats['wait_total_ms']:.1f}ms, 최대 {stats['wait_max_ms']:.1f}ms)", "INFO")
                                 self.logger.log("=" * 60, "INFO")
                                 
                                 # 수익률 팝업창 표시 (손절 포함 모든 코인)
@@ -3696,8 +4151,8 @@ class TradingGUI:
                                     self.logger.log(f"수익률 팝업창 표시 중... (총 {len(profit_results)}개 코인)", "INFO")
                                     show_profit_popup(profit_results)
                                     
-                                    # CSV 파일로 저장 (수익률 보기 버튼에서 불러오기 위해)
-                                    self.save_profit_results_to_csv(profit_results)
+                                    # 수익 장부의 당일 합계를 CSV 파일로 저장
+                                    self.export_profit_results_csv()
                                     
                                     # sold_coins 초기화 (다음 날을 위해)
                                     self.sold_coins.clear()
@@ -0,0 +1,119 @@
+"""
+호가 깊이 기반 매수 금액 배분
+
+5단계에서 받은 매도호가 스냅샷(asks)으로 코인별 "슬리피지 max_slippage% 이내로
+살 수 있는 최대 금액(capacity)"을 구하고, 총 투자 금액을 capacity 한도 안에서
+최대한 고르게 배분합니다 (얕은 호가에서 남는 금액은 깊은 호가 코인으로 재배분).
+최소 주문 금액에 못 미쳐 제외되는 코인의 금액도 나머지 코인으로 재배분합니다.
+
+모든 후보 코인을 (코인 × 호가 단계) 배열 하나로 만들어 한 번에 계산합니다.
+"""
+import numpy as np
+
+from tick_size import quantize
+
+MIN_ORDER_KRW = 5000
+
+
+def build_depth_arrays(coin_list):
+    """코인별 asks [(가격, 수량), ...]를 (코인 수 × 최대 호가 단계) 가격/수량 배열로 만듭니다.
+
+    호가 단계가 적은 코인은 가격 0, 수량 0으로 채웁니다.
+    """
+    ladders = [coin_info.get('asks') or [] for coin_info in coin_list]
+    levels = max((len(ladder) for ladder in ladders), default=0)
+    prices = np.zeros((len(ladders), max(levels, 1)))
+    sizes = np.zeros_like(prices)
+    for i, ladder in enumerate(ladders):
+        if ladder:
+            ladder = np.asarray(ladder, dtype=float)
+            prices[i, :len(ladder)] = ladder[:, 0]
+            sizes[i, :len(ladder)] = ladder[:, 1]
+    return prices, sizes
+
+
+def slippage_capacity(prices, sizes, max_slippage):
+    """평균 체결가가 최우선 매도호가 대비 max_slippage% 이하가 되는 최대 매수 금액 (코인별, 원)
+
+    호가가 없는 코인은 inf (제한 없음)를 반환합니다.
+    보이는 호가를 모두 소진해도 한도 이내이면 호가 전체 금액을 반환합니다.
+    """
+    level_cost = prices * sizes
+    cum_cost = np.cumsum(level_cost, axis=1)
+    cum_qty = np.cumsum(sizes, axis=1)
+    prev_cost = cum_cost - level_cost
+    prev_qty = cum_qty - sizes
+
+    # 한도 가격은 호가 단위로 내림 (IOC 분할 매수의 주문 가격과 동일)
+    best_ask = prices[:, :1]
+    limit = np.maximum(quantize(best_ask * (1 + max_slippage / 100), 'floor'), best_ask)
+
+    # 단계 k에서 추가로 x원을 쓸 때 평균가 <= limit 조건:
+    #   x * (1 - limit / p_k) <= limit * Q_{k-1} - C_{k-1}
+    headroom = limit * prev_qty - prev_cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_max = np.where(prices <= limit, np.inf, headroom / (1 - limit / prices))
+    x_max = np.maximum(x_max, 0)
+    binding = x_max < level_cost
+
+    first = np.argmax(binding, axis=1)
+    rows = np.arange(len(prices))
+    capacity = np.where(binding.any(axis=1), prev_cost[rows, first] + x_max[rows, first], cum_cost[:, -1])
+    return np.where(best_ask[:, 0] > 0, capacity, np.inf)
+
+
+def water_fill(capacity, budget):
+    """budget을 capacity 한도 안에서 최대한 균등하게 배분합니다.
+
+    allocation_i = min(capacity_i, level) 이고 합계가 budget이 되도록 level을 정합니다.
+    capacity 합계가 budget보다 작으면 capacity를 그대로 반환합니다 (남는 금액은 미사용).
+    """
+    n = len(capacity)
+    if n == 0 or budget <= 0:
+        return np.zeros(n)
+    finite = np.where(np.isfinite(capacity), capacity, budget)
+    if finite.sum() <= budget:
+        return finite.copy()
+
+    order = np.sort(finite)
+    filled_below = np.concatenate(([0.0], np.cumsum(order)[:-1]))
+    remaining = np.arange(n, 0, -1)
+    # level = order[k]일 때 배분 합계가 budget 이상이 되는 첫 k
+    k = np.argmax(filled_below + remaining * order >= budget)
+    level = (budget - filled_below[k]) / remaining[k]
+    return np.minimum(finite, level)
+
+
+def allocate_by_depth(coin_list, total_budget, max_slippage, min_order=MIN_ORDER_KRW):
+    """코인별 매수 금액을 호가 깊이에 맞춰 배분합니다.
+
+    Args:
+        coin_list: 5단계 결과 리스트 (coin, asks 포함)
+        total_budget: 총 투자 금액 (원)
+        max_slippage: 허용 슬리피지 (%)
+        min_order: 최소 주문 금액 (capacity 또는 배분액이 이보다 작은 코인은 제외하고 그 금액을 재배분)
+
+    Returns:
+        {coin: {'amount', 'capacity'}} (amount가 0이면 매수 제외)
+    """
+    if not coin_list:
+        return {}
+    prices, sizes = build_depth_arrays(coin_list)
+    capacity = slippage_capacity(prices, sizes, max_slippage)
+
+    # 배분액이 최소 주문 금액에 못 미치는 코인은 하나씩 빼고 그 금액을 나머지 코인에 다시 배분
+    # (배분액이 가장 작은 코인부터, 같으면 목록 뒤쪽(후순위) 코인부터)
+    eligible = capacity >= min_order
+    while True:
+        amounts = np.zeros(len(coin_list))
+        amounts[eligible] = water_fill(capacity[eligible], total_budget)
+        small = np.flatnonzero(eligible & (amounts < min_order))
+        if len(small) == 0:
+            break
+        drop = small[np.lexsort((-small, amounts[small]))[0]]
+        eligible[drop] = False
+
+    return {
+        coin_info['coin']: {'amount': float(amount), 'capacity': float(cap)}
+        for coin_info, amount, cap in zip(coin_list, amounts, capacity)
+    }
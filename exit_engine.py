@@ -0,0 +1,246 @@
+"""
+청산 엔진 (트레일링 스탑 / 단계별 익절 / 보유시간 청산)
+
+보유 코인별 상태(최고가, 트레일링 스탑 가격, 다음 익절 단계, 청산 기한)를 유지하며
+가격 1건마다 O(1)로 갱신합니다. 최고가는 가격이 들어올 때마다 갱신만 하므로
+과거 가격 이력을 다시 계산하지 않습니다.
+
+- 고정 손절: 매수가 대비 stop_loss_pct% 하락 시 전량 매도
+- 트레일링 스탑: 최고가가 매수가 대비 trailing_activation_pct% 이상 오른 뒤,
+                최고가 대비 trailing_stop_pct% 하락 시 전량 매도
+- 단계별 익절: take_profit_levels [[상승률%, 매도 비율], ...] - 원래 수량 대비 비율만큼 시장가 매도
+- 보유시간 청산: 매수 후 max_hold_minutes분이 지나면 전량 매도
+- 전량 매도 신호 후에는 상태를 '청산 중'으로 두고, 호출자가 매도 결과에 따라
+  confirm_exit(체결 확인 → 상태 해제) 또는 abort_exit(실패 → 최고가/익절 단계 그대로 복원)를 호출
+
+설정 파일(trading_config.json)의 "exit_rules" 항목으로 지정합니다:
+    "exit_rules": {"trailing_stop_pct": 2, "trailing_activation_pct": 1,
+                   "take_profit_levels": [[2, 0.3], [4, 0.3]], "max_hold_minutes": 120}
+"""
+import threading
+import time
+
+from tick_size import quantize
+
+DEFAULT_EXIT_RULES = {
+    'trailing_stop_pct': None,
+    'trailing_activation_pct': 0.0,
+    'take_profit_levels': [],
+    'max_hold_minutes': None,
+}
+
+EXIT_REASONS = {
+    'stop_loss': '손절',
+    'trailing_stop': '트레일링 스탑',
+    'take_profit': '단계별 익절',
+    'time_exit': '보유시간 청산',
+}
+
+
+def _optional_float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def parse_exit_rules(rules):
+    """설정 파일의 exit_rules 값을 ExitEngine 인자로 정리합니다.
+
+    문자열 값(GUI 입력값)도 허용하며, 빈 값은 사용 안 함(None)으로 처리합니다.
+    take_profit_levels는 [[상승률%, 매도 비율], ...] 또는 "2:0.3,4:0.3" 형식입니다.
+    """
+    parsed = dict(DEFAULT_EXIT_RULES)
+    for key, value in (rules or {}).items():
+        if key not in parsed:
+            continue
+        if key == 'take_profit_levels':
+            if isinstance(value, str):
+                value = [item.split(":") for item in value.split(",") if item.strip()]
+            parsed[key] = sorted([float(pct), float(ratio)] for pct, ratio in value)
+        elif key == 'trailing_activation_pct':
+            parsed[key] = _optional_float(value) or 0.0
+        else:
+            parsed[key] = _optional_float(value)
+    return parsed
+
+
+def has_exit_rules(rules):
+    """트레일링 스탑/단계별 익절/보유시간 청산 중 하나라도 설정되어 있으면 True"""
+    return bool(rules.get('trailing_stop_pct') or rules.get('take_profit_levels') or rules.get('max_hold_minutes'))
+
+
+class ExitEngine:
+    """보유 코인별 청산 조건 상태 관리
+
+    Args:
+        stop_loss_pct: 고정 손절 하락률 (%, None이면 사용 안 함)
+        trailing_stop_pct: 최고가 대비 트레일링 스탑 하락률 (%)
+        trailing_activation_pct: 트레일링 스탑을 시작할 최고가 상승률 (%, 0이면 매수 즉시)
+        take_profit_levels: [[상승률%, 매도 비율(원래 수량 대비)], ...]
+        max_hold_minutes: 최대 보유 시간 (분)
+    """
+    def __init__(self, stop_loss_pct=None, trailing_stop_pct=None, trailing_activation_pct=0.0, take_profit_levels=(), max_hold_minutes=None):
+        self.stop_loss_pct = stop_loss_pct
+        self.trailing_stop_pct = trailing_stop_pct
+        self.trailing_activation_pct = trailing_activation_pct or 0.0
+        self.take_profit_levels = sorted([float(pct), float(ratio)] for pct, ratio in take_profit_levels)
+        self.max_hold_minutes = max_hold_minutes
+        self.lock = threading.Lock()
+        self.positions = {}
+
+    # ------------------------------------------------------------------
+    # 포지션
+    # ------------------------------------------------------------------
+    def open(self, coin, buy_price, volume, opened_at=None):
+        """포지션 등록 (같은 코인이 있으면 새로 시작)"""
+        opened_at = time.time() if opened_at is None else opened_at
+        state = {
+            'buy_price': buy_price,
+            'volume': volume,
+            'remaining': volume,
+            'high': buy_price,
+            'stop_price': quantize(buy_price * (1 - self.stop_loss_pct / 100), 'floor') if self.stop_loss_pct else None,
+            'trail_activation_price': buy_price * (1 + self.trailing_activation_pct / 100),
+            'trail_price': None,
+            'level_prices': [quantize(buy_price * (1 + pct / 100), 'ceil') for pct, _ in self.take_profit_levels],
+            'next_level': 0,
+            'opened_at': opened_at,
+            'deadline': opened_at + self.max_hold_minutes * 60 if self.max_hold_minutes else None,
+            'exiting': False,
+        }
+        with self.lock:
+            self.positions[coin] = state
+        return state
+
+    def close(self, coin):
+        with self.lock:
+            return self.positions.pop(coin, None)
+
+    def confirm_exit(self, coin):
+        """전량 매도 체결 확인 후 포지션 해제"""
+        return self.close(coin)
+
+    def abort_exit(self, coin, signals=()):
+        """매도 실패 시 신호 이전 상태로 복원합니다.
+
+        청산 중 표시를 해제하고, 실행하지 못한 단계별 익절 신호(signals)의 수량과 단계를 되돌립니다.
+        최고가/트레일링 스탑 가격은 유지됩니다.
+        """
+        with self.lock:
+            state = self.positions.get(coin)
+            if state is None:
+                return None
+            state['exiting'] = False
+            for signal in signals:
+                if signal.get('reason') != 'take_profit':
+                    continue
+                state['remaining'] = min(state['volume'], state['remaining'] + signal['volume'])
+                state['next_level'] = min(state['next_level'], signal['level'] - 1)
+            return dict(state)
+
+    def get(self, coin):
+        with self.lock:
+            state = self.positions.get(coin)
+            return dict(state) if state else None
+
+    def trigger_levels(self, coin):
+        """다음에 닿을 수 있는 트리거 가격과 청산 기한 (폴링 주기 계산용)
+
+        Returns:
+            ([손절가, 트레일링 스탑 가격 중 설정된 것], [다음 익절 단계 가격], deadline) 또는 ([], [], None)
+        """
+        with self.lock:
+            state = self.positions.get(coin)
+            if state is None:
+                return [], [], None
+            stop_prices = [price for price in (state['stop_price'], state['trail_price']) if price is not None]
+            take_profit_prices = []
+            if state['next_level'] < len(state['level_prices']):
+                take_profit_prices.append(state['level_prices'][state['next_level']])
+            return stop_prices, take_profit_prices, state['deadline']
+
+    def sync(self, positions):
+        """보유 코인(purchased_coins)에 맞춰 포지션을 등록/해제합니다.
+
+        새 코인만 등록하고 기존 코인의 최고가/익절 단계는 유지합니다 (청산 중인 코인 포함).
+        """
+        with self.lock:
+            stale = [coin for coin in self.positions if coin not in positions]
+            for coin in stale:
+                del self.positions[coin]
+            new_coins = [coin for coin in positions if coin not in self.positions]
+        for coin in new_coins:
+            info = positions.get(coin) or {}
+            if not info.get('buy_price'):
+                continue
+            buy_time = info.get('buy_time')
+            opened_at = buy_time.timestamp() if hasattr(buy_time, 'timestamp') else None
+            self.open(coin, info['buy_price'], info.get('buy_quantity') or info.get('coin_balance', 0), opened_at)
+
+    # ------------------------------------------------------------------
+    # 가격 갱신
+    # ------------------------------------------------------------------
+    def on_price(self, coin, price, now=None):
+        """가격 1건으로 상태를 갱신하고 청산 신호를 반환합니다.
+
+        Returns:
+            [{'coin', 'reason', 'price', 'volume', 'full', 'level'}, ...]
+            full=True면 남은 수량 전량 매도, False면 단계별 익절 부분 매도
+            신호를 반환하는 시점에 남은 수량에서 차감되므로 같은 단계가 다시 발생하지 않습니다.
+            전량 매도 신호 후에는 confirm_exit/abort_exit 전까지 신호를 내지 않습니다.
+        """
+        if not price:
+            return []
+        with self.lock:
+            state = self.positions.get(coin)
+            if state is None or state['exiting']:
+                return []
+
+            # 최고가 및 트레일링 스탑 가격 갱신 (새 최고가일 때만)
+            if price > state['high']:
+                state['high'] = price
+            if self.trailing_stop_pct and state['high'] >= state['trail_activation_price']:
+                trail_price = quantize(state['high'] * (1 - self.trailing_stop_pct / 100), 'floor')
+                if state['trail_price'] is None or trail_price > state['trail_price']:
+                    state['trail_price'] = trail_price
+
+            reason = None
+            if state['stop_price'] is not None and price <= state['stop_price']:
+                reason = 'stop_loss'
+            elif state['trail_price'] is not None and price <= state['trail_price']:
+                reason = 'trailing_stop'
+            elif state['deadline'] is not None and (time.time() if now is None else now) >= state['deadline']:
+                reason = 'time_exit'
+            if reason:
+                state['exiting'] = True
+                return [{'coin': coin, 'reason': reason, 'price': price, 'volume': state['remaining'], 'full': True, 'level': None}]
+
+            # 단계별 익절: 이번 가격이 넘어선 단계마다 신호 1건 (단계당 한 번만)
+            exits = []
+            levels = self.take_profit_levels
+            while state['next_level'] < len(levels) and price >= state['level_prices'][state['next_level']]:
+                ratio = levels[state['next_level']][1]
+                volume = min(state['remaining'], state['volume'] * ratio)
+                state['next_level'] += 1
+                if volume <= 0:
+                    continue
+                state['remaining'] -= volume
+                exits.append({'coin': coin, 'reason': 'take_profit', 'price': price, 'volume': volume, 'full': False, 'level': state['next_level']})
+            if exits and state['remaining'] <= 1e-12:
+                exits[-1]['full'] = True
+                state['exiting'] = True
+            return exits
+
+    def evaluate(self, prices, now=None):
+        """여러 코인의 가격을 한 번에 반영합니다 (모니터링 주기당 1회).
+
+        Returns:
+            {coin: [청산 신호, ...]} (신호가 있는 코인만)
+        """
+        now = time.time() if now is None else now
+        results = {}
+        for coin, price in prices.items():
+            exits = self.on_price(coin, price, now)
+            if exits:
+                results[coin] = exits
+        return results
@@ -0,0 +1,326 @@
+"""
+업비트 주문 체결 확인 (Fill Tracker)
+
+고정 sleep 후 get_order(uuid, state="done")를 호출하는 대신,
+주문이 종료(done/cancel)되는 즉시 체결을 확인하고 체결 내역(trades)으로 VWAP를 계산합니다.
+
+- PollingFillTracker: 적응형 백오프(50ms → 최대 1초)로 주문 상태 조회
+- MyOrderFillTracker: 업비트 private WebSocket(myOrder) 구독, 시간 초과 시 조회 방식으로 대체
+- LocalOrderSource: 테스트용 로컬 주문 저장소 (pyupbit.Upbit 대신 get_order 제공)
+"""
+import os
+import json
+import time
+import uuid as uuid_lib
+import threading
+
+from upbit_client import get_orders_by_uuids
+
+
+FINAL_STATES = ('done', 'cancel')
+
+
+def compute_vwap(order):
+    """주문 조회 결과에서 체결 평균가(VWAP), 체결 수량, 체결 금액을 계산합니다.
+
+    trades의 funds가 있으면 funds를, 없으면 price * volume을 사용합니다.
+    trades가 없으면 executed_volume과 executed_funds(또는 funds)로 계산합니다.
+
+    Returns:
+        {'avg_price': float 또는 None, 'volume': float, 'funds': float}
+    """
+    total_funds = 0.0
+    total_volume = 0.0
+    for trade in (order or {}).get('trades', []) or []:
+        price = float(trade.get('price', 0) or 0)
+        volume = float(trade.get('volume', 0) or 0)
+        funds = float(trade.get('funds', 0) or 0)
+        if funds > 0:
+            total_funds += funds
+        elif price > 0 and volume > 0:
+            total_funds += price * volume
+        if volume > 0:
+            total_volume += volume
+
+    if total_volume > 0:
+        return {'avg_price': total_funds / total_volume, 'volume': total_volume, 'funds': total_funds}
+
+    executed_volume = float((order or {}).get('executed_volume', 0) or 0)
+    executed_funds = float((order or {}).get('executed_funds', 0) or (order or {}).get('funds', 0) or 0)
+    if executed_volume > 0 and executed_funds > 0:
+        return {'avg_price': executed_funds / executed_volume, 'volume': executed_volume, 'funds': executed_funds}
+    return {'avg_price': None, 'volume': executed_volume, 'funds': executed_funds}
+
+
+def _make_fill(uuid, order, started):
+    """wait() 결과 dict 생성"""
+    vwap = compute_vwap(order) if order else {'avg_price': None, 'volume': 0.0, 'funds': 0.0}
+    state = order.get('state', '') if order else ''
+    return {
+        'uuid': uuid,
+        'state': state,
+        'done': state in FINAL_STATES,
+        'avg_price': vwap['avg_price'],
+        'executed_volume': vwap['volume'],
+        'funds': vwap['funds'],
+        'order': order,
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+    }
+
+
+class PollingFillTracker:
+    """적응형 백오프로 주문 상태를 조회하여 체결을 확인합니다.
+
+    처음에는 짧은 간격으로 조회하고, 체결되지 않으면 간격을 점차 늘립니다.
+    즉시 체결되는 시장가 주문은 첫 조회에서 바로 확인됩니다.
+    """
+    def __init__(self, upbit, initial_interval=0.05, max_interval=1.0, backoff=1.6, limiter=None):
+        self.upbit = upbit
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.limiter = limiter
+
+    def fetch(self, uuid):
+        """주문 1건 조회 (실패 시 None)"""
+        if self.limiter:
+            self.limiter.acquire()
+        try:
+            orders = self.upbit.get_order(uuid)
+        except Exception:
+            return None
+        if not orders:
+            return None
+        order = orders[0] if isinstance(orders, list) else orders
+        if not isinstance(order, dict) or order.get('error'):
+            return None
+        return order
+
+    def wait(self, uuid, timeout=10):
+        """주문이 종료될 때까지 대기 후 체결 정보 반환 (시간 초과 시 마지막 조회 결과, done=False)"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        interval = self.initial_interval
+        order = None
+        while True:
+            latest = self.fetch(uuid)
+            if latest:
+                order = latest
+                if order.get('state') in FINAL_STATES:
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            interval = min(self.max_interval, interval * self.backoff)
+        return _make_fill(uuid, order, started)
+
+    def wait_many(self, uuids, timeout=10):
+        """여러 주문을 함께 대기 {uuid: fill}
+
+        매 조회마다 아직 종료되지 않은 주문 전체를 다건 조회 1회로 확인합니다.
+        """
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        interval = self.initial_interval
+        pending = [u for u in dict.fromkeys(uuids) if u]
+        latest = {}
+        while pending:
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                latest.update(get_orders_by_uuids(self.upbit, pending))
+            except Exception:
+                pass
+            pending = [u for u in pending if latest.get(u, {}).get('state') not in FINAL_STATES]
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            interval = min(self.max_interval, interval * self.backoff)
+        return {u: _make_fill(u, latest.get(u), started) for u in dict.fromkeys(uuids) if u}
+
+    def close(self):
+        pass
+
+
+class MyOrderFillTracker:
+    """업비트 private WebSocket(myOrder)으로 주문 체결 이벤트를 수신합니다.
+
+    각 trade 이벤트의 price/volume을 누적하여 VWAP를 계산하고,
+    done/cancel 이벤트를 받는 즉시 대기 중인 wait()를 깨웁니다.
+    이벤트를 받지 못하면 timeout 후 PollingFillTracker로 확인합니다.
+    """
+    URI = "wss://api.upbit.com/websocket/v1/private"
+
+    def __init__(self, upbit, fallback=None, ws_timeout=3):
+        self.upbit = upbit
+        self.fallback = fallback or PollingFillTracker(upbit)
+        self.ws_timeout = ws_timeout
+        self.orders = {}
+        self.condition = threading.Condition()
+        self.connected = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _auth_headers(self):
+        return self.upbit._request_headers()
+
+    def _run(self):
+        import asyncio
+        try:
+            asyncio.run(self._listen())
+        except Exception as e:
+            print(f"myOrder WebSocket 종료: {e}")
+        finally:
+            self.connected.clear()
+
+    async def _listen(self):
+        import websockets  # pyupbit 의존성
+        while not self.stop_event.is_set():
+            try:
+                headers = self._auth_headers()
+                try:
+                    connection = websockets.connect(self.URI, additional_headers=headers, ping_interval=60)
+                except TypeError:
+                    connection = websockets.connect(self.URI, extra_headers=headers, ping_interval=60)
+                async with connection as websocket:
+                    await websocket.send(json.dumps([{"ticket": str(uuid_lib.uuid4())[:8]}, {"type": "myOrder"}]))
+                    self.connected.set()
+                    while not self.stop_event.is_set():
+                        message = await websocket.recv()
+                        if isinstance(message, bytes):
+                            message = message.decode('utf-8')
+                        self.on_event(json.loads(message))
+            except Exception:
+                self.connected.clear()
+                if self.stop_event.wait(1):
+                    return
+
+    def on_event(self, event):
+        """myOrder 이벤트 1건 반영 (trade 이벤트는 trades에 누적)"""
+        if event.get('type') != 'myOrder' or not event.get('uuid'):
+            return
+        with self.condition:
+            order = self.orders.setdefault(event['uuid'], {'uuid': event['uuid'], 'trades': [], 'state': 'wait'})
+            order['market'] = event.get('code', order.get('market'))
+            order['side'] = event.get('ask_bid', order.get('side'))
+            order['state'] = event.get('state', order['state'])
+            if event.get('state') == 'trade' and event.get('trade_uuid'):
+                order['trades'].append({
+                    'uuid': event.get('trade_uuid'),
+                    'price': event.get('price'),
+                    'volume': event.get('volume'),
+                })
+            if event.get('executed_volume') is not None:
+                order['executed_volume'] = event.get('executed_volume')
+            if event.get('executed_funds') is not None:
+                order['executed_funds'] = event.get('executed_funds')
+            self.condition.notify_all()
+
+    def wait(self, uuid, timeout=10):
+        """주문이 종료될 때까지 이벤트 대기 (WebSocket 미연결 또는 이벤트 없음 → 조회 방식)"""
+        started = time.perf_counter()
+        if not self.connected.is_set():
+            return self.fallback.wait(uuid, timeout=timeout)
+        with self.condition:
+            finished = self.condition.wait_for(
+                lambda: self.orders.get(uuid, {}).get('state') in FINAL_STATES,
+                timeout=min(timeout, self.ws_timeout)
+            )
+            order = dict(self.orders.get(uuid, {})) if finished else None
+        if finished:
+            return _make_fill(uuid, order, started)
+        return self.fallback.wait(uuid, timeout=max(0, timeout - (time.perf_counter() - started)))
+
+    def wait_many(self, uuids, timeout=10):
+        fills = {}
+        deadline = time.monotonic() + timeout
+        for uuid in uuids:
+            fills[uuid] = self.wait(uuid, timeout=max(0, deadline - time.monotonic()))
+        return fills
+
+    def close(self):
+        self.stop_event.set()
+
+
+def create_fill_tracker(upbit, mode=None, limiter=None):
+    """체결 확인기 생성
+
+    mode: "poll"(기본) 또는 "websocket" (None이면 환경 변수 FILL_TRACKER_MODE 사용)
+    """
+    mode = (mode or os.getenv("FILL_TRACKER_MODE", "poll")).strip().lower()
+    polling = PollingFillTracker(upbit, limiter=limiter)
+    if mode in ("ws", "websocket", "myorder") and getattr(upbit, 'access', None):
+        return MyOrderFillTracker(upbit, fallback=polling)
+    return polling
+
+
+class LocalOrderSource:
+    """테스트용 로컬 주문 저장소
+
+    PollingFillTracker에 pyupbit.Upbit 대신 전달하면, add_order()로 등록한 주문이
+    fill_delay 초 후 done(또는 cancel) 상태로 조회됩니다.
+
+    사용 예:
+        source = LocalOrderSource()
+        uuid = source.add_order("KRW-XRP", "bid", trades=[(700, 10), (701, 5)], fill_delay=0.2)
+        fill = PollingFillTracker(source).wait(uuid)
+    """
+    def __init__(self):
+        self.orders = {}
+        self.lock = threading.Lock()
+        self.query_count = 0
+
+    def add_order(self, market, side, trades, fill_delay=0.0, final_state='done', uuid=None):
+        """trades: [(price, volume), ...]"""
+        uuid = uuid or str(uuid_lib.uuid4())
+        with self.lock:
+            self.orders[uuid] = {
+                'uuid': uuid,
+                'market': market,
+                'side': side,
+                'final_state': final_state,
+                'ready_at': time.monotonic() + fill_delay,
+                'trades': [{'price': str(p), 'volume': str(v), 'funds': str(p * v)} for p, v in trades],
+            }
+        return uuid
+
+    def _snapshot(self, stored):
+        filled = time.monotonic() >= stored['ready_at']
+        trades = stored['trades'] if filled else []
+        return {
+            'uuid': stored['uuid'],
+            'market': stored['market'],
+            'side': stored['side'],
+            'state': stored['final_state'] if filled else 'wait',
+            'executed_volume': str(sum(float(t['volume']) for t in trades)),
+            'trades': list(trades),
+        }
+
+    def get_order(self, ticker_or_uuid, state='wait', **kwargs):
+        with self.lock:
+            self.query_count += 1
+            stored = self.orders.get(ticker_or_uuid)
+            return self._snapshot(stored) if stored else None
+
+    def get_orders_by_uuids(self, uuids):
+        with self.lock:
+            self.query_count += 1
+            return {u: self._snapshot(self.orders[u]) for u in uuids if u in self.orders}
+
+    def cancel_orders_by_uuids(self, uuids):
+        result = {'cancelled': [], 'failed': []}
+        with self.lock:
+            self.query_count += 1
+            for u in uuids:
+                stored = self.orders.get(u)
+                if stored and time.monotonic() < stored['ready_at']:
+                    stored['final_state'] = 'cancel'
+                    stored['trades'] = []
+                    stored['ready_at'] = time.monotonic()
+                    result['cancelled'].append(u)
+                else:
+                    result['failed'].append(u)
+        return result
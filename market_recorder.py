@@ -0,0 +1,300 @@
+"""
+시세 데이터 기록기 (스캔 재현/튜닝용)
+
+스캔 중 조회한 시세 응답(코인 목록, 현재가/티커 배치, 1분봉, 호가, 일봉)을 그대로
+DATA_DIR/market_data/YYYYMMDD.mdr 파일에 이어 씁니다(append-only).
+
+- 기록: record()는 큐에 넣기만 하므로 스캔 스레드의 부담이 거의 없음
+        (직렬화/압축/쓰기는 백그라운드 스레드, 큐가 가득 차면 버리고 dropped 증가)
+- 파일 형식: 프레임의 연속. 프레임 = 헤더(FRAME_HEADER) + zlib 압축된 JSON lines
+        헤더: 매직(b'MDR1'), 압축 길이, 레코드 수, 첫/마지막 기록 시각(epoch 초)
+        flush_interval초 동안 모인 레코드를 한 프레임으로 압축하므로 압축률이 좋음
+- 레코드: {'ts', 'scan', 'kind', 'key', 'data'} - scan은 begin_scan()이 정한 스캔 id
+        DataFrame(pyupbit.get_ohlcv 결과)은 {'__dataframe__': {index, columns, data}}로 저장
+- 읽기: MarketDataReader가 파일을 mmap으로 열어 프레임 헤더만 훑고(시각/개수),
+        필요한 프레임만 압축을 풉니다. 마지막 프레임이 기록 도중 잘렸으면 무시합니다.
+
+사용 예:
+    recorder = get_market_recorder()
+    recorder.begin_scan()
+    record_market_data('orderbook', 'KRW-BTC', response.json())
+
+    with MarketDataReader(path) as reader:
+        for record in reader.records(kinds=['orderbook']):
+            ...
+"""
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime
+
+import pytz
+
+KST = pytz.timezone('Asia/Seoul')
+RECORDER_DIRNAME = "market_data"
+FILE_SUFFIX = ".mdr"
+FRAME_MAGIC = b'MDR1'
+# 매직, 압축 길이, 레코드 수, 첫 기록 시각, 마지막 기록 시각
+FRAME_HEADER = struct.Struct('<4sIIdd')
+
+_shared_lock = threading.Lock()
+_shared = {'recorder': None}
+
+
+def default_recorder_dir():
+    data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(data_dir, RECORDER_DIRNAME)
+
+
+def _encode(value):
+    # pyupbit.get_ohlcv 결과 (pandas DataFrame)
+    if hasattr(value, 'to_dict') and hasattr(value, 'index') and hasattr(value, 'columns'):
+        split = value.to_dict(orient='split')
+        split['index'] = [item.isoformat() if hasattr(item, 'isoformat') else item for item in split['index']]
+        return {'__dataframe__': split}
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # numpy 스칼라
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"JSON으로 저장할 수 없는 값: {type(value).__name__}")
+
+
+def decode_dataframe(data):
+    """기록된 DataFrame 값을 pandas DataFrame으로 복원 (DataFrame이 아니면 그대로 반환)"""
+    if not isinstance(data, dict) or '__dataframe__' not in data:
+        return data
+    import pandas as pd
+    split = data['__dataframe__']
+    return pd.DataFrame(split['data'], index=pd.to_datetime(split['index']), columns=split['columns'])
+
+
+class MarketDataRecorder:
+    """시세 응답을 일자별 압축 파일에 기록하는 백그라운드 기록기
+
+    Args:
+        directory: 기록 폴더 (None이면 DATA_DIR/market_data)
+        flush_interval: 프레임 1개로 모아 쓰는 간격 (초)
+        compress_level: zlib 압축 수준 (1~9)
+        max_queue: 기록 대기 최대 건수 (넘으면 버림)
+    """
+    def __init__(self, directory=None, flush_interval=1.0, compress_level=6, max_queue=100_000):
+        self.directory = directory or default_recorder_dir()
+        self.flush_interval = flush_interval
+        self.compress_level = compress_level
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.scan_id = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {'records': 0, 'dropped': 0, 'frames': 0, 'raw_bytes': 0, 'written_bytes': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # 기록 (스캔 스레드)
+    # ------------------------------------------------------------------
+    def begin_scan(self, scan_id=None):
+        """이후 기록에 붙일 스캔 id 지정 (None이면 현재 KST 시각 YYYYMMDD_HHMMSS)"""
+        self.scan_id = scan_id or datetime.now(KST).strftime("%Y%m%d_%H%M%S")
+        return self.scan_id
+
+    def record(self, kind, key, data, ts=None):
+        """응답 1건 기록 (큐에 넣기만 함)
+
+        Args:
+            kind: 데이터 종류 ('tickers', 'current_price', 'ticker', 'minute1', 'orderbook', 'day' 등)
+            key: 마켓 코드 또는 배치 식별자
+            data: 응답 원본 (JSON 값 또는 DataFrame) - 기록 후 수정하지 않아야 함
+        """
+        try:
+            self.queue.put_nowait((time.time() if ts is None else ts, self.scan_id, kind, key, data))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    # ------------------------------------------------------------------
+    # 쓰기 (백그라운드 스레드)
+    # ------------------------------------------------------------------
+    def path_for(self, ts):
+        day = datetime.fromtimestamp(ts, KST).strftime("%Y%m%d")
+        return os.path.join(self.directory, day + FILE_SUFFIX)
+
+    def _drain(self, timeout):
+        items = []
+        try:
+            items.append(self.queue.get(timeout=timeout))
+        except queue.Empty:
+            return items
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _write_frames(self, items):
+        # 일자별로 나눠 파일마다 프레임 1개
+        by_path = {}
+        for item in items:
+            by_path.setdefault(self.path_for(item[0]), []).append(item)
+        os.makedirs(self.directory, exist_ok=True)
+        for path, group in by_path.items():
+            lines = []
+            for ts, scan_id, kind, key, data in group:
+                try:
+                    lines.append(json.dumps({'ts': ts, 'scan': scan_id, 'kind': kind, 'key': key, 'data': data}, ensure_ascii=False, default=_encode))
+                except (TypeError, ValueError):
+                    self.stats['errors'] += 1
+            if not lines:
+                continue
+            raw = "\n".join(lines).encode('utf-8')
+            payload = zlib.compress(raw, self.compress_level)
+            header = FRAME_HEADER.pack(FRAME_MAGIC, len(payload), len(lines), group[0][0], group[-1][0])
+            with open(path, 'ab') as f:
+                # 헤더와 본문을 한 번에 써서 중간에 끊겨도 잘린 프레임은 마지막 하나뿐
+                f.write(header + payload)
+            self.stats['records'] += len(lines)
+            self.stats['frames'] += 1
+            self.stats['raw_bytes'] += len(raw)
+            self.stats['written_bytes'] += len(header) + len(payload)
+
+    def _run(self):
+        while True:
+            items = self._drain(self.flush_interval)
+            if items:
+                # 짧은 간격의 응답을 한 프레임으로 모음
+                deadline = time.time() + self.flush_interval
+                while not self.stop_event.is_set() and time.time() < deadline:
+                    more = self._drain(deadline - time.time())
+                    if not more:
+                        break
+                    items.extend(more)
+                try:
+                    self._write_frames(items)
+                except OSError:
+                    self.stats['errors'] += 1
+            elif self.stop_event.is_set():
+                return
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """남은 기록을 모두 쓰고 종료"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def compression_ratio(self):
+        """원본 대비 기록 크기 (0~1)"""
+        return self.stats['written_bytes'] / self.stats['raw_bytes'] if self.stats['raw_bytes'] else None
+
+
+def get_market_recorder():
+    """프로세스 공용 기록기 (처음 호출 시 백그라운드 스레드 시작)"""
+    with _shared_lock:
+        if _shared['recorder'] is None:
+            _shared['recorder'] = MarketDataRecorder()
+            _shared['recorder'].start()
+        return _shared['recorder']
+
+
+def record_market_data(kind, key, data):
+    """공용 기록기에 응답 1건 기록"""
+    get_market_recorder().record(kind, key, data)
+
+
+def stop_market_recorder():
+    """공용 기록기가 실행 중이면 남은 기록을 쓰고 종료 (프로그램 종료 시)"""
+    with _shared_lock:
+        recorder, _shared['recorder'] = _shared['recorder'], None
+    if recorder is not None:
+        recorder.stop()
+
+
+# ============================================================================
+# 읽기 (mmap)
+# ============================================================================
+
+def list_recordings(directory=None):
+    """기록 파일 목록 (날짜순)"""
+    directory = directory or default_recorder_dir()
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(FILE_SUFFIX))
+
+
+class MarketDataReader:
+    """기록 파일을 mmap으로 읽는 리더
+
+    frames()는 헤더만 읽고, records()는 조건(시각 범위)에 맞는 프레임만 압축을 풉니다.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+    def frames(self):
+        """[{'offset', 'length', 'count', 'first_ts', 'last_ts'}, ...] (압축 해제 없음)"""
+        frames = []
+        if self.mmap is None:
+            return frames
+        offset = 0
+        size = len(self.mmap)
+        while offset + FRAME_HEADER.size <= size:
+            magic, length, count, first_ts, last_ts = FRAME_HEADER.unpack_from(self.mmap, offset)
+            if magic != FRAME_MAGIC or offset + FRAME_HEADER.size + length > size:
+                # 기록 도중 잘린 마지막 프레임
+                break
+            frames.append({'offset': offset, 'length': length, 'count': count, 'first_ts': first_ts, 'last_ts': last_ts})
+            offset += FRAME_HEADER.size + length
+        return frames
+
+    def records(self, kinds=None, scan_id=None, start=None, end=None):
+        """기록 레코드를 순서대로 반환하는 generator
+
+        Args:
+            kinds: 이 종류만 (None이면 전체)
+            scan_id: 이 스캔의 기록만
+            start / end: 기록 시각 범위 (epoch 초)
+        """
+        kinds = set(kinds) if kinds else None
+        for frame in self.frames():
+            if (start is not None and frame['last_ts'] < start) or (end is not None and frame['first_ts'] > end):
+                continue
+            begin = frame['offset'] + FRAME_HEADER.size
+            raw = zlib.decompress(self.mmap[begin:begin + frame['length']])
+            for line in raw.split(b"\n"):
+                record = json.loads(line)
+                if kinds and record['kind'] not in kinds:
+                    continue
+                if scan_id and record['scan'] != scan_id:
+                    continue
+                if (start is not None and record['ts'] < start) or (end is not None and record['ts'] > end):
+                    continue
+                yield record
+
+    def scans(self):
+        """기록된 스캔 id 목록 (기록 순서)"""
+        seen = {}
+        for record in self.records():
+            seen.setdefault(record['scan'], None)
+        return list(seen)
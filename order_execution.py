@@ -0,0 +1,396 @@
+"""
+주문 실행 (Execution)
+
+- sliced_buy: 매수 금액을 IOC 지정가 주문 여러 개로 나누어 제출합니다.
+              주문 가격은 슬리피지 한도 가격으로 고정되어 그 이상으로는 체결되지 않습니다.
+- flatten / flatten_many: 미체결 주문 일괄 취소 → 즉시 시장가 전량 매도 → 체결 확인
+              (GUI 손절/종료시간 매도, utils, Streamlit 앱이 공통으로 사용)
+              flatten_async / flatten_many_async: asyncio에서 사용하는 버전
+- LocalExchange: 테스트용 로컬 거래소 (등록한 호가를 소진하며 주문을 체결)
+"""
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fill_tracker import LocalOrderSource, PollingFillTracker
+from tick_size import quantize
+from upbit_client import buy_limit_order_ioc, cancel_orders_by_uuids
+
+MIN_ORDER_KRW = 5000
+DEFAULT_SLICES = 4
+
+
+def _floor_volume(volume):
+    """주문 수량은 소수점 8자리까지 (내림)"""
+    return math.floor(volume * 1e8) / 1e8
+
+
+def slippage_limit_price(best_ask, max_slippage):
+    """최우선 매도호가 대비 max_slippage% 위의 가격 (호가 단위 내림)
+
+    내림한 가격이 최우선 매도호가보다 낮으면 IOC 조각이 하나도 체결되지 않으므로
+    최우선 매도호가(호가 단위 올림) 이상으로 맞춥니다.
+    """
+    return max(quantize(best_ask * (1 + max_slippage / 100), 'floor'), quantize(best_ask, 'ceil'))
+
+
+def _order_error(order):
+    if not order or not isinstance(order, dict):
+        return '주문 결과 없음'
+    error = order.get('error')
+    if isinstance(error, dict) and (error.get('name') or error.get('message')):
+        return error.get('name') or error.get('message')
+    if not order.get('uuid'):
+        return 'UUID 없음'
+    return None
+
+
+def sliced_buy(upbit, market, budget, best_ask, max_slippage, slices=DEFAULT_SLICES, limiter=None, fill_tracker=None, order_manager=None, timeout=5):
+    """매수 금액을 IOC 지정가 주문으로 나누어 매수합니다.
+
+    모든 조각은 같은 한도 가격(slippage_limit_price)으로 요청 제한(limiter)이 허용하는 대로
+    연속 제출되고, 한도 가격 이하의 매도호가만 체결됩니다. 체결되지 않은 수량은 즉시 취소되므로
+    총 사용 금액은 budget을 넘지 않습니다.
+
+    Args:
+        upbit: pyupbit.Upbit 객체 (또는 buy_limit_order_ioc를 가진 LocalExchange)
+        market: 마켓 코드 (예: "KRW-XRP")
+        budget: 매수 금액 (원)
+        best_ask: 기준 최우선 매도호가
+        max_slippage: 허용 슬리피지 (%)
+        slices: 최대 조각 수 (조각당 최소 5,000원)
+        limiter: 주문 API RateLimiter (None이면 제한 없음)
+        fill_tracker: 체결 확인기 (None이면 PollingFillTracker)
+        order_manager: OrderManager (조각 주문을 'entry'로 기록)
+
+    Returns:
+        fill 형식 dict (uuid, state, done, avg_price, executed_volume, funds, order, elapsed_ms)
+        + limit_price, uuids, slices, filled_slices, unfilled_krw, error
+    """
+    started = time.perf_counter()
+    limit_price = slippage_limit_price(best_ask, max_slippage)
+    slice_count = max(1, min(slices, int(budget // MIN_ORDER_KRW)))
+    volume = _floor_volume(budget / slice_count / limit_price)
+
+    uuids = []
+    error = None
+    for _ in range(slice_count):
+        if limiter:
+            limiter.acquire()
+        try:
+            order = buy_limit_order_ioc(upbit, market, limit_price, volume)
+        except Exception as e:
+            error = str(e)
+            break
+        error = _order_error(order)
+        if error:
+            break
+        uuids.append(order['uuid'])
+        if order_manager is not None:
+            order_manager.record_submit(order, tag='entry', market=market, side='bid', price=limit_price, volume=volume)
+
+    tracker = fill_tracker or PollingFillTracker(upbit)
+    fills = tracker.wait_many(uuids, timeout=timeout) if uuids else {}
+    executed_volume = 0.0
+    funds = 0.0
+    filled_slices = 0
+    for fill in fills.values():
+        if order_manager is not None:
+            order_manager.apply_fill(fill)
+        if fill['executed_volume'] > 0:
+            filled_slices += 1
+            executed_volume += fill['executed_volume']
+            funds += fill['funds']
+
+    done = bool(fills) and all(fill['done'] for fill in fills.values())
+    return {
+        'uuid': uuids[0] if uuids else None,
+        'state': 'done' if done else ('wait' if uuids else ''),
+        'done': done,
+        'avg_price': funds / executed_volume if executed_volume > 0 else None,
+        'executed_volume': executed_volume,
+        'funds': funds,
+        'order': {'uuid': uuids[0], 'market': market, 'side': 'bid', 'uuids': uuids} if uuids else None,
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+        'limit_price': limit_price,
+        'uuids': uuids,
+        'slices': len(uuids),
+        'filled_slices': filled_slices,
+        'unfilled_krw': max(0.0, budget - funds),
+        'error': error,
+    }
+
+
+def _open_order_uuids(upbit, coins, order_manager=None, logger=None):
+    """코인별 미체결 주문 UUID {coin: [uuid, ...]}
+
+    거래소 미체결 주문(upbit.get_order(coin))과 로컬 주문 테이블(order_manager)을 합칩니다.
+    프로그램이 직접 내지 않았거나 재시작 전에 낸 주문도 매도 전에 취소되도록 거래소 조회를 항상 함께 하며,
+    로컬 테이블에 없는 주문은 'external'로 기록합니다. 거래소 조회가 실패하면 로컬 테이블만 사용합니다.
+    """
+    open_uuids = {}
+    for coin in coins:
+        uuids = []
+        if order_manager is not None:
+            uuids.extend(order['uuid'] for order in order_manager.open_orders(market=coin))
+        try:
+            orders = upbit.get_order(coin)
+        except Exception as e:
+            orders = None
+            _log(logger, f"  {coin.replace('KRW-', '')}: 거래소 미체결 주문 조회 실패: {e}", "WARNING")
+        if orders and not isinstance(orders, list):
+            orders = [orders]
+        for order in orders or []:
+            if not isinstance(order, dict) or not order.get('uuid') or order.get('state', 'wait') not in ('wait', 'watch'):
+                continue
+            if order_manager is not None and order_manager.get(order['uuid']) is None:
+                order_manager.record_submit(order, tag='external', market=coin)
+            uuids.append(order['uuid'])
+        open_uuids[coin] = list(dict.fromkeys(uuids))
+    return open_uuids
+
+
+def _new_report(coin):
+    return {
+        'coin': coin,
+        'success': False,
+        'reason': None,
+        'cancelled': [],
+        'cancel_failed': [],
+        'sell_uuid': None,
+        'volume': 0.0,
+        'executed_volume': 0.0,
+        'avg_price': None,
+        'funds': 0.0,
+        'state': '',
+        'latency_ms': {'cancel': 0.0, 'sell_submit': 0.0, 'fill': 0.0, 'total': 0.0},
+    }
+
+
+def _log(logger, message, level="INFO"):
+    if logger:
+        logger.log(message, level)
+
+
+def flatten_many(upbit, coins, order_manager=None, fill_tracker=None, limiter=None, logger=None, cancel_timeout=3, fill_timeout=10, max_workers=8):
+    """여러 코인의 미체결 주문을 취소하고 보유 수량을 전량 시장가 매도합니다.
+
+    1. 모든 코인의 미체결 주문(거래소 조회 + 로컬 주문 테이블)을 다건 취소 API로 한 번에 취소하고,
+       취소 완료를 다건 조회로 확인
+    2. 코인별 잔고 조회 후 시장가 매도 주문을 병렬 제출 (limiter로 주문 API 요청 제한)
+    3. 모든 매도 주문의 체결을 다건 조회로 함께 확인 (고정 대기 없음)
+
+    Args:
+        upbit: pyupbit.Upbit 객체 (또는 LocalExchange 등 같은 메소드를 가진 객체)
+        coins: 코인 티커 리스트 (예: ["KRW-BTC", "KRW-XRP"])
+        order_manager: OrderManager (있으면 거래소 미체결 주문과 합쳐 취소하고, 취소/매도 결과를 기록)
+        fill_tracker: 체결 확인기 (None이면 PollingFillTracker)
+        limiter: 주문 API RateLimiter (None이면 제한 없음)
+
+    Returns:
+        {coin: report} - report 필드:
+            success, reason, cancelled, cancel_failed, sell_uuid, volume(매도 요청 수량),
+            executed_volume, avg_price(체결 VWAP), funds(체결 금액), state,
+            latency_ms {'cancel', 'sell_submit', 'fill', 'total'}
+    """
+    started = time.perf_counter()
+    coins = list(dict.fromkeys(coins))
+    reports = {coin: _new_report(coin) for coin in coins}
+    if not coins:
+        return reports
+    tracker = fill_tracker or PollingFillTracker(upbit)
+
+    # 1. 미체결 주문 일괄 취소 및 취소 완료 확인 (묶여 있던 수량이 풀릴 때까지)
+    cancel_started = time.perf_counter()
+    open_uuids = _open_order_uuids(upbit, coins, order_manager, logger)
+    owner = {uuid: coin for coin, uuids in open_uuids.items() for uuid in uuids}
+    if owner:
+        try:
+            cancel_result = cancel_orders_by_uuids(upbit, list(owner))
+        except Exception as e:
+            _log(logger, f"  미체결 주문 일괄 취소 실패: {e}", "ERROR")
+            cancel_result = {'cancelled': [], 'failed': list(owner)}
+        for uuid in cancel_result['cancelled']:
+            if uuid in owner:
+                reports[owner[uuid]]['cancelled'].append(uuid)
+                if order_manager is not None:
+                    order_manager.mark_cancel_requested(uuid)
+                _log(logger, f"  {owner[uuid].replace('KRW-', '')}: 미체결 주문 취소 (UUID: {uuid[:8]}...)")
+        for uuid in cancel_result['failed']:
+            if uuid in owner:
+                reports[owner[uuid]]['cancel_failed'].append(uuid)
+                _log(logger, f"  {owner[uuid].replace('KRW-', '')}: 주문 취소 실패 (UUID: {uuid[:8]}...)", "ERROR")
+        if cancel_result['cancelled']:
+            for fill in tracker.wait_many(cancel_result['cancelled'], timeout=cancel_timeout).values():
+                if order_manager is not None:
+                    order_manager.apply_fill(fill)
+    cancel_ms = (time.perf_counter() - cancel_started) * 1000
+    for report in reports.values():
+        report['latency_ms']['cancel'] = cancel_ms
+
+    # 2. 시장가 전량 매도 제출
+    def submit_sell(coin):
+        report = reports[coin]
+        submit_started = time.perf_counter()
+        try:
+            balance = float(upbit.get_balance(coin) or 0)
+        except Exception as e:
+            report['reason'] = f'잔고 조회 실패: {e}'
+            return
+        if balance <= 0:
+            report['reason'] = '매도할 수량 없음'
+            return
+        report['volume'] = balance
+        if limiter:
+            limiter.acquire()
+        try:
+            order = upbit.sell_market_order(coin, balance)
+        except Exception as e:
+            order = None
+            report['reason'] = f'매도 주문 오류: {e}'
+        report['latency_ms']['sell_submit'] = (time.perf_counter() - submit_started) * 1000
+        if isinstance(order, (tuple, list)):
+            order = order[0] if order else None
+        error = _order_error(order)
+        if error:
+            report['reason'] = report['reason'] or f'매도 주문 실패: {error}'
+            return
+        report['sell_uuid'] = order['uuid']
+        if order_manager is not None:
+            order_manager.record_submit(order, tag='flatten', market=coin, side='ask', volume=balance)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(coins), max_workers))) as executor:
+        list(executor.map(submit_sell, coins))
+
+    # 3. 체결 확인 (모든 매도 주문을 함께 조회)
+    sell_uuids = {report['sell_uuid']: coin for coin, report in reports.items() if report['sell_uuid']}
+    fill_started = time.perf_counter()
+    fills = tracker.wait_many(list(sell_uuids), timeout=fill_timeout) if sell_uuids else {}
+    for uuid, fill in fills.items():
+        report = reports[sell_uuids[uuid]]
+        if order_manager is not None:
+            order_manager.apply_fill(fill)
+        report['state'] = fill['state']
+        report['executed_volume'] = fill['executed_volume']
+        report['avg_price'] = fill['avg_price']
+        report['funds'] = fill['funds']
+        report['latency_ms']['fill'] = fill['elapsed_ms']
+        # 체결이 확인된 경우만 성공 (조회 실패/미체결/체결 없는 취소는 실패로 보고하여 호출한 쪽이 다시 시도)
+        if fill['order'] is None:
+            report['reason'] = '매도 체결 내역 조회 실패'
+        elif fill['state'] == 'done' or fill['executed_volume'] > 0:
+            report['success'] = True
+        else:
+            report['reason'] = f"매도 미체결 (상태: {fill['state'] or '확인 불가'})"
+    total_ms = (time.perf_counter() - started) * 1000
+    fill_ms = (time.perf_counter() - fill_started) * 1000 if sell_uuids else 0.0
+
+    for coin, report in reports.items():
+        report['latency_ms']['total'] = total_ms
+        coin_symbol = coin.replace("KRW-", "")
+        if report['success']:
+            price_text = f"{report['avg_price']:.4f}원" if report['avg_price'] else "체결가 확인 불가"
+            _log(logger, f"  {coin_symbol}: 전량 매도 (수량: {report['volume']}, 체결가: {price_text})", "SUCCESS")
+        elif report['reason'] == '매도할 수량 없음':
+            _log(logger, f"  {coin_symbol}: 매도할 수량이 없습니다.")
+        else:
+            _log(logger, f"  {coin_symbol}: 전량 매도 실패: {report['reason']}", "ERROR")
+    _log(logger, f"  전량 매도 지연: 취소 {cancel_ms:.0f}ms, 체결 확인 {fill_ms:.0f}ms, 전체 {total_ms:.0f}ms ({len(coins)}개)")
+    return reports
+
+
+def flatten(upbit, coin, **kwargs):
+    """코인 1개의 미체결 주문 취소 후 전량 시장가 매도 (report 반환, 인자는 flatten_many와 같음)"""
+    return flatten_many(upbit, [coin], **kwargs)[coin]
+
+
+async def flatten_many_async(upbit, coins, **kwargs):
+    """asyncio 이벤트 루프를 막지 않고 flatten_many를 실행합니다."""
+    return await asyncio.to_thread(flatten_many, upbit, coins, **kwargs)
+
+
+async def flatten_async(upbit, coin, **kwargs):
+    """asyncio 이벤트 루프를 막지 않고 flatten을 실행합니다."""
+    return await asyncio.to_thread(flatten, upbit, coin, **kwargs)
+
+
+class LocalExchange(LocalOrderSource):
+    """테스트용 로컬 거래소
+
+    set_orderbook()으로 등록한 호가를 소진하며 주문을 즉시 체결합니다.
+    pyupbit.Upbit 대신 buy_coins_from_list 등에 전달할 수 있습니다.
+
+    사용 예:
+        exchange = LocalExchange(krw=1_000_000)
+        exchange.set_orderbook("KRW-XRP", asks=[(700, 100), (701, 50)], bids=[(699, 80)])
+        result = sliced_buy(exchange, "KRW-XRP", 100_000, 700, max_slippage=0.3)
+    """
+    def __init__(self, krw=0.0):
+        super().__init__()
+        self.asks = {}
+        self.bids = {}
+        self.balances = {'KRW': float(krw)}
+
+    def set_orderbook(self, market, asks=(), bids=()):
+        """asks/bids: [(가격, 수량), ...]"""
+        with self.lock:
+            self.asks[market] = sorted([list(level) for level in asks], key=lambda level: level[0])
+            self.bids[market] = sorted([list(level) for level in bids], key=lambda level: -level[0])
+
+    def _take(self, book, volume=None, funds=None, price_ok=lambda price: True):
+        """호가를 소진하며 체결 리스트 [(가격, 수량)] 반환 (volume 또는 funds 한도)"""
+        trades = []
+        while book and price_ok(book[0][0]):
+            price, size = book[0]
+            take = size
+            if volume is not None:
+                take = min(take, volume - sum(v for _, v in trades))
+            if funds is not None:
+                take = min(take, (funds - sum(p * v for p, v in trades)) / price)
+            if take <= 1e-12:
+                break
+            trades.append((price, take))
+            book[0][1] -= take
+            if book[0][1] <= 1e-12:
+                book.pop(0)
+        return trades
+
+    def _settle(self, market, side, trades, final_state, extra):
+        coin = market.split("-")[1]
+        volume = sum(v for _, v in trades)
+        funds = sum(p * v for p, v in trades)
+        sign = 1 if side == 'bid' else -1
+        with self.lock:
+            self.balances['KRW'] -= sign * funds
+            self.balances[coin] = self.balances.get(coin, 0.0) + sign * volume
+        uuid = self.add_order(market, side, trades, final_state=final_state)
+        return dict(extra, uuid=uuid, market=market, side=side, state='wait')
+
+    def buy_limit_order_ioc(self, market, price, volume):
+        with self.lock:
+            trades = self._take(self.asks.get(market, []), volume=volume, price_ok=lambda p: p <= price)
+            filled = sum(v for _, v in trades)
+            final_state = 'done' if filled >= volume - 1e-12 else 'cancel'
+        return self._settle(market, 'bid', trades, final_state, {'ord_type': 'limit', 'price': str(price), 'volume': str(volume)})
+
+    def buy_market_order(self, market, price):
+        with self.lock:
+            trades = self._take(self.asks.get(market, []), funds=float(price))
+        return self._settle(market, 'bid', trades, 'cancel' if not trades else 'done', {'ord_type': 'price', 'price': str(price)})
+
+    def sell_market_order(self, market, volume):
+        with self.lock:
+            trades = self._take(self.bids.get(market, []), volume=float(volume))
+        return self._settle(market, 'ask', trades, 'cancel' if not trades else 'done', {'ord_type': 'market', 'volume': str(volume)})
+
+    def sell_limit_order(self, market, price, volume):
+        """지정가 매도는 체결하지 않고 대기(wait) 상태로만 등록합니다."""
+        uuid = self.add_order(market, 'ask', [], fill_delay=float('inf'))
+        return {'uuid': uuid, 'market': market, 'side': 'ask', 'ord_type': 'limit', 'price': str(price), 'volume': str(volume), 'state': 'wait'}
+
+    def get_balance(self, ticker='KRW'):
+        if '-' in ticker:
+            ticker = ticker.split('-')[1]
+        with self.lock:
+            return self.balances.get(ticker, 0.0)
@@ -0,0 +1,192 @@
+"""
+주문 관리 (Order Management)
+
+프로그램이 낸 모든 주문을 UUID 기준으로 메모리에 보관하고
+상태 변화, 체결 내역, 남은 수량을 추적합니다.
+
+"코인 X의 미체결 주문", "오늘 체결된 총 금액" 같은 질문을
+업비트 API 재조회 없이 로컬 인덱스로 바로 답할 수 있습니다.
+"""
+import threading
+from datetime import datetime
+
+import pytz
+
+KST = pytz.timezone('Asia/Seoul')
+
+OPEN_STATES = ('wait', 'watch', 'cancel_requested')
+FINAL_STATES = ('done', 'cancel')
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrderManager:
+    """UUID로 키잉된 주문 테이블과 인덱스 (여러 스레드에서 공유 가능)
+
+    주문 레코드 필드:
+        uuid, market, side('bid'/'ask'), ord_type, tag, price, volume, state,
+        executed_volume, remaining_volume, funds, avg_price, trades,
+        created_at, updated_at, history[(시간, 상태)]
+
+    tag: 주문 용도 ('entry'=매수, 'take_profit'=지정가 익절, 'flatten'=전량 매도 등)
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.orders = {}
+        self.by_market = {}
+        self.open_by_market = {}
+        self.by_date = {}
+        self.by_tag = {}
+
+    # ------------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------------
+    def record_submit(self, order, tag=None, market=None, side=None, price=None, volume=None):
+        """주문 제출 직후 응답(dict)을 기록합니다. 응답에 없는 값은 인자로 보충합니다."""
+        if not order or not isinstance(order, dict) or not order.get('uuid'):
+            return None
+        now = datetime.now(KST)
+        with self.lock:
+            uuid = order['uuid']
+            record = self.orders.get(uuid)
+            if record is None:
+                record = {
+                    'uuid': uuid,
+                    'market': order.get('market') or market,
+                    'side': order.get('side') or side,
+                    'ord_type': order.get('ord_type'),
+                    'tag': tag,
+                    'price': _to_float(order.get('price')) or price,
+                    'volume': _to_float(order.get('volume')) or volume,
+                    'state': order.get('state') or 'wait',
+                    'executed_volume': 0.0,
+                    'remaining_volume': _to_float(order.get('remaining_volume')) or volume or 0.0,
+                    'funds': 0.0,
+                    'avg_price': None,
+                    'trades': [],
+                    'created_at': now,
+                    'updated_at': now,
+                    'history': [(now, order.get('state') or 'wait')],
+                }
+                self.orders[uuid] = record
+                self.by_market.setdefault(record['market'], set()).add(uuid)
+                self.by_date.setdefault(now.strftime("%Y%m%d"), set()).add(uuid)
+                self.by_tag.setdefault(tag, set()).add(uuid)
+            self._apply(record, order, now)
+            return dict(record)
+
+    def apply_order(self, order):
+        """get_order 조회 결과(또는 myOrder 이벤트로 만든 dict)로 주문 상태를 갱신합니다."""
+        if not order or not isinstance(order, dict) or not order.get('uuid'):
+            return None
+        with self.lock:
+            record = self.orders.get(order['uuid'])
+            if record is None:
+                return None
+            self._apply(record, order, datetime.now(KST))
+            return dict(record)
+
+    def apply_fill(self, fill):
+        """FillTracker.wait() 결과를 반영합니다."""
+        if not fill or not fill.get('order'):
+            return None
+        order = dict(fill['order'])
+        order.setdefault('uuid', fill.get('uuid'))
+        return self.apply_order(order)
+
+    def mark_cancel_requested(self, uuid):
+        """취소 요청을 보낸 주문을 표시합니다 (실제 취소 확인 전)."""
+        with self.lock:
+            record = self.orders.get(uuid)
+            if record and record['state'] not in FINAL_STATES:
+                self._set_state(record, 'cancel_requested', datetime.now(KST))
+
+    def _set_state(self, record, state, now):
+        if state and state != record['state']:
+            record['state'] = state
+            record['history'].append((now, state))
+        market_open = self.open_by_market.setdefault(record['market'], set())
+        if record['state'] in OPEN_STATES:
+            market_open.add(record['uuid'])
+        else:
+            market_open.discard(record['uuid'])
+
+    def _apply(self, record, order, now):
+        trades = order.get('trades')
+        if trades:
+            record['trades'] = list(trades)
+            total_volume = 0.0
+            total_funds = 0.0
+            for trade in trades:
+                volume = _to_float(trade.get('volume'))
+                funds = _to_float(trade.get('funds')) or _to_float(trade.get('price')) * volume
+                total_volume += volume
+                total_funds += funds
+            if total_volume > 0:
+                record['executed_volume'] = total_volume
+                record['funds'] = total_funds
+                record['avg_price'] = total_funds / total_volume
+        elif order.get('executed_volume') is not None:
+            record['executed_volume'] = max(record['executed_volume'], _to_float(order.get('executed_volume')))
+        if order.get('remaining_volume') is not None:
+            record['remaining_volume'] = _to_float(order.get('remaining_volume'))
+        elif record.get('volume'):
+            record['remaining_volume'] = max(0.0, record['volume'] - record['executed_volume'])
+        record['updated_at'] = now
+        self._set_state(record, order.get('state'), now)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def get(self, uuid):
+        with self.lock:
+            record = self.orders.get(uuid)
+            return dict(record) if record else None
+
+    def open_orders(self, market=None, side=None, tag=None):
+        """미체결 주문 리스트 (market/side/tag로 필터링)"""
+        with self.lock:
+            if market is not None:
+                uuids = set(self.open_by_market.get(market, ()))
+            else:
+                uuids = set().union(*self.open_by_market.values()) if self.open_by_market else set()
+            if tag is not None:
+                uuids &= self.by_tag.get(tag, set())
+            return [dict(self.orders[u]) for u in uuids
+                    if side is None or self.orders[u]['side'] == side]
+
+    def orders_for(self, market, tag=None):
+        """코인별 전체 주문 리스트 (생성 시간 순)"""
+        with self.lock:
+            uuids = self.by_market.get(market, set())
+            if tag is not None:
+                uuids = uuids & self.by_tag.get(tag, set())
+            return sorted((dict(self.orders[u]) for u in uuids), key=lambda r: r['created_at'])
+
+    def total_filled(self, date=None, side=None, market=None, tag=None):
+        """체결 합계 {'volume', 'funds', 'count'}
+
+        date: 'YYYYMMDD' (None이면 오늘, KST)
+        """
+        date = date or datetime.now(KST).strftime("%Y%m%d")
+        with self.lock:
+            uuids = self.by_date.get(date, set())
+            if market is not None:
+                uuids = uuids & self.by_market.get(market, set())
+            if tag is not None:
+                uuids = uuids & self.by_tag.get(tag, set())
+            total = {'volume': 0.0, 'funds': 0.0, 'count': 0}
+            for uuid in uuids:
+                record = self.orders[uuid]
+                if side is not None and record['side'] != side:
+                    continue
+                if record['executed_volume'] > 0:
+                    total['volume'] += record['executed_volume']
+                    total['funds'] += record['funds']
+                    total['count'] += 1
+            return total
@@ -0,0 +1,541 @@
+"""
+모의 거래 (Paper Trading)
+
+실제 거래소 없이 자동매매 흐름을 실행하기 위한 모의 브로커입니다.
+
+- PaperUpbit: pyupbit.Upbit과 같은 인터페이스 (시장가/지정가 매수·매도, get_order,
+              get_balance(s), cancel_order, 다건 조회/취소, IOC 지정가 매수)
+              주문은 호가창을 소진하며 체결되고, 요청마다 설정한 지연시간이 적용됩니다.
+- SyntheticOrderbooks: 랜덤워크 가격으로 만든 가상 호가창
+- RecordedOrderbooks: 기록된 업비트 호가 응답(JSON lines)을 시간 순서대로 재생
+- run_load_test: 코인 개수별로 매수 → 전량 매도 전체 흐름의 소요 시간 측정
+
+사용 예:
+    broker = PaperUpbit(krw=10_000_000, latency=0.03)
+    buy_coins_from_list(broker, coin_list, ...)
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid as uuid_lib
+from datetime import datetime
+
+from tick_size import quantize, tick_size
+
+FINAL_STATES = ('done', 'cancel')
+
+
+# ============================================================================
+# 호가창 소스
+# ============================================================================
+
+class SyntheticOrderbooks:
+    """랜덤워크 가격으로 만든 가상 호가창
+
+    Args:
+        prices: {market: 초기 가격} (없는 마켓은 default_price 근처 임의 가격)
+        levels: 매수/매도 호가 단계 수 (업비트 기본 15)
+        depth_krw: 호가 단계별 평균 잔량 (원)
+        volatility: 초당 가격 변동성 (예: 0.002 = 0.2%)
+        refresh_interval: 호가창을 새로 만드는 간격 (초, 그 사이에는 체결로 소진된 잔량 유지)
+    """
+    def __init__(self, prices=None, levels=15, depth_krw=3_000_000, volatility=0.002, refresh_interval=1.0, default_price=1000, seed=None):
+        self.random = random.Random(seed)
+        self.mids = dict(prices or {})
+        self.levels = levels
+        self.depth_krw = depth_krw
+        self.volatility = volatility
+        self.refresh_interval = refresh_interval
+        self.default_price = default_price
+        self.books = {}
+        self.updated = {}
+
+    def _walk(self, market, now):
+        if market not in self.mids:
+            self.mids[market] = self.default_price * math.exp(self.random.uniform(-2, 2))
+            self.updated[market] = now
+        dt = max(0.0, now - self.updated.get(market, now))
+        self.mids[market] *= math.exp(self.volatility * math.sqrt(dt) * self.random.gauss(0, 1))
+        return self.mids[market]
+
+    def get(self, market, now):
+        """{'asks': [[가격, 수량], ...] (오름차순), 'bids': [[가격, 수량], ...] (내림차순)}
+
+        반환된 리스트를 체결로 소진하면 다음 갱신 전까지 그대로 유지됩니다.
+        """
+        if market in self.books and now - self.updated[market] < self.refresh_interval:
+            return self.books[market]
+        mid = self._walk(market, now)
+        tick = tick_size(mid)
+        best_ask = quantize(mid + tick / 2, 'ceil')
+        best_bid = quantize(mid - tick / 2, 'floor')
+        asks = [[best_ask + i * tick_size(best_ask), 0.0] for i in range(self.levels)]
+        bids = [[best_bid - i * tick_size(best_bid), 0.0] for i in range(self.levels)]
+        for level in asks + bids:
+            level[0] = quantize(level[0], 'round')
+            level[1] = self.depth_krw * self.random.uniform(0.3, 1.7) / level[0]
+        self.books[market] = {'asks': asks, 'bids': [level for level in bids if level[0] > 0]}
+        self.updated[market] = now
+        return self.books[market]
+
+
+class RecordedOrderbooks:
+    """기록된 업비트 호가 응답을 시간 순서대로 재생합니다.
+
+    frames: [(기록 시각(초), {market: {'asks': [(가격, 수량)], 'bids': [(가격, 수량)]}}), ...]
+    재생 시작 후 경과 시간에 맞는 프레임의 호가를 반환합니다 (loop=True면 끝나면 처음부터).
+    """
+    def __init__(self, frames, speed=1.0, loop=True):
+        self.frames = sorted(frames, key=lambda frame: frame[0])
+        self.speed = speed
+        self.loop = loop
+        self.started = None
+        self.current = {}
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        """/v1/orderbook 응답(마켓별 dict)을 한 줄에 하나씩 저장한 파일에서 읽습니다.
+
+        같은 timestamp(ms)의 마켓들은 한 프레임으로 묶습니다.
+        """
+        frames = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                for book in json.loads(line) if line.startswith("[") else [json.loads(line)]:
+                    units = book.get('orderbook_units', [])
+                    frame = frames.setdefault(book.get('timestamp', 0) / 1000, {})
+                    frame[book['market']] = {
+                        'asks': [(unit['ask_price'], unit['ask_size']) for unit in units],
+                        'bids': [(unit['bid_price'], unit['bid_size']) for unit in units],
+                    }
+        return cls(sorted(frames.items()), **kwargs)
+
+    def get(self, market, now):
+        if not self.frames:
+            return {'asks': [], 'bids': []}
+        if self.started is None:
+            self.started = now
+        first = self.frames[0][0]
+        span = self.frames[-1][0] - first
+        offset = (now - self.started) * self.speed
+        if self.loop and span > 0:
+            offset %= span
+        index = 0
+        for i, (recorded_at, _) in enumerate(self.frames):
+            if recorded_at - first > offset:
+                break
+            index = i
+        key = (index, market)
+        if key not in self.current:
+            book = self.frames[index][1].get(market, {'asks': [], 'bids': []})
+            self.current = {k: v for k, v in self.current.items() if k[0] == index}
+            self.current[key] = {
+                'asks': sorted([list(level) for level in book['asks']], key=lambda level: level[0]),
+                'bids': sorted([list(level) for level in book['bids']], key=lambda level: -level[0]),
+            }
+        return self.current[key]
+
+
+# ============================================================================
+# 모의 브로커
+# ============================================================================
+
+class PaperUpbit:
+    """pyupbit.Upbit 대체 모의 브로커
+
+    Args:
+        krw: 초기 원화 잔고
+        orderbooks: 호가창 소스 (SyntheticOrderbooks 또는 RecordedOrderbooks, 기본: SyntheticOrderbooks())
+        latency: 요청당 지연시간 (초)
+        jitter: 지연시간 변동폭 (초, latency ± jitter 범위에서 균등 분포)
+        fee_rate: 거래 수수료율 (업비트 원화 마켓 0.05%)
+
+    지정가 주문은 호가창에 대기하다가, 이후 요청 시점의 호가가 주문 가격에 닿으면 체결됩니다.
+    """
+    def __init__(self, krw=0.0, orderbooks=None, latency=0.0, jitter=0.0, fee_rate=0.0005, seed=None):
+        self.orderbooks = orderbooks or SyntheticOrderbooks(seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.fee_rate = fee_rate
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.balances = {'KRW': {'balance': float(krw), 'locked': 0.0, 'avg_buy_price': 0.0}}
+        self.orders = {}
+        self.request_count = 0
+
+    # ------------------------------------------------------------------
+    # 내부 처리
+    # ------------------------------------------------------------------
+    def _delay(self):
+        with self.lock:
+            self.request_count += 1
+        delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _account(self, currency):
+        return self.balances.setdefault(currency, {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+
+    def _book(self, market):
+        return self.orderbooks.get(market, time.time())
+
+    def _new_order(self, market, side, ord_type, price=None, volume=None):
+        uuid = str(uuid_lib.uuid4())
+        order = {
+            'uuid': uuid,
+            'side': side,
+            'ord_type': ord_type,
+            'price': None if price is None else str(price),
+            'state': 'wait',
+            'market': market,
+            'created_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'volume': None if volume is None else str(volume),
+            'remaining_volume': None if volume is None else str(volume),
+            'reserved_fee': '0',
+            'remaining_fee': '0',
+            'paid_fee': '0',
+            'locked': '0',
+            'executed_volume': '0',
+            'trades_count': 0,
+            'trades': [],
+        }
+        self.orders[uuid] = order
+        return order
+
+    def _fill(self, order, book_side, volume=None, funds=None, limit=None):
+        """호가를 소진하며 체결 (volume 또는 funds 한도, limit 가격까지)"""
+        market = order['market']
+        coin = market.split("-")[1]
+        krw = self._account('KRW')
+        account = self._account(coin)
+        filled_volume = 0.0
+        filled_funds = 0.0
+        while book_side:
+            price, size = book_side[0]
+            if limit is not None and (price > limit if order['side'] == 'bid' else price < limit):
+                break
+            take = size
+            if volume is not None:
+                take = min(take, volume - filled_volume)
+            if funds is not None:
+                take = min(take, (funds - filled_funds) / price)
+            if take <= 1e-12:
+                break
+            trade_funds = price * take
+            order['trades'].append({
+                'market': market, 'uuid': str(uuid_lib.uuid4()), 'price': str(price),
+                'volume': str(take), 'funds': str(trade_funds), 'side': order['side'],
+                'created_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+            })
+            filled_volume += take
+            filled_funds += trade_funds
+            book_side[0][1] -= take
+            if book_side[0][1] <= 1e-12:
+                book_side.pop(0)
+
+        if filled_volume <= 0:
+            return 0.0
+        fee = filled_funds * self.fee_rate
+        if order['side'] == 'bid':
+            if order['ord_type'] == 'limit':
+                krw['locked'] -= filled_volume * float(order['price']) * (1 + self.fee_rate)
+                krw['balance'] += filled_volume * float(order['price']) * (1 + self.fee_rate) - filled_funds - fee
+            else:
+                krw['balance'] -= filled_funds + fee
+            held = account['balance'] + account['locked']
+            account['avg_buy_price'] = (account['avg_buy_price'] * held + filled_funds) / (held + filled_volume)
+            account['balance'] += filled_volume
+        else:
+            account['locked'] -= filled_volume
+            krw['balance'] += filled_funds - fee
+        order['executed_volume'] = str(float(order['executed_volume']) + filled_volume)
+        order['paid_fee'] = str(float(order['paid_fee']) + fee)
+        order['trades_count'] = len(order['trades'])
+        if order['volume'] is not None:
+            order['remaining_volume'] = str(max(0.0, float(order['volume']) - float(order['executed_volume'])))
+        return filled_volume
+
+    def _match_resting(self):
+        """대기 중인 지정가 주문을 현재 호가와 비교하여 체결"""
+        for order in list(self.orders.values()):
+            if order['state'] != 'wait' or order['ord_type'] != 'limit':
+                continue
+            book = self._book(order['market'])
+            remaining = float(order['remaining_volume'])
+            side = book['asks'] if order['side'] == 'bid' else book['bids']
+            self._fill(order, side, volume=remaining, limit=float(order['price']))
+            if float(order['remaining_volume']) <= 1e-12:
+                order['state'] = 'done'
+
+    def _release(self, order):
+        """취소된 주문의 묶인 잔고 해제"""
+        remaining = float(order['remaining_volume'] or 0)
+        if order['side'] == 'bid':
+            krw = self._account('KRW')
+            amount = remaining * float(order['price']) * (1 + self.fee_rate)
+            krw['locked'] -= amount
+            krw['balance'] += amount
+        else:
+            account = self._account(order['market'].split("-")[1])
+            account['locked'] -= remaining
+            account['balance'] += remaining
+
+    @staticmethod
+    def _error(name, message):
+        return {'error': {'name': name, 'message': message}}
+
+    # ------------------------------------------------------------------
+    # 시세 (모의 호가 기준)
+    # ------------------------------------------------------------------
+    def get_orderbook(self, market):
+        """{'asks': [(가격, 수량)], 'bids': [(가격, 수량)]} 복사본"""
+        with self.lock:
+            book = self._book(market)
+            return {'asks': [tuple(level) for level in book['asks']], 'bids': [tuple(level) for level in book['bids']]}
+
+    def get_current_price(self, ticker):
+        """최우선 매도/매수호가 중간값 (리스트면 {ticker: 가격})"""
+        with self.lock:
+            def mid(market):
+                book = self._book(market)
+                if book['asks'] and book['bids']:
+                    return quantize((book['asks'][0][0] + book['bids'][0][0]) / 2, 'round')
+                return book['asks'][0][0] if book['asks'] else None
+            if isinstance(ticker, (list, tuple)):
+                return {market: mid(market) for market in ticker}
+            return mid(ticker)
+
+    # ------------------------------------------------------------------
+    # 잔고
+    # ------------------------------------------------------------------
+    def get_balances(self, contain_req=False):
+        self._delay()
+        with self.lock:
+            self._match_resting()
+            balances = [{
+                'currency': currency,
+                'balance': str(account['balance']),
+                'locked': str(account['locked']),
+                'avg_buy_price': str(account['avg_buy_price']),
+                'avg_buy_price_modified': False,
+                'unit_currency': 'KRW',
+            } for currency, account in self.balances.items()]
+        return (balances, {}) if contain_req else balances
+
+    def get_balance(self, ticker='KRW', contain_req=False):
+        if '-' in ticker:
+            ticker = ticker.split('-')[1]
+        self._delay()
+        with self.lock:
+            self._match_resting()
+            balance = self._account(ticker)['balance']
+        return (balance, {}) if contain_req else balance
+
+    def get_avg_buy_price(self, ticker='KRW', contain_req=False):
+        if '-' in ticker:
+            ticker = ticker.split('-')[1]
+        with self.lock:
+            price = self._account(ticker)['avg_buy_price']
+        return (price, {}) if contain_req else price
+
+    # ------------------------------------------------------------------
+    # 주문
+    # ------------------------------------------------------------------
+    def buy_market_order(self, ticker, price, contain_req=False):
+        self._delay()
+        with self.lock:
+            price = float(price)
+            if price < 5000:
+                return self._error('under_min_total_bid', '최소주문금액 이상으로 주문해주세요')
+            if self._account('KRW')['balance'] < price * (1 + self.fee_rate):
+                return self._error('insufficient_funds_bid', '주문가능한 금액(KRW)이 부족합니다.')
+            self._match_resting()
+            order = self._new_order(ticker, 'bid', 'price', price=price)
+            self._fill(order, self._book(ticker)['asks'], funds=price)
+            order['state'] = 'cancel' if float(order['executed_volume']) < 1e-12 else 'done'
+            response = dict(order, state='wait', trades=[])
+        return (response, {}) if contain_req else response
+
+    def sell_market_order(self, ticker, volume, contain_req=False):
+        self._delay()
+        with self.lock:
+            volume = float(volume)
+            account = self._account(ticker.split("-")[1])
+            if account['balance'] < volume - 1e-12:
+                return self._error('insufficient_funds_ask', '주문가능한 금액이 부족합니다.')
+            self._match_resting()
+            account['balance'] -= volume
+            account['locked'] += volume
+            order = self._new_order(ticker, 'ask', 'market', volume=volume)
+            self._fill(order, self._book(ticker)['bids'], volume=volume)
+            order['state'] = 'done' if float(order['remaining_volume']) <= 1e-12 else 'cancel'
+            if order['state'] == 'cancel':
+                self._release(order)
+            response = dict(order, state='wait', trades=[])
+        return (response, {}) if contain_req else response
+
+    def _limit_order(self, ticker, side, price, volume, time_in_force=None):
+        price = float(price)
+        volume = float(volume)
+        if quantize(price, 'round') != price:
+            return self._error('invalid_price', '주문 가격 단위를 잘못 입력하셨습니다.')
+        if price * volume < 5000:
+            return self._error('under_min_total_' + side, '최소주문금액 이상으로 주문해주세요')
+        self._match_resting()
+        if side == 'bid':
+            krw = self._account('KRW')
+            required = price * volume * (1 + self.fee_rate)
+            if krw['balance'] < required:
+                return self._error('insufficient_funds_bid', '주문가능한 금액(KRW)이 부족합니다.')
+            krw['balance'] -= required
+            krw['locked'] += required
+        else:
+            account = self._account(ticker.split("-")[1])
+            if account['balance'] < volume - 1e-12:
+                return self._error('insufficient_funds_ask', '주문가능한 금액이 부족합니다.')
+            account['balance'] -= volume
+            account['locked'] += volume
+        order = self._new_order(ticker, side, 'limit', price=price, volume=volume)
+        book = self._book(ticker)
+        self._fill(order, book['asks'] if side == 'bid' else book['bids'], volume=volume, limit=price)
+        if float(order['remaining_volume']) <= 1e-12:
+            order['state'] = 'done'
+        elif time_in_force == 'ioc':
+            order['state'] = 'cancel'
+            self._release(order)
+        return dict(order, state='wait', trades=[])
+
+    def buy_limit_order(self, ticker, price, volume, contain_req=False):
+        self._delay()
+        with self.lock:
+            response = self._limit_order(ticker, 'bid', price, volume)
+        return (response, {}) if contain_req else response
+
+    def sell_limit_order(self, ticker, price, volume, contain_req=False):
+        self._delay()
+        with self.lock:
+            response = self._limit_order(ticker, 'ask', price, volume)
+        return (response, {}) if contain_req else response
+
+    def buy_limit_order_ioc(self, market, price, volume):
+        self._delay()
+        with self.lock:
+            return self._limit_order(market, 'bid', price, volume, time_in_force='ioc')
+
+    def cancel_order(self, uuid, contain_req=False):
+        self._delay()
+        with self.lock:
+            self._match_resting()
+            order = self.orders.get(uuid)
+            if order is None:
+                return self._error('order_not_found', '주문을 찾지 못했습니다.')
+            if order['state'] != 'wait':
+                return self._error('order_not_found', '주문을 찾지 못했습니다.')
+            order['state'] = 'cancel'
+            self._release(order)
+            response = dict(order, trades=[])
+        return (response, {}) if contain_req else response
+
+    def get_order(self, ticker_or_uuid, state='wait', page=1, limit=100, contain_req=False):
+        self._delay()
+        with self.lock:
+            self._match_resting()
+            if ticker_or_uuid in self.orders:
+                result = json.loads(json.dumps(self.orders[ticker_or_uuid]))
+            else:
+                matched = [order for order in self.orders.values()
+                           if order['market'] == ticker_or_uuid and order['state'] == state]
+                matched.sort(key=lambda order: order['created_at'], reverse=True)
+                result = [dict(order, trades=[]) for order in matched[(page - 1) * limit:page * limit]]
+        return (result, {}) if contain_req else result
+
+    def get_orders_by_uuids(self, uuids):
+        self._delay()
+        with self.lock:
+            self._match_resting()
+            return {uuid: json.loads(json.dumps(self.orders[uuid])) for uuid in uuids if uuid in self.orders}
+
+    def cancel_orders_by_uuids(self, uuids):
+        self._delay()
+        result = {'cancelled': [], 'failed': []}
+        with self.lock:
+            self._match_resting()
+            for uuid in uuids:
+                order = self.orders.get(uuid)
+                if order and order['state'] == 'wait':
+                    order['state'] = 'cancel'
+                    self._release(order)
+                    result['cancelled'].append(uuid)
+                else:
+                    result['failed'].append(uuid)
+        return result
+
+
+# ============================================================================
+# 부하 테스트
+# ============================================================================
+
+def build_coin_list(broker, markets):
+    """모의 호가로 5단계 결과 형식의 코인 리스트를 만듭니다 (호가 스냅샷 포함)."""
+    coin_list = []
+    for market in markets:
+        book = broker.get_orderbook(market)
+        lowest_ask = book['asks'][0][0]
+        highest_bid = book['bids'][0][0] if book['bids'] else None
+        coin_list.append({
+            'coin': market,
+            'price_change': 0.0,
+            'volume_change': 0.0,
+            'lowest_ask': lowest_ask,
+            'highest_bid': highest_bid,
+            'price_diff_pct': 0.0,
+            'spread_pct': (lowest_ask - highest_bid) / highest_bid * 100 if highest_bid else 0.0,
+            'asks': book['asks'],
+            'snapshot_time': time.time(),
+        })
+    return coin_list
+
+
+def run_load_test(coin_counts=(1, 5, 10, 20), latency=0.03, jitter=0.01, krw=10_000_000, concurrent=True, logger=None, seed=1):
+    """코인 개수별 매수(buy_coins_from_list) → 전량 매도(flatten_many) 소요 시간을 측정합니다.
+
+    Returns:
+        [{'coins', 'buy_ms', 'flatten_ms', 'total_ms', 'bought', 'sold', 'requests'}, ...]
+    """
+    import utils
+    from order_execution import flatten_many
+
+    module = utils._get_auto_trading_module()
+    results = []
+    for count in coin_counts:
+        markets = [f"KRW-PAPER{i:02d}" for i in range(count)]
+        broker = PaperUpbit(krw=krw, latency=latency, jitter=jitter, seed=seed)
+        coin_list = build_coin_list(broker, markets)
+
+        started = time.perf_counter()
+        buy_results = module.buy_coins_from_list(broker, coin_list, investment_ratio=90, logger=logger, concurrent=concurrent, snapshot_max_age=60)
+        bought = time.perf_counter()
+        reports = flatten_many(broker, markets, limiter=module.RateLimiter(module.ORDER_API_RATE_PER_SEC), logger=logger)
+        finished = time.perf_counter()
+
+        results.append({
+            'coins': count,
+            'buy_ms': (bought - started) * 1000,
+            'flatten_ms': (finished - bought) * 1000,
+            'total_ms': (finished - started) * 1000,
+            'bought': sum(1 for r in buy_results if r.get('status') == 'success'),
+            'sold': sum(1 for r in reports.values() if r['success']),
+            'requests': broker.request_count,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'코인':>4} {'매수(ms)':>10} {'전량매도(ms)':>12} {'전체(ms)':>10} {'매수성공':>8} {'매도성공':>8} {'요청수':>6}")
+    for row in run_load_test():
+        print(f"{row['coins']:>4} {row['buy_ms']:>10.0f} {row['flatten_ms']:>12.0f} {row['total_ms']:>10.0f} {row['bought']:>8} {row['sold']:>8} {row['requests']:>6}")
@@ -0,0 +1,201 @@
+"""
+가격 모니터링 폴링 주기 조절
+
+보유 코인마다 가장 가까운 트리거(손절가, 트레일링 스탑, 익절 단계, 지정가 매도가)까지의
+거리와 최근 변동성으로 다음 조회 시각을 정합니다.
+트리거에 가까운 코인은 자주, 먼 코인은 드물게 조회하고, 전체 조회 횟수는 요청 예산(초당 요청 수) 안으로 제한합니다.
+
+- 변동성: 조회된 가격의 로그 수익률로 초당 변동성(%)을 지수가중평균(EWMA)으로 추정
+- 거리: 손절 계열(가격 이하에서 발동)은 현재가 - 트리거, 익절 계열(가격 이상에서 발동)은 트리거 - 현재가
+        이미 넘어선 트리거는 거리 0 (다음 주기에 바로 조회)
+- 주기: 트리거까지의 거리가 safety_sigmas 표준편차 움직임으로 닿는 데 걸리는 시간
+        (거리 / (safety_sigmas × 초당 변동성))² 을 [min_interval, max_interval]로 제한
+- 예산: 모니터링 주기 1회의 요청 수(현재가 1회 + 주문 조회 1회)를 기준으로 주기 간 최소 간격을 둠
+- stats(): 코인별 목표 주기/실제 조회 빈도와 예산 사용량
+
+사용 예:
+    scheduler = PollScheduler(request_budget=2)
+    due = scheduler.due_coins(positions)
+    ...  # due 코인만 현재가 조회
+    scheduler.record_cycle(requests=1)
+    for coin, price in prices.items():
+        scheduler.update(coin, price, stop_prices=[stop_price], take_profit_prices=[limit_price])
+    stop_event.wait(scheduler.next_wait())
+"""
+import math
+import threading
+import time
+from collections import deque
+
+BUDGET_WINDOW_SEC = 10.0
+
+
+class PollScheduler:
+    """트리거까지의 거리/변동성 기반 코인별 폴링 주기
+
+    Args:
+        request_budget: 모니터링에 쓸 초당 최대 요청 수 (업비트 시세 조회 제한 30회/초 중 일부)
+        min_interval: 코인별 최소 조회 간격 (초)
+        max_interval: 코인별 최대 조회 간격 (초, 트리거에서 멀어도 이 간격으로는 조회)
+        safety_sigmas: 다음 조회 전까지 허용할 가격 움직임 (표준편차 배수)
+        default_volatility_pct: 가격 이력이 없을 때 가정할 초당 변동성 (%)
+        volatility_halflife: 변동성 EWMA 반감기 (관측 횟수)
+    """
+    def __init__(self, request_budget=2.0, min_interval=1.0, max_interval=30.0, safety_sigmas=3.0, default_volatility_pct=0.1, volatility_halflife=20):
+        self.request_budget = request_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.safety_sigmas = safety_sigmas
+        self.default_volatility_pct = default_volatility_pct
+        self.decay = 0.5 ** (1 / volatility_halflife)
+        self.lock = threading.Lock()
+        # coin -> {'price', 'time', 'variance', 'interval', 'next_due', 'distance_pct', 'observed_interval'}
+        self.states = {}
+        self.cycle_times = deque()
+        self.request_times = deque()
+        self.last_cycle = None
+        self.last_cycle_requests = 1
+        self.cycles = 0
+
+    # ------------------------------------------------------------------
+    # 조회 대상
+    # ------------------------------------------------------------------
+    def due_coins(self, coins, now=None):
+        """이번 주기에 조회할 코인 목록
+
+        처음 보는 코인과 조회 시각이 된 코인, 그리고 min_interval 안에 조회 시각이 되는 코인
+        (현재가 조회는 다건 1회이므로 함께 조회해도 요청 수가 늘지 않음)
+        """
+        now = time.time() if now is None else now
+        horizon = now + self.min_interval
+        with self.lock:
+            # 보유 목록에서 빠진 코인 상태 정리
+            for coin in [coin for coin in self.states if coin not in coins]:
+                del self.states[coin]
+            return [coin for coin in coins if coin not in self.states or self.states[coin]['next_due'] <= horizon]
+
+    def record_cycle(self, requests=1, now=None):
+        """모니터링 주기 1회 실행 기록 (requests: 이번 주기에 보낸 API 요청 수)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            self.cycles += 1
+            self.last_cycle = now
+            self.last_cycle_requests = max(requests, 1)
+            self.cycle_times.append(now)
+            self.request_times.extend([now] * requests)
+            self._trim(now)
+
+    def _trim(self, now):
+        for times in (self.cycle_times, self.request_times):
+            while times and times[0] < now - BUDGET_WINDOW_SEC:
+                times.popleft()
+
+    # ------------------------------------------------------------------
+    # 가격 반영
+    # ------------------------------------------------------------------
+    def volatility_pct(self, coin):
+        """초당 변동성 추정치 (%, 이력이 없으면 default_volatility_pct)"""
+        state = self.states.get(coin)
+        if not state or state['variance'] is None:
+            return self.default_volatility_pct
+        return math.sqrt(state['variance']) * 100
+
+    def update(self, coin, price, stop_prices=(), take_profit_prices=(), deadline=None, now=None):
+        """조회한 가격을 반영하고 다음 조회 시각을 정합니다.
+
+        Args:
+            coin: 마켓 코드
+            price: 현재가
+            stop_prices: 가격이 이 값 이하가 되면 발동하는 트리거 (손절가, 트레일링 스탑 가격, None은 무시)
+            take_profit_prices: 가격이 이 값 이상이 되면 발동하는 트리거 (지정가 매도가, 익절 단계 가격, None은 무시)
+            deadline: 보유시간 청산 시각 (epoch 초, 없으면 None)
+
+        Returns:
+            다음 조회까지의 간격 (초)
+        """
+        if not price:
+            return None
+        now = time.time() if now is None else now
+        with self.lock:
+            state = self.states.get(coin)
+            if state is None:
+                state = self.states[coin] = {
+                    'price': None, 'time': None, 'variance': None, 'interval': None,
+                    'next_due': now, 'distance_pct': None, 'observed_interval': None,
+                }
+            # 초당 분산 = 로그 수익률² / 경과 시간 (EWMA)
+            if state['price'] and state['time'] is not None and now > state['time']:
+                elapsed = now - state['time']
+                sample = math.log(price / state['price']) ** 2 / elapsed
+                if state['variance'] is None:
+                    state['variance'] = sample
+                else:
+                    state['variance'] = self.decay * state['variance'] + (1 - self.decay) * sample
+                observed = state['observed_interval']
+                state['observed_interval'] = elapsed if observed is None else 0.8 * observed + 0.2 * elapsed
+            state['price'] = price
+            state['time'] = now
+
+            distances = [max(price - trigger, 0) / price for trigger in stop_prices if trigger]
+            distances += [max(trigger - price, 0) / price for trigger in take_profit_prices if trigger]
+            distance = min(distances) if distances else None
+            state['distance_pct'] = distance * 100 if distance is not None else None
+
+            volatility = max(self.volatility_pct(coin) / 100, 1e-6)
+            if distance is None:
+                interval = self.max_interval
+            else:
+                interval = (distance / (self.safety_sigmas * volatility)) ** 2
+            if deadline is not None:
+                interval = min(interval, max(deadline - now, 0))
+            interval = min(max(interval, self.min_interval), self.max_interval)
+            state['interval'] = interval
+            state['next_due'] = now + interval
+            return interval
+
+    # ------------------------------------------------------------------
+    # 대기 시간
+    # ------------------------------------------------------------------
+    def next_wait(self, now=None):
+        """다음 모니터링 주기까지 기다릴 시간 (초)
+
+        가장 이른 조회 시각까지 기다리되, 주기당 요청 수 / request_budget 보다 짧게는 돌지 않습니다.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if not self.states:
+                wait = self.min_interval
+            else:
+                wait = min(state['next_due'] for state in self.states.values()) - now
+            if self.last_cycle is not None and self.request_budget:
+                budget_gap = self.last_cycle + self.last_cycle_requests / self.request_budget - now
+                wait = max(wait, budget_gap)
+            return min(max(wait, 0.0), self.max_interval)
+
+    def stats(self, now=None):
+        """폴링 상태
+
+        Returns:
+            {'request_budget', 'used_rps', 'cycles_per_sec', 'cycles',
+             'coins': {coin: {'interval', 'rate', 'distance_pct', 'volatility_pct'}}}
+            interval: 목표 조회 간격 (초), rate: 실제 조회 빈도 (회/초)
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._trim(now)
+            coins = {}
+            for coin, state in self.states.items():
+                observed = state['observed_interval']
+                coins[coin] = {
+                    'interval': state['interval'],
+                    'rate': 1 / observed if observed else None,
+                    'distance_pct': state['distance_pct'],
+                    'volatility_pct': self.volatility_pct(coin),
+                }
+            return {
+                'request_budget': self.request_budget,
+                'used_rps': len(self.request_times) / BUDGET_WINDOW_SEC,
+                'cycles_per_sec': len(self.cycle_times) / BUDGET_WINDOW_SEC,
+                'cycles': self.cycles,
+                'coins': coins,
+            }
@@ -0,0 +1,272 @@
+"""
+보유 코인 장부 저널 (재시작 복구용)
+
+purchased_coins / sold_coins(PositionLedger)의 변경을 DATA_DIR의 JSON lines 파일에
+이어 쓰기(append-only)로 기록하고, 프로그램이 재시작되면 다시 읽어 장부를 복원합니다.
+
+- 기록: 레코드 전체를 기록(set/pop/clear)하므로 같은 이벤트를 여러 번 적용해도 결과가 같음
+- fsync: 백그라운드 스레드가 fsync_interval초마다 모아서 한 번 (이벤트마다 디스크 동기화하지 않음)
+- 압축: compact_every건마다 현재 장부 전체를 스냅샷 1줄로 새 파일에 쓰고 원자적으로 교체
+- 복원: replay()로 파일을 한 번 읽어 {장부 이름: {key: 레코드}} 생성 (마지막 줄이 잘려도 무시)
+- 거래소 대조: reconcile_positions()가 잔고 조회 1회 + 지정가 주문 다건 조회 1회로 복원된 보유 코인을 실제 상태에 맞춤
+
+사용 예:
+    journal = PositionJournal()
+    state = journal.replay()
+    purchased = PositionLedger(state.get('purchased_coins'), name='purchased_coins', journal=journal)
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from upbit_client import get_orders_by_uuids
+
+JOURNAL_FILENAME = "position_journal.jsonl"
+KST = pytz.timezone('Asia/Seoul')
+
+
+def default_journal_path():
+    """DATA_DIR(없으면 프로그램 폴더)의 저널 파일 경로"""
+    data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(data_dir, JOURNAL_FILENAME)
+
+
+def _encode(value):
+    # 레코드의 buy_time/sell_time (datetime) 보존
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"JSON으로 저장할 수 없는 값: {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj and len(obj) == 1:
+        value = datetime.fromisoformat(obj['__datetime__'])
+        return value.astimezone(KST) if value.tzinfo else value
+    return obj
+
+
+class PositionJournal:
+    """장부 변경 이벤트 저널
+
+    Args:
+        path: 저널 파일 경로 (None이면 DATA_DIR/position_journal.jsonl)
+        fsync_interval: 디스크 동기화 간격 (초)
+        compact_every: 이 건수만큼 이벤트가 쌓이면 스냅샷으로 압축
+    """
+    def __init__(self, path=None, fsync_interval=0.2, compact_every=1000):
+        self.path = path or default_journal_path()
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.ledgers = {}
+        self.events_since_compact = 0
+        self.dirty = False
+        self.file = None
+        self.stop_event = threading.Event()
+        self.flusher = None
+        self.stats = {'events': 0, 'fsyncs': 0, 'compactions': 0, 'replay_ms': None, 'replayed_events': 0}
+
+    # ------------------------------------------------------------------
+    # 복원
+    # ------------------------------------------------------------------
+    def replay(self):
+        """저널 파일을 읽어 장부 상태를 복원합니다.
+
+        Returns:
+            {장부 이름: {key: 레코드(dict)}}
+        """
+        started = time.perf_counter()
+        state = {}
+        count = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line, object_hook=_decode)
+                    except json.JSONDecodeError:
+                        # 기록 도중 종료되어 잘린 마지막 줄
+                        continue
+                    self._apply(state, event)
+                    count += 1
+        self.stats['replay_ms'] = (time.perf_counter() - started) * 1000
+        self.stats['replayed_events'] = count
+        self.events_since_compact = count
+        return state
+
+    @staticmethod
+    def _apply(state, event):
+        op = event.get('op')
+        if op == 'snapshot':
+            state.clear()
+            state.update({name: dict(records) for name, records in event['ledgers'].items()})
+        elif op == 'set':
+            state.setdefault(event['ledger'], {})[event['key']] = event['value']
+        elif op == 'pop':
+            state.setdefault(event['ledger'], {}).pop(event['key'], None)
+        elif op == 'clear':
+            state[event['ledger']] = {}
+
+    # ------------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------------
+    def attach(self, ledger):
+        """압축 시 스냅샷을 만들 장부 등록 (PositionLedger가 journal 인자로 생성될 때 호출)"""
+        self.ledgers[ledger.name] = ledger
+
+    def _open(self):
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self.flusher.start()
+
+    def record(self, ledger_name, key, value):
+        """레코드 변경 기록 (value가 None이면 삭제)"""
+        if value is None:
+            event = {'op': 'pop', 'ledger': ledger_name, 'key': key}
+        else:
+            event = {'op': 'set', 'ledger': ledger_name, 'key': key, 'value': dict(value)}
+        self._append(event)
+
+    def record_clear(self, ledger_name):
+        self._append({'op': 'clear', 'ledger': ledger_name})
+
+    def _append(self, event):
+        event['t'] = round(time.time(), 3)
+        line = json.dumps(event, ensure_ascii=False, default=_encode) + "\n"
+        with self.lock:
+            self._open()
+            self.file.write(line)
+            self.dirty = True
+            self.stats['events'] += 1
+            self.events_since_compact += 1
+            if self.events_since_compact >= self.compact_every:
+                self._compact()
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.fsync_interval):
+            self.flush()
+
+    def flush(self):
+        """쌓인 기록을 디스크에 동기화"""
+        with self.lock:
+            if self.file is None or not self.dirty:
+                return
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.dirty = False
+            self.stats['fsyncs'] += 1
+
+    # ------------------------------------------------------------------
+    # 압축
+    # ------------------------------------------------------------------
+    def compact(self):
+        """현재 장부 전체를 스냅샷 1줄로 기록한 새 파일로 교체"""
+        with self.lock:
+            self._open()
+            self._compact()
+
+    def _compact(self):
+        snapshot = {
+            'op': 'snapshot',
+            't': round(time.time(), 3),
+            'ledgers': {name: {key: dict(record) for key, record in ledger.snapshot().items()} for name, ledger in self.ledgers.items()},
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.file.close()
+        os.replace(temp_path, self.path)
+        # 디렉터리 항목 갱신까지 동기화 (Windows는 지원하지 않음)
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.dirty = False
+        self.events_since_compact = 0
+        self.stats['compactions'] += 1
+
+    def close(self):
+        self.stop_event.set()
+        self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+# ============================================================================
+# 거래소 대조
+# ============================================================================
+
+def reconcile_positions(upbit, purchased_coins, logger=None, order_manager=None):
+    """복원된 보유 코인을 실제 잔고/주문 상태에 맞춥니다.
+
+    잔고 조회 1회(get_balances)와 지정가 매도 주문 다건 조회 1회로 처리합니다.
+    - 잔고가 없는 코인: 장부에서 제거 (재시작 사이에 매도됨)
+    - 잔고가 장부보다 적은 코인: coin_balance를 실제 수량(주문에 묶인 수량 포함)으로 줄임
+    - 지정가 매도 주문이 취소되었거나 조회되지 않는 코인: sell_order_uuid 해제
+      (체결 완료(done)된 주문은 그대로 두어 모니터링에서 익절 기록)
+    - order_manager가 있으면 남아 있는 지정가 매도 주문을 'take_profit'으로 등록
+      (재시작 후 전량 매도/종료시간 매도가 이 주문을 취소하고 묶인 수량을 매도할 수 있도록)
+
+    Returns:
+        {'restored', 'removed', 'adjusted', 'orders_cleared', 'orders_registered'}
+    """
+    def log(message, level="INFO"):
+        if logger:
+            logger.log(message, level)
+
+    summary = {'restored': len(purchased_coins), 'removed': [], 'adjusted': [], 'orders_cleared': [], 'orders_registered': []}
+    if not purchased_coins:
+        return summary
+
+    balances = upbit.get_balances()
+    if not isinstance(balances, list):
+        log(f"잔고 조회 실패로 장부 대조를 건너뜁니다: {balances}", "WARNING")
+        return summary
+    held = {
+        f"KRW-{item['currency']}": float(item.get('balance', 0)) + float(item.get('locked', 0))
+        for item in balances if isinstance(item, dict) and item.get('currency')
+    }
+
+    uuids = [info.get('sell_order_uuid') for info in purchased_coins.values() if info.get('sell_order_uuid')]
+    orders = get_orders_by_uuids(upbit, uuids) if uuids else {}
+
+    for coin, info in list(purchased_coins.items()):
+        coin_symbol = coin.replace("KRW-", "")
+        actual = held.get(coin, 0.0)
+        if actual <= 0:
+            purchased_coins.pop(coin, None)
+            summary['removed'].append(coin)
+            log(f"  {coin_symbol}: 거래소 잔고 없음 → 장부에서 제거", "WARNING")
+            continue
+        fields = {}
+        if actual < info.get('coin_balance', 0):
+            fields['coin_balance'] = actual
+            summary['adjusted'].append(coin)
+            log(f"  {coin_symbol}: 보유 수량 조정 {info.get('coin_balance', 0)} → {actual}", "INFO")
+        sell_order_uuid = info.get('sell_order_uuid')
+        if sell_order_uuid:
+            order = orders.get(sell_order_uuid)
+            if not order or order.get('state') == 'cancel':
+                fields['sell_order_uuid'] = None
+                summary['orders_cleared'].append(coin)
+                log(f"  {coin_symbol}: 지정가 매도 주문 없음/취소됨 → 주문 추적 해제", "WARNING")
+            elif order_manager is not None:
+                order_manager.record_submit(order, tag='take_profit', market=coin, side='ask', price=info.get('sell_price_limit'), volume=info.get('sell_volume'))
+                summary['orders_registered'].append(coin)
+        if fields:
+            purchased_coins.update_fields(coin, **fields)
+    return summary
@@ -0,0 +1,197 @@
+"""
+보유/매도 코인 장부 (copy-on-write)
+
+purchased_coins, sold_coins를 대체하는 dict 호환 장부입니다.
+매수 스레드, 가격 모니터링 스레드, 종료 시간 매도 스레드가 동시에 갱신해도
+읽는 쪽은 잠금 없이 항상 완결된 상태(스냅샷)를 봅니다.
+
+- 쓰기: 잠금 안에서 현재 dict를 복사 → 수정 → 새 dict로 교체 (원자적 교체)
+- 읽기: 교체된 dict 참조를 그대로 사용 (잠금 없음, 반복 중 변경되지 않음)
+- 레코드는 읽기 전용(MappingProxyType)으로 반환되므로 필드 단위 직접 수정은 불가
+  → update_fields(coin, **fields) 또는 modify(coin, fn)로 원자적으로 갱신
+- lock_stats(): 쓰기 횟수, 잠금 경합 횟수, 대기 시간
+- journal(PositionJournal)을 지정하면 변경된 레코드를 저널에 기록 (재시작 복구용)
+
+사용 예:
+    ledger = PositionLedger()
+    ledger[coin] = {'buy_price': 1000, 'coin_balance': 10}
+    ledger.update_fields(coin, coin_balance=5)
+    for coin, info in ledger.items():   # 스냅샷 반복
+        ...
+"""
+import threading
+import time
+from collections.abc import MutableMapping
+from types import MappingProxyType
+
+_MISSING = object()
+
+
+class PositionLedger(MutableMapping):
+    """dict 호환 copy-on-write 장부
+
+    Args:
+        initial: 초기 내용 ({key: dict})
+        name: lock_stats() 로그 표시용 이름 (저널의 장부 이름)
+        journal: 변경 기록용 PositionJournal (None이면 기록 안 함)
+    """
+    def __init__(self, initial=None, name="ledger", journal=None):
+        self.name = name
+        self.journal = journal
+        if journal is not None:
+            journal.attach(self)
+        self._lock = threading.Lock()
+        self._data = MappingProxyType({key: MappingProxyType(dict(record)) for key, record in (initial or {}).items()})
+        self._version = 0
+        self._stats = {'writes': 0, 'contended': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0, 'hold_total_ms': 0.0}
+
+    # ------------------------------------------------------------------
+    # 읽기 (잠금 없음)
+    # ------------------------------------------------------------------
+    def snapshot(self):
+        """현재 상태의 읽기 전용 스냅샷 ({key: 읽기 전용 레코드})"""
+        return self._data
+
+    @property
+    def version(self):
+        """쓰기마다 1씩 증가 (스냅샷 변경 여부 확인용)"""
+        return self._version
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def items(self):
+        return self._data.items()
+
+    def values(self):
+        return self._data.values()
+
+    def to_dict(self):
+        """수정 가능한 깊은 복사본 ({key: dict})"""
+        return {key: dict(record) for key, record in self._data.items()}
+
+    def __repr__(self):
+        return f"PositionLedger({self.to_dict()!r})"
+
+    # ------------------------------------------------------------------
+    # 쓰기 (잠금 안에서 복사 후 교체)
+    # ------------------------------------------------------------------
+    def _acquire(self):
+        if self._lock.acquire(blocking=False):
+            return 0.0, False
+        started = time.perf_counter()
+        self._lock.acquire()
+        return (time.perf_counter() - started) * 1000, True
+
+    def _write(self, mutate, key=_MISSING):
+        """mutate(data: dict) → 반환값. data를 수정하면 새 스냅샷으로 교체됩니다.
+
+        key: 변경된 레코드 (저널 기록용, 생략하면 전체 삭제로 기록)
+        """
+        wait_ms, contended = self._acquire()
+        held = time.perf_counter()
+        try:
+            data = dict(self._data)
+            result = mutate(data)
+            self._data = MappingProxyType(data)
+            self._version += 1
+            # 잠금 안에서 기록하여 저널 순서 = 장부 변경 순서
+            if self.journal is not None:
+                if key is _MISSING:
+                    self.journal.record_clear(self.name)
+                else:
+                    self.journal.record(self.name, key, data.get(key))
+            return result
+        finally:
+            hold_ms = (time.perf_counter() - held) * 1000
+            stats = self._stats
+            stats['writes'] += 1
+            stats['hold_total_ms'] += hold_ms
+            if contended:
+                stats['contended'] += 1
+                stats['wait_total_ms'] += wait_ms
+                stats['wait_max_ms'] = max(stats['wait_max_ms'], wait_ms)
+            self._lock.release()
+
+    @staticmethod
+    def _freeze(record):
+        return MappingProxyType(dict(record))
+
+    def __setitem__(self, key, record):
+        frozen = self._freeze(record)
+        self._write(lambda data: data.__setitem__(key, frozen), key)
+
+    def __delitem__(self, key):
+        def mutate(data):
+            del data[key]
+        self._write(mutate, key)
+
+    def pop(self, key, default=_MISSING):
+        if key not in self._data and default is not _MISSING:
+            return default
+        def mutate(data):
+            if default is _MISSING:
+                return data.pop(key)
+            return data.pop(key, default)
+        return self._write(mutate, key)
+
+    def clear(self):
+        self._write(lambda data: data.clear())
+
+    def update_fields(self, key, **fields):
+        """레코드 필드를 원자적으로 갱신합니다. 없는 key면 아무것도 하지 않고 False 반환"""
+        def mutate(data):
+            if key not in data:
+                return False
+            record = dict(data[key])
+            record.update(fields)
+            data[key] = MappingProxyType(record)
+            return True
+        if key not in self._data:
+            return False
+        return self._write(mutate, key)
+
+    def modify(self, key, fn):
+        """읽고-수정하고-쓰기를 원자적으로 실행합니다.
+
+        fn(record): record는 현재 레코드의 수정 가능한 복사본 (없으면 None).
+            새 레코드(dict)를 반환하면 교체, None을 반환하면 삭제.
+        Returns:
+            교체된 레코드 (읽기 전용) 또는 None
+        """
+        def mutate(data):
+            current = data.get(key)
+            record = fn(dict(current) if current is not None else None)
+            if record is None:
+                data.pop(key, None)
+                return None
+            data[key] = MappingProxyType(dict(record))
+            return data[key]
+        return self._write(mutate, key)
+
+    # ------------------------------------------------------------------
+    # 잠금 통계
+    # ------------------------------------------------------------------
+    def lock_stats(self):
+        """{'writes', 'contended', 'wait_total_ms', 'wait_max_ms', 'avg_hold_ms'}
+
+        contended: 다른 스레드가 쓰는 중이라 기다린 쓰기 횟수 (읽기는 잠금을 쓰지 않음)
+        """
+        stats = dict(self._stats)
+        stats['avg_hold_ms'] = stats.pop('hold_total_ms') / stats['writes'] if stats['writes'] else 0.0
+        return stats
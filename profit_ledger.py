@@ -0,0 +1,183 @@
+"""
+매도 체결 수익 장부 (SQLite)
+
+매도 체결 1건(손절, 단계별 익절, 지정가 익절, 종료시간 매도)마다 DATA_DIR/profit_ledger.db에 1행을 추가합니다.
+체결마다 당일 CSV 전체를 다시 읽고 쓰던 방식 대신 작은 INSERT 1회로 끝나며,
+profit_results_YYYYMMDD.csv는 필요할 때(종료시간 정산, 수익률 보기) export_csv()로 만듭니다.
+
+- WAL 모드: 모니터링 스레드가 쓰는 동안에도 GUI 스레드가 읽기 가능
+- 인덱스: 거래일(trade_date), 코인(coin)
+- daily_results(): 거래일의 코인별 합계 (기존 profit_results 형식)
+
+사용 예:
+    ledger = ProfitLedger()
+    ledger.record_fill("KRW-BTC", "손절", volume=0.01, buy_price=..., sell_price=..., buy_amount=..., sell_amount=...)
+    ledger.export_csv("20250101")
+"""
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytz
+
+LEDGER_FILENAME = "profit_ledger.db"
+KST = pytz.timezone('Asia/Seoul')
+CSV_FIELDNAMES = ['코인', '매수가', '매도가', '매수금액', '매도금액', '수익률', '수익금액']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_date TEXT NOT NULL,
+    sell_time TEXT NOT NULL,
+    coin TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    volume REAL NOT NULL,
+    buy_price REAL NOT NULL,
+    sell_price REAL NOT NULL,
+    buy_amount REAL NOT NULL,
+    sell_amount REAL NOT NULL,
+    profit_amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fills_trade_date ON fills (trade_date);
+CREATE INDEX IF NOT EXISTS idx_fills_coin ON fills (coin);
+"""
+
+
+def _data_dir():
+    return os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProfitLedger:
+    """매도 체결 1건당 1행을 추가하는 수익 장부
+
+    Args:
+        path: DB 파일 경로 (None이면 DATA_DIR/profit_ledger.db)
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(_data_dir(), LEDGER_FILENAME)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 모니터링/매수/종료시간 스레드가 함께 쓰므로 연결 1개를 잠금으로 공유
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL에서는 NORMAL이어도 프로그램 비정상 종료 시 커밋된 행이 유지됨
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def record_fill(self, coin, reason, volume, buy_price, sell_price, buy_amount, sell_amount, sell_time=None):
+        """매도 체결 1건 기록
+
+        Args:
+            coin: 마켓 코드 (예: KRW-BTC)
+            reason: 매도 사유 (손절, 지정가 익절, 종료시간 등)
+            volume: 체결 수량
+            buy_price / sell_price: 매수가 / 평균 체결가
+            buy_amount / sell_amount: 체결 수량의 매수금액 / 매도금액
+            sell_time: 체결 시각 (None이면 현재 KST), 거래일은 이 시각의 날짜
+        """
+        sell_time = sell_time or datetime.now(KST)
+        row = (
+            sell_time.strftime("%Y%m%d"), sell_time.isoformat(), coin, reason,
+            float(volume or 0), float(buy_price or 0), float(sell_price or 0),
+            float(buy_amount or 0), float(sell_amount or 0), float((sell_amount or 0) - (buy_amount or 0)),
+        )
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO fills (trade_date, sell_time, coin, reason, volume, buy_price, sell_price, buy_amount, sell_amount, profit_amount) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self.conn.commit()
+
+    def dates(self):
+        """기록이 있는 거래일 목록 (YYYYMMDD, 최신순)"""
+        with self.lock:
+            rows = self.conn.execute("SELECT DISTINCT trade_date FROM fills ORDER BY trade_date DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def fills(self, trade_date=None, coin=None):
+        """체결 기록 목록 ([{'trade_date', 'sell_time', 'coin', 'reason', 'volume', ...}, ...])"""
+        query = "SELECT * FROM fills"
+        conditions, params = [], []
+        if trade_date:
+            conditions.append("trade_date = ?")
+            params.append(trade_date)
+        if coin:
+            conditions.append("coin = ?")
+            params.append(coin)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def daily_results(self, trade_date=None):
+        """거래일의 코인별 합계
+
+        매도가는 체결 수량 가중 평균, 수익률은 매도금액/매수금액 기준입니다.
+
+        Returns:
+            [{'coin', 'buy_price', 'sell_price', 'buy_amount', 'sell_amount', 'profit_pct', 'profit_amount'}, ...]
+            (코인별 첫 체결 순서)
+        """
+        trade_date = trade_date or datetime.now(KST).strftime("%Y%m%d")
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT coin, MIN(id) AS first_id, SUM(volume) AS volume, SUM(buy_amount) AS buy_amount, "
+                "SUM(sell_amount) AS sell_amount, SUM(volume * sell_price) AS sell_value, MAX(buy_price) AS buy_price "
+                "FROM fills WHERE trade_date = ? GROUP BY coin ORDER BY first_id",
+                (trade_date,),
+            ).fetchall()
+        results = []
+        for row in rows:
+            buy_amount = row['buy_amount'] or 0
+            sell_amount = row['sell_amount'] or 0
+            results.append({
+                'coin': row['coin'],
+                'buy_price': row['buy_price'] or 0,
+                'sell_price': row['sell_value'] / row['volume'] if row['volume'] else 0,
+                'buy_amount': buy_amount,
+                'sell_amount': sell_amount,
+                'profit_pct': (sell_amount / buy_amount - 1) * 100 if buy_amount > 0 else 0,
+                'profit_amount': sell_amount - buy_amount,
+            })
+        return results
+
+    def export_csv(self, trade_date=None, path=None):
+        """거래일의 코인별 합계를 profit_results_YYYYMMDD.csv 형식으로 저장
+
+        Returns:
+            저장한 파일 경로 (기록이 없으면 None)
+        """
+        trade_date = trade_date or datetime.now(KST).strftime("%Y%m%d")
+        results = self.daily_results(trade_date)
+        if not results:
+            return None
+        path = path or os.path.join(os.path.dirname(self.path), f"profit_results_{trade_date}.csv")
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            for result in results:
+                writer.writerow({
+                    '코인': result['coin'].replace("KRW-", ""),
+                    '매수가': f"{result['buy_price']:,.2f}",
+                    '매도가': f"{result['sell_price']:,.2f}",
+                    '매수금액': f"{result['buy_amount']:,.0f}",
+                    '매도금액': f"{result['sell_amount']:,.0f}",
+                    '수익률': f"{result['profit_pct']:.2f}%",
+                    '수익금액': f"{result['profit_amount']:,.0f}",
+                })
+        os.replace(temp_path, path)
+        return path
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,293 @@
+"""
+실시간 손절/익절 트리거 (WebSocket)
+
+보유 코인만 업비트 WebSocket(ticker 또는 trade)으로 구독하고, 체결가가 들어올 때마다
+손절/익절 조건을 확인하여 즉시 매도 콜백을 실행합니다.
+REST 폴링 주기(수 초)를 기다리지 않으므로 급락 구간에서도 반응 시간이 짧습니다.
+
+- RiskEngine: 백그라운드 스레드에서 WebSocket 수신, 코인별 1회 트리거, 틱→주문 지연시간 측정
+- ReplayTickerServer: 가격 경로를 업비트 ticker 메시지 형식으로 재생하는 로컬 WebSocket 서버 (테스트용)
+
+사용 예:
+    engine = RiskEngine(on_trigger=lambda coin, event: ..., stop_loss_pct=3, logger=logger)
+    engine.start()
+    engine.set_positions(purchased_coins)   # 보유 코인이 바뀔 때마다 호출
+    ...
+    engine.stop()
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid as uuid_lib
+from concurrent.futures import ThreadPoolExecutor
+
+import websockets
+
+from trigger_index import TriggerIndex
+
+UPBIT_WS_URI = "wss://api.upbit.com/websocket/v1"
+RECV_TIMEOUT_SEC = 0.5
+RECONNECT_DELAY_SEC = 1.0
+
+
+class RiskEngine:
+    """WebSocket 체결가 기반 손절/익절 트리거
+
+    Args:
+        on_trigger: 조건 발생 시 호출 on_trigger(coin, event) (별도 스레드에서 실행)
+            event: {'coin', 'reason'('stop_loss'|'take_profit'), 'price', 'buy_price',
+                    'trigger_price', 'price_drop_pct', 'received_at', 'dispatch_ms', 'order_ms'}
+        stop_loss_pct: 손절 기준 하락률 (%, None이면 손절 안 함)
+        take_profit_pct: 익절 기준 상승률 (%, None이면 익절 안 함)
+        uri: WebSocket 주소 (테스트 시 ReplayTickerServer.uri)
+        stream_type: 'ticker' 또는 'trade'
+        logger: 로그 출력용 (log(msg, level))
+        max_workers: 콜백 실행 스레드 수
+
+    트리거된 코인은 해제되며, set_positions()로 다시 등록해야 재감시합니다.
+    on_trigger가 False를 반환하거나 예외가 나면(매도 실패) 트리거 기록을 풀어
+    다음 set_positions() 때 다시 감시합니다.
+    """
+    def __init__(self, on_trigger, stop_loss_pct=None, take_profit_pct=None, uri=UPBIT_WS_URI, stream_type='ticker', logger=None, max_workers=4):
+        self.on_trigger = on_trigger
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.uri = uri
+        self.stream_type = stream_type
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.index = TriggerIndex()
+        self.fired = set()
+        self.events = []
+        self.tick_count = 0
+        self.stop_event = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.thread = None
+
+    def _log(self, message, level="INFO"):
+        if self.logger:
+            self.logger.log(message, level)
+
+    # ------------------------------------------------------------------
+    # 감시 대상
+    # ------------------------------------------------------------------
+    def set_positions(self, positions):
+        """감시할 보유 코인을 갱신합니다.
+
+        Args:
+            positions: {coin: {'buy_price', ...}} (purchased_coins)
+                이미 트리거된 코인은 목록에 남아 있어도 다시 감시하지 않습니다.
+        """
+        with self.lock:
+            # 보유 목록에서 빠진 코인은 다시 매수될 수 있으므로 트리거 기록 해제
+            self.fired &= set(positions)
+            self.index.sync(positions, self.stop_loss_pct, self.take_profit_pct, exclude=self.fired)
+
+    def watched_coins(self):
+        return self.index.markets()
+
+    # ------------------------------------------------------------------
+    # 틱 처리
+    # ------------------------------------------------------------------
+    def on_tick(self, coin, price, received_at=None):
+        """체결가 1건을 평가합니다. 조건 발생 시 콜백을 실행하고 event를 반환합니다.
+
+        가격을 넘어선 트리거만 인덱스에서 꺼내므로 감시 코인 수와 관계없이 틱당 비용이 일정합니다.
+        """
+        if received_at is None:
+            received_at = time.perf_counter()
+        if not price:
+            return None
+        with self.lock:
+            self.tick_count += 1
+            fired = self.index.on_tick(coin, price)
+            if not fired:
+                return None
+            # 코인별 1회만 실행 (트리거 id가 코인 이름이므로 코인별로 최대 1건)
+            trigger = fired[0]
+            self.fired.add(coin)
+
+        buy_price = trigger['payload']['buy_price']
+        event = {
+            'coin': coin,
+            'reason': trigger['reason'],
+            'price': price,
+            'buy_price': buy_price,
+            'trigger_price': trigger['trigger_price'],
+            'price_drop_pct': (buy_price - price) / buy_price * 100,
+            'received_at': received_at,
+            'dispatch_ms': None,
+            'order_ms': None,
+        }
+        self.executor.submit(self._fire, event)
+        return event
+
+    def on_message(self, raw):
+        """WebSocket 메시지(ticker/trade, DEFAULT 또는 SIMPLE 형식) 1건 처리"""
+        received_at = time.perf_counter()
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        data = json.loads(raw)
+        coin = data.get('code') or data.get('cd')
+        price = data.get('trade_price') or data.get('tp')
+        if coin:
+            return self.on_tick(coin, price, received_at)
+        return None
+
+    def _fire(self, event):
+        started = time.perf_counter()
+        event['dispatch_ms'] = (started - event['received_at']) * 1000
+        try:
+            ok = self.on_trigger(event['coin'], event) is not False
+        except Exception as e:
+            ok = False
+            self._log(f"{event['coin']}: 트리거 처리 중 오류: {e}", "ERROR")
+        if not ok:
+            # 아직 보유 중이면 다음 set_positions()에서 다시 감시
+            with self.lock:
+                self.fired.discard(event['coin'])
+            self._log(f"  {event['coin'].replace('KRW-', '')}: 트리거 처리 실패 → 다시 감시", "WARNING")
+        event['order_ms'] = (time.perf_counter() - event['received_at']) * 1000
+        with self.lock:
+            self.events.append(event)
+        self._log(f"  {event['coin'].replace('KRW-', '')}: 틱→주문 지연 {event['dispatch_ms']:.1f}ms, 틱→매도 완료 {event['order_ms']:.0f}ms", "INFO")
+
+    def latency_stats(self):
+        """{'count', 'avg_dispatch_ms', 'max_dispatch_ms', 'avg_order_ms', 'max_order_ms'}"""
+        with self.lock:
+            events = [event for event in self.events if event['order_ms'] is not None]
+        if not events:
+            return {'count': 0, 'avg_dispatch_ms': None, 'max_dispatch_ms': None, 'avg_order_ms': None, 'max_order_ms': None}
+        dispatch = [event['dispatch_ms'] for event in events]
+        order = [event['order_ms'] for event in events]
+        return {
+            'count': len(events),
+            'avg_dispatch_ms': sum(dispatch) / len(dispatch),
+            'max_dispatch_ms': max(dispatch),
+            'avg_order_ms': sum(order) / len(order),
+            'max_order_ms': max(order),
+        }
+
+    # ------------------------------------------------------------------
+    # WebSocket 수신 스레드
+    # ------------------------------------------------------------------
+    def _subscription(self, coins):
+        return json.dumps([
+            {'ticket': str(uuid_lib.uuid4())[:8]},
+            {'type': self.stream_type, 'codes': coins, 'isOnlyRealtime': True},
+            {'format': 'DEFAULT'},
+        ])
+
+    async def _run(self):
+        while not self.stop_event.is_set():
+            coins = self.watched_coins()
+            if not coins:
+                await asyncio.sleep(RECV_TIMEOUT_SEC)
+                continue
+            try:
+                async with websockets.connect(self.uri, ping_interval=60) as websocket:
+                    await websocket.send(self._subscription(coins))
+                    subscribed = coins
+                    while not self.stop_event.is_set():
+                        # 보유 코인이 바뀌면 구독 메시지를 다시 보냄 (업비트는 마지막 구독으로 대체)
+                        coins = self.watched_coins()
+                        if coins != subscribed:
+                            if not coins:
+                                break
+                            await websocket.send(self._subscription(coins))
+                            subscribed = coins
+                        try:
+                            raw = await asyncio.wait_for(websocket.recv(), RECV_TIMEOUT_SEC)
+                        except asyncio.TimeoutError:
+                            continue
+                        # 잘못된 메시지 1건으로 수신 스레드가 끝나지 않도록 메시지별로 처리
+                        try:
+                            self.on_message(raw)
+                        except Exception as e:
+                            self._log(f"WebSocket 메시지 처리 오류 (무시하고 계속 수신): {e}", "WARNING")
+            except (OSError, websockets.ConnectionClosed, websockets.InvalidHandshake) as e:
+                self._log(f"WebSocket 연결 끊김 ({e.__class__.__name__}), {RECONNECT_DELAY_SEC}초 후 재연결", "WARNING")
+                await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+        self.thread.start()
+        self._log(f"실시간 손절 감시 시작 (WebSocket {self.stream_type}, 손절%: {self.stop_loss_pct}%)", "INFO")
+
+    def stop(self, timeout=2):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.executor.shutdown(wait=False)
+
+
+# ============================================================================
+# 로컬 WebSocket 재생 서버 (테스트용)
+# ============================================================================
+
+class ReplayTickerServer:
+    """가격 경로를 업비트 ticker 메시지로 재생하는 로컬 WebSocket 서버
+
+    Args:
+        paths: {market: [가격, ...]} - 구독 메시지를 받은 뒤 interval초마다 한 단계씩 전송
+        interval: 틱 간격 (초)
+
+    sent: [(market, 가격, 전송 시각(perf_counter))] - 지연시간 측정용
+    """
+    def __init__(self, paths, interval=0.01, host='127.0.0.1', port=0):
+        self.paths = paths
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.uri = None
+        self.sent = []
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    async def _handler(self, websocket):
+        subscription = json.loads(await websocket.recv())
+        codes = next(item['codes'] for item in subscription if 'codes' in item)
+        steps = max((len(self.paths.get(code, [])) for code in codes), default=0)
+        for step in range(steps):
+            if self.stop_event.is_set():
+                break
+            for code in codes:
+                path = self.paths.get(code, [])
+                if step >= len(path):
+                    continue
+                message = {
+                    'type': 'ticker', 'code': code, 'trade_price': path[step],
+                    'timestamp': int(time.time() * 1000), 'stream_type': 'REALTIME',
+                }
+                self.sent.append((code, path[step], time.perf_counter()))
+                # 업비트와 같이 바이너리 프레임으로 전송
+                try:
+                    await websocket.send(json.dumps(message).encode('utf-8'))
+                except websockets.ConnectionClosed:
+                    return
+            await asyncio.sleep(self.interval)
+        await websocket.wait_closed()
+
+    async def _serve(self):
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.uri = f"ws://{self.host}:{self.port}"
+            self.ready.set()
+            while not self.stop_event.is_set():
+                await asyncio.sleep(0.05)
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+        return self.uri
+
+    def stop(self, timeout=2):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
@@ -0,0 +1,314 @@
+"""
+실행 기록 (스캔 1회당 구조화된 기록 1줄)
+
+run_trading_process 1회의 단계별 소요 시간, 엔드포인트별 API 요청 수/응답 크기/재시도/429,
+단계별 남은 후보 수, 기준 시각(분석 시작 정각)부터 첫 주문까지의 지연을
+DATA_DIR/run_journal.jsonl에 한 줄(JSON)로 이어 씁니다. query_runs()로 날짜별 조회/차트용 집계를 합니다.
+
+- 단계: begin_stage(name)로 다음 단계를 시작하면 이전 단계가 끝난 것으로 기록 (들여쓰기 변경 없이 표시)
+- API 계측: 실행 동안 requests.Session.send를 거치는 요청(pyupbit 시세 조회, 직접 requests.get,
+            UpbitClient 주문)을 "METHOD /경로" 단위로 집계
+  재시도: 실패(4xx/5xx 또는 예외)한 요청과 메소드/URL/본문이 같은 요청이 다시 나가면 1회로 계산
+  첫 주문: 기준 시각 이후 처음 나간 POST /v1/orders
+- 계측 대상 스레드: start()를 호출한 스레드와, 그 스레드에서 carry_journal()로 감싸 넘긴 작업을
+  실행하는 작업 스레드(병렬 매수 등)만 기록합니다. 가격 모니터링 등 다른 스레드의 요청은 제외됩니다.
+
+사용 예:
+    journal = RunJournal()
+    journal.start(boundary=boundary_ts)
+    journal.begin_stage('market_list')
+    ...
+    executor.map(carry_journal(submit_buy), coins)
+    journal.candidates('market_list', len(coins))
+    record = journal.finish()
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import pytz
+import requests
+
+JOURNAL_FILENAME = "run_journal.jsonl"
+KST = pytz.timezone('Asia/Seoul')
+ORDER_ENDPOINT = "POST /v1/orders"
+
+_meter_lock = threading.Lock()
+_listeners = []
+_original_send = None
+# 스레드별 기록 중인 RunJournal
+_context = threading.local()
+
+
+def default_journal_path():
+    data_dir = os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(data_dir, JOURNAL_FILENAME)
+
+
+# ============================================================================
+# API 요청 계측 (requests.Session.send)
+# ============================================================================
+
+def _metered_send(session, request, **kwargs):
+    if not _listeners:
+        return _original_send(session, request, **kwargs)
+    started = time.perf_counter()
+    try:
+        response = _original_send(session, request, **kwargs)
+    except Exception as e:
+        _notify(request, None, 0, time.perf_counter() - started, e)
+        raise
+    # stream=False(기본)면 send 안에서 본문을 이미 읽었으므로 추가 비용 없음
+    size = len(response.content) if not kwargs.get('stream') else int(response.headers.get('Content-Length') or 0)
+    _notify(request, response.status_code, size, time.perf_counter() - started, None)
+    return response
+
+
+def _notify(request, status, size, elapsed, error):
+    for listener in list(_listeners):
+        try:
+            listener(request.method, request.url, status, size, elapsed, error, request.body)
+        except Exception:
+            pass
+
+
+def add_request_listener(listener):
+    """모든 HTTP 요청 완료 시 listener(method, url, status, bytes, elapsed_sec, error, body) 호출
+
+    listener는 요청을 보낸 스레드에서 호출됩니다.
+
+    처음 호출할 때 requests.Session.send를 계측 함수로 한 번 감쌉니다 (listener가 없으면 원래 함수만 호출).
+    """
+    global _original_send
+    with _meter_lock:
+        if _original_send is None:
+            _original_send = requests.Session.send
+            requests.Session.send = _metered_send
+        _listeners.append(listener)
+
+
+def remove_request_listener(listener):
+    with _meter_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def current_journal():
+    """현재 스레드에 연결된 RunJournal (없으면 None)"""
+    return getattr(_context, 'journal', None)
+
+
+def carry_journal(func):
+    """현재 스레드의 RunJournal을 작업 스레드에서도 기록하도록 func를 감쌉니다.
+
+    ThreadPoolExecutor 등 다른 스레드에서 실행할 함수를 호출하는 스레드에서 감싸야 합니다.
+    기록 중인 실행이 없으면 func를 그대로 반환합니다.
+    """
+    journal = current_journal()
+    if journal is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        previous = current_journal()
+        _context.journal = journal
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _context.journal = previous
+    return wrapper
+
+
+def endpoint_name(method, url):
+    """'GET /v1/ticker' 형식 (쿼리 제외)"""
+    return f"{method} {urlsplit(url).path}"
+
+
+# ============================================================================
+# 실행 기록
+# ============================================================================
+
+class RunJournal:
+    """스캔 1회의 단계별 시간, API 요청, 후보 수 기록
+
+    Args:
+        path: 기록 파일 경로 (None이면 DATA_DIR/run_journal.jsonl)
+    """
+    def __init__(self, path=None):
+        self.path = path or default_journal_path()
+        self.lock = threading.Lock()
+        self.run_id = None
+        self.started_at = None
+        self.started = None
+        self.boundary = None
+        self.first_order_at = None
+        self.stages = {}
+        self.stage_order = []
+        self.current_stage = None
+        self.stage_started = None
+        self.survivors = {}
+        self.endpoints = {}
+        self.failed_requests = set()
+        self.extra = {}
+
+    def start(self, boundary=None):
+        """기록 시작
+
+        Args:
+            boundary: 기준 시각 (epoch 초, 분석 시작 정각) - 첫 주문 지연 계산용
+        """
+        self.started_at = datetime.now(KST)
+        self.run_id = self.started_at.strftime("%Y%m%d_%H%M%S")
+        self.started = time.perf_counter()
+        self.boundary = boundary
+        _context.journal = self
+        add_request_listener(self._on_request)
+        return self.run_id
+
+    def _on_request(self, method, url, status, size, elapsed, error, body):
+        if current_journal() is not self:
+            return
+        name = endpoint_name(method, url)
+        key = (method, url, body)
+        now = time.time()
+        with self.lock:
+            stats = self.endpoints.setdefault(name, {'requests': 0, 'bytes': 0, 'retries': 0, 'status_429': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['requests'] += 1
+            stats['bytes'] += size
+            elapsed_ms = elapsed * 1000
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            if key in self.failed_requests:
+                stats['retries'] += 1
+                self.failed_requests.discard(key)
+            if status == 429:
+                stats['status_429'] += 1
+            if error is not None or (status is not None and status >= 400):
+                stats['errors'] += 1
+                self.failed_requests.add(key)
+            if name == ORDER_ENDPOINT and self.first_order_at is None:
+                # 요청을 보낸 시각 기준
+                self.first_order_at = now - elapsed
+
+    # ------------------------------------------------------------------
+    # 단계 / 후보 수
+    # ------------------------------------------------------------------
+    def begin_stage(self, name):
+        """다음 단계 시작 (진행 중인 단계는 종료). 같은 이름을 다시 시작하면 시간이 합산됨"""
+        now = time.perf_counter()
+        with self.lock:
+            self._end_stage_locked(now)
+            self.current_stage = name
+            self.stage_started = now
+            if name not in self.stages:
+                self.stages[name] = 0.0
+                self.stage_order.append(name)
+
+    def end_stage(self):
+        with self.lock:
+            self._end_stage_locked(time.perf_counter())
+
+    def _end_stage_locked(self, now):
+        if self.current_stage is not None:
+            self.stages[self.current_stage] += (now - self.stage_started) * 1000
+            self.current_stage = None
+
+    def candidates(self, stage, count):
+        """단계를 통과한 후보 수"""
+        with self.lock:
+            self.survivors[stage] = count
+
+    def note(self, **fields):
+        """기록에 추가할 값 (설정값 등)"""
+        with self.lock:
+            self.extra.update(fields)
+
+    # ------------------------------------------------------------------
+    # 종료
+    # ------------------------------------------------------------------
+    def finish(self, status='ok', error=None):
+        """기록을 마치고 파일에 한 줄 추가합니다.
+
+        Returns:
+            기록한 dict
+        """
+        remove_request_listener(self._on_request)
+        if current_journal() is self:
+            _context.journal = None
+        with self.lock:
+            self._end_stage_locked(time.perf_counter())
+            totals = {'requests': 0, 'bytes': 0, 'retries': 0, 'status_429': 0, 'errors': 0}
+            for stats in self.endpoints.values():
+                for key in totals:
+                    totals[key] += stats[key]
+            first_order_ms = None
+            if self.boundary is not None and self.first_order_at is not None:
+                first_order_ms = (self.first_order_at - self.boundary) * 1000
+            record = {
+                'run_id': self.run_id,
+                'date': self.started_at.strftime("%Y%m%d"),
+                'started_at': self.started_at.isoformat(),
+                'status': status,
+                'error': str(error) if error else None,
+                'total_ms': round((time.perf_counter() - self.started) * 1000, 1),
+                'boundary_at': datetime.fromtimestamp(self.boundary, KST).isoformat() if self.boundary else None,
+                'boundary_to_first_order_ms': round(first_order_ms, 1) if first_order_ms is not None else None,
+                'stages_ms': {name: round(self.stages[name], 1) for name in self.stage_order},
+                'candidates': dict(self.survivors),
+                'api': {name: dict(stats, total_ms=round(stats['total_ms'], 1), max_ms=round(stats['max_ms'], 1)) for name, stats in sorted(self.endpoints.items())},
+                'api_totals': totals,
+            }
+            record.update(self.extra)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+
+def format_summary(record):
+    """로그 출력용 한 줄 요약"""
+    stages = ", ".join(f"{name} {ms / 1000:.2f}초" for name, ms in record['stages_ms'].items())
+    totals = record['api_totals']
+    text = f"단계별 시간: {stages} | API {totals['requests']}회 {totals['bytes'] / 1024:.0f}KB (429 {totals['status_429']}회, 재시도 {totals['retries']}회)"
+    if record.get('boundary_to_first_order_ms') is not None:
+        text += f" | 기준 시각→첫 주문 {record['boundary_to_first_order_ms'] / 1000:.2f}초"
+    return text
+
+
+def query_runs(path=None, since=None, until=None, status=None):
+    """기록 조회
+
+    Args:
+        since / until: 거래일 범위 (YYYYMMDD, 포함)
+        status: 'ok' / 'error' 등 (None이면 전체)
+
+    Returns:
+        [기록 dict, ...] (기록 순서)
+    """
+    path = path or default_journal_path()
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if since and record['date'] < since:
+                continue
+            if until and record['date'] > until:
+                continue
+            if status and record['status'] != status:
+                continue
+            runs.append(record)
+    return runs
+
+
+def stage_series(runs, stage):
+    """차트용 [(started_at, 단계 소요 ms), ...] (그 단계가 없는 실행은 제외)"""
+    return [(run['started_at'], run['stages_ms'][stage]) for run in runs if stage in run.get('stages_ms', {})]
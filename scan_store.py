@@ -0,0 +1,233 @@
+"""
+슬리피지 필터링 결과 저장소 (SQLite)
+
+스캔 1회의 결과를 숫자 그대로(표시용 문자열 아님) DATA_DIR/scan_results.db에 저장합니다.
+실행 시각(run_id: YYYYMMDD_HHMMSS)이 키이므로 이력 목록은 인덱스 조회, 실행 1건 불러오기는 범위 읽기 1회입니다.
+CSV 파일과 HTML 팝업은 저장된 숫자 데이터에서 format_scan_row()로 만듭니다.
+
+- runs: run_id, 생성 시각, 슬리피지 기준, 결과 수
+- results: (run_id, 순위) 기본키 - run_id 순으로 저장되어 실행 1건의 행이 연속됨
+- import_legacy_csv(): 이전 버전이 만든 slippage_results_*.csv를 한 번만 읽어 저장소로 옮김
+
+사용 예:
+    store = get_scan_store()
+    run_id = store.save_run(filtered_results, max_slippage)
+    run, results = store.load_run(run_id)
+"""
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytz
+
+STORE_FILENAME = "scan_results.db"
+KST = pytz.timezone('Asia/Seoul')
+CSV_FIELDNAMES = ['순위', '코인', '일봉필터링', '가격변동률', '거래량변동률', '최저매도가', '평균매수가', '슬리피지', '호가스프레드', '소진호가수']
+RESULT_FIELDS = ['coin', 'day_candle_pass', 'price_change', 'volume_change', 'lowest_ask', 'avg_price', 'price_diff_pct', 'spread_pct', 'filled_asks_count']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    max_slippage REAL,
+    result_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    coin TEXT NOT NULL,
+    day_candle_pass INTEGER NOT NULL,
+    price_change REAL,
+    volume_change REAL,
+    lowest_ask REAL,
+    avg_price REAL,
+    price_diff_pct REAL,
+    spread_pct REAL,
+    filled_asks_count INTEGER,
+    PRIMARY KEY (run_id, rank)
+) WITHOUT ROWID;
+"""
+
+_shared_lock = threading.Lock()
+_shared = {'store': None}
+
+
+def _data_dir():
+    return os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+
+def format_scan_row(rank, result):
+    """결과 1건을 CSV/HTML 표시용 문자열로 변환 ({CSV 열 이름: 문자열})"""
+    return {
+        '순위': rank,
+        '코인': (result.get('coin') or '').replace("KRW-", ""),
+        '일봉필터링': "O" if result.get('day_candle_pass') else "X",
+        '가격변동률': f"+{result.get('price_change') or 0:.2f}%",
+        '거래량변동률': f"+{result.get('volume_change') or 0:.2f}%",
+        '최저매도가': f"{result.get('lowest_ask') or 0:,.0f}원",
+        '평균매수가': f"{result.get('avg_price') or 0:,.0f}원",
+        '슬리피지': f"{result.get('price_diff_pct') or 0:.4f}%",
+        '호가스프레드': f"{result.get('spread_pct') or 0:.4f}%",
+        '소진호가수': f"{result.get('filled_asks_count') or 0}개",
+    }
+
+
+def _parse_number(text, suffixes=('원', '%', '개')):
+    text = (text or '').replace(',', '').replace('+', '').strip()
+    for suffix in suffixes:
+        text = text.replace(suffix, '')
+    return float(text) if text else 0.0
+
+
+class ScanStore:
+    """슬리피지 필터링 결과 저장소
+
+    Args:
+        path: DB 파일 경로 (None이면 DATA_DIR/scan_results.db)
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(_data_dir(), STORE_FILENAME)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def save_run(self, results, max_slippage=None, run_id=None, created_at=None):
+        """스캔 결과 저장 (results의 순서가 순위)
+
+        Args:
+            results: [{'coin', 'day_candle_pass', 'price_change', 'volume_change', 'lowest_ask',
+                       'avg_price', 'price_diff_pct', 'spread_pct', 'filled_asks_count'}, ...]
+            max_slippage: 이 스캔의 슬리피지 기준 (%)
+            run_id: 실행 키 (None이면 created_at의 YYYYMMDD_HHMMSS, 같은 키가 있으면 교체)
+
+        Returns:
+            run_id
+        """
+        created_at = created_at or datetime.now(KST)
+        run_id = run_id or created_at.strftime("%Y%m%d_%H%M%S")
+        rows = [
+            (
+                run_id, rank, result.get('coin') or '', 1 if result.get('day_candle_pass') else 0,
+                result.get('price_change'), result.get('volume_change'), result.get('lowest_ask'),
+                result.get('avg_price'), result.get('price_diff_pct'), result.get('spread_pct'),
+                result.get('filled_asks_count'),
+            )
+            for rank, result in enumerate(results, 1)
+        ]
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, created_at, max_slippage, result_count) VALUES (?, ?, ?, ?)",
+                    (run_id, created_at.isoformat(), max_slippage, len(rows)),
+                )
+                self.conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return run_id
+
+    def list_runs(self, limit=None):
+        """저장된 실행 목록 (최신순)
+
+        Returns:
+            [{'run_id', 'created_at', 'max_slippage', 'result_count'}, ...]
+        """
+        query = "SELECT run_id, created_at, max_slippage, result_count FROM runs ORDER BY run_id DESC"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def has_run(self, run_id):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def load_run(self, run_id):
+        """실행 1건 불러오기
+
+        Returns:
+            (run, results) - run: {'run_id', 'created_at', 'max_slippage', 'result_count'} (없으면 None),
+            results: 순위순 [{'coin', 'coin_symbol', 'day_candle_pass'(bool), 'price_change', ...}, ...]
+        """
+        with self.lock:
+            run = self.conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            rows = self.conn.execute(
+                f"SELECT {', '.join(RESULT_FIELDS)} FROM results WHERE run_id = ? ORDER BY rank", (run_id,)
+            ).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            result['day_candle_pass'] = bool(result['day_candle_pass'])
+            result['coin_symbol'] = result['coin'].replace("KRW-", "")
+            results.append(result)
+        return (dict(run) if run else None), results
+
+    def export_csv(self, run_id, path=None):
+        """실행 1건을 slippage_results_{run_id}.csv로 저장 (표시 형식)
+
+        Returns:
+            저장한 파일 경로 (실행이 없으면 None)
+        """
+        run, results = self.load_run(run_id)
+        if run is None:
+            return None
+        path = path or os.path.join(os.path.dirname(self.path), f"slippage_results_{run_id}.csv")
+        with open(path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            for rank, result in enumerate(results, 1):
+                writer.writerow(format_scan_row(rank, result))
+        return path
+
+    def import_legacy_csv(self, path):
+        """이전 버전의 slippage_results_YYYYMMDD_HHMMSS.csv를 저장소로 옮깁니다.
+
+        이미 같은 run_id가 있으면 읽지 않습니다. 파일명에서 run_id를 알 수 없으면 None.
+
+        Returns:
+            run_id 또는 None
+        """
+        run_id = os.path.basename(path).replace("slippage_results_", "").replace(".csv", "")
+        try:
+            created_at = KST.localize(datetime.strptime(run_id, "%Y%m%d_%H%M%S"))
+        except ValueError:
+            return None
+        if self.has_run(run_id):
+            return run_id
+        results = []
+        with open(path, 'r', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                results.append({
+                    'coin': f"KRW-{row['코인']}",
+                    'day_candle_pass': (row.get('일봉필터링') or row.get('매수추천') or '').strip().upper() == 'O',
+                    'price_change': _parse_number(row.get('가격변동률')),
+                    'volume_change': _parse_number(row.get('거래량변동률')),
+                    'lowest_ask': _parse_number(row.get('최저매도가')),
+                    'avg_price': _parse_number(row.get('평균매수가')),
+                    'price_diff_pct': abs(_parse_number(row.get('슬리피지'))),
+                    'spread_pct': _parse_number(row.get('호가스프레드')),
+                    'filled_asks_count': int(_parse_number(row.get('소진호가수'))),
+                })
+        # 이전 CSV에는 슬리피지 기준이 저장되지 않음
+        return self.save_run(results, max_slippage=None, run_id=run_id, created_at=created_at)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def get_scan_store():
+    """프로세스 공용 ScanStore (스캔 스레드와 GUI 스레드가 함께 사용)"""
+    with _shared_lock:
+        if _shared['store'] is None:
+            _shared['store'] = ScanStore()
+        return _shared['store']
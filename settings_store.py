@@ -0,0 +1,252 @@
+"""
+설정 저장소 (trading_config.json)
+
+설정값을 로드할 때 한 번 타입을 검증/변환하여 숫자는 숫자, 체크박스는 bool로 보관하고,
+GUI 입력이 바뀔 때마다 파일을 쓰지 않고 짧은 시간(save_delay) 동안의 변경을 모아 한 번 저장합니다.
+
+- 로드: SETTINGS_SCHEMA의 타입으로 변환, 변환할 수 없는 값은 기본값 사용 (errors에 기록)
+- 입력 반영: set_from_input(key, 문자열) - 입력 중인 값(빈 값, "0." 등)처럼 변환할 수 없으면 마지막 정상 값 유지
+- 저장: 백그라운드 스레드가 마지막 변경 후 save_delay초가 지나면 임시 파일에 쓰고 fsync 후 os.replace
+        (UI 스레드에서 파일을 쓰지 않으며, 저장 도중 종료되어도 기존 파일은 그대로 남음)
+- 읽기: store["stop_loss"] → 5.0 (타입 변환된 값), store.display("hour") → "09" (입력창 표시용)
+
+사용 예:
+    settings = SettingsStore(CONFIG_FILE)
+    settings.set_from_input("slippage", "0.5")   # 0.5초 뒤 저장
+    settings.flush()                              # 종료 시 즉시 저장
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+# key: (타입, 기본값, 입력창 표시 형식)
+SETTINGS_SCHEMA = {
+    "interval": (int, 1, "{}"),
+    "hour": (int, 9, "{:02d}"),
+    "minute": (int, 0, "{:02d}"),
+    "end_hour": (int, 23, "{:02d}"),
+    "end_minute": (int, 0, "{:02d}"),
+    "price_change_min": (float, 0.2, "{}"),
+    "price_change_max": (float, 5.0, "{}"),
+    "volume_change_min": (float, 100.0, "{:g}"),
+    "slippage": (float, 0.3, "{}"),
+    "max_spread": (float, 0.2, "{}"),
+    "day_candle_filter": (bool, False, "{}"),
+    "auto_trade": (bool, False, "{}"),
+    "sell_percentage": (float, 3.0, "{:g}"),
+    "sell_ratio": (str, "절반", "{}"),
+    "investment_ratio": (float, 100.0, "{:g}"),
+    "max_coins": (int, 10, "{}"),
+    "stop_loss": (float, 5.0, "{:g}"),
+    "exclude_coins": (str, "", "{}"),
+    # 트레일링 스탑/단계별 익절/보유시간 청산 (설정 파일에서만 지정, exit_engine.py 참고)
+    "exit_rules": (dict, {}, "{}"),
+}
+
+
+def _convert(value_type, value):
+    """값을 설정 타입으로 변환 (변환할 수 없으면 ValueError)"""
+    if value_type is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)):
+            return bool(value)
+        text = str(value).strip().lower()
+        if text in ("1", "true", "yes", "on"):
+            return True
+        if text in ("0", "false", "no", "off", ""):
+            return False
+        raise ValueError(f"bool 값이 아님: {value!r}")
+    if value_type in (int, float):
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            number = float(str(value).strip())
+            if not math.isfinite(number):
+                raise ValueError
+            if value_type is int and number != int(number):
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{'정수' if value_type is int else '숫자'} 값이 아님: {value!r}") from None
+        return int(number) if value_type is int else number
+    if value_type is dict:
+        if not isinstance(value, dict):
+            raise ValueError(f"객체 값이 아님: {value!r}")
+        return dict(value)
+    return str(value)
+
+
+class SettingsStore:
+    """타입이 지정된 설정값 + 지연(debounce) 원자적 저장
+
+    Args:
+        path: 설정 파일 경로
+        save_delay: 마지막 변경 후 저장까지 기다리는 시간 (초)
+    """
+    def __init__(self, path, save_delay=0.5):
+        self.path = path
+        self.save_delay = save_delay
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.values = {key: (dict(default) if isinstance(default, dict) else default) for key, (_, default, _) in SETTINGS_SCHEMA.items()}
+        self.errors = []
+        self.version = 0
+        self.saved_version = 0
+        self.last_change = 0.0
+        self.changed = threading.Condition(self.lock)
+        self.closed = False
+        self.stats = {'changes': 0, 'saves': 0}
+        self.load()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    # ------------------------------------------------------------------
+    # 로드
+    # ------------------------------------------------------------------
+    def load(self):
+        """설정 파일을 읽어 타입을 검증/변환합니다. (없는 키/잘못된 값은 기본값)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except Exception as e:
+            self.errors.append(f"설정 파일 로드 오류: {e}")
+            return
+        for key, value in saved.items():
+            if key not in SETTINGS_SCHEMA:
+                # 알 수 없는 키도 다음 저장 때 지워지지 않도록 그대로 보관
+                self.values[key] = value
+                continue
+            value_type = SETTINGS_SCHEMA[key][0]
+            try:
+                self.values[key] = _convert(value_type, value)
+            except (TypeError, ValueError) as e:
+                self.errors.append(f"{key}: {e} → 기본값 {SETTINGS_SCHEMA[key][1]!r} 사용")
+
+    # ------------------------------------------------------------------
+    # 읽기
+    # ------------------------------------------------------------------
+    def __getitem__(self, key):
+        with self.lock:
+            return self.values[key]
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.values.get(key, default)
+
+    def display(self, key):
+        """입력창에 표시할 문자열"""
+        value = self.get(key)
+        if key in SETTINGS_SCHEMA and value is not None:
+            return SETTINGS_SCHEMA[key][2].format(value)
+        return "" if value is None else str(value)
+
+    def as_dict(self):
+        with self.lock:
+            return dict(self.values)
+
+    # ------------------------------------------------------------------
+    # 변경
+    # ------------------------------------------------------------------
+    def set(self, key, value):
+        """타입이 맞는 값으로 변경 (변환할 수 없으면 ValueError). 변경되면 저장 예약"""
+        if key in SETTINGS_SCHEMA:
+            value = _convert(SETTINGS_SCHEMA[key][0], value)
+        with self.lock:
+            if self.values.get(key) == value:
+                return False
+            self.values[key] = value
+            self.version += 1
+            self.last_change = time.monotonic()
+            self.stats['changes'] += 1
+            self.changed.notify()
+        return True
+
+    def set_from_input(self, key, text):
+        """GUI 입력값 반영. 변환할 수 없는 입력(입력 중인 값)은 무시하고 False 반환"""
+        try:
+            return self.set(key, text)
+        except (TypeError, ValueError):
+            return False
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set_from_input(key, value)
+
+    # ------------------------------------------------------------------
+    # 저장 (백그라운드 스레드)
+    # ------------------------------------------------------------------
+    def _write_loop(self):
+        with self.lock:
+            while not self.closed:
+                if self.version == self.saved_version:
+                    self.changed.wait()
+                    continue
+                # 마지막 변경 후 save_delay초 동안 추가 변경이 없을 때까지 대기
+                remaining = self.last_change + self.save_delay - time.monotonic()
+                if remaining > 0:
+                    self.changed.wait(remaining)
+                    continue
+                # 파일을 쓰는 동안 잠금을 풀어 UI 스레드의 set()이 기다리지 않도록 함
+                self.lock.release()
+                try:
+                    self._save()
+                finally:
+                    self.lock.acquire()
+
+    def _save(self):
+        """현재 값을 파일에 저장 (잠금을 잡지 않은 상태에서 호출)"""
+        # 파일 쓰기는 한 번에 하나씩, 쓰기 직전의 최신 값으로 (오래된 값이 나중에 덮어쓰지 않도록)
+        with self.write_lock:
+            with self.lock:
+                if self.version == self.saved_version:
+                    return True
+                snapshot, version = dict(self.values), self.version
+            try:
+                self._write_file(snapshot)
+            except OSError as e:
+                print(f"설정 파일 저장 오류: {e}")
+                with self.lock:
+                    # save_delay 후 다시 시도
+                    self.last_change = time.monotonic()
+                return False
+            with self.lock:
+                self.saved_version = version
+                self.stats['saves'] += 1
+            return True
+
+    def _write_file(self, settings):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".trading_config.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(settings, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def flush(self):
+        """저장되지 않은 변경이 있으면 즉시 저장 (호출한 스레드에서 실행)"""
+        with self.lock:
+            if self.version != self.saved_version:
+                # 파일을 쓰는 동안 잠금을 풀어 UI 스레드의 set()이 기다리지 않도록 함
+                self.lock.release()
+                try:
+                    self._save()
+                finally:
+                    self.lock.acquire()
+
+    def close(self):
+        """남은 변경을 저장하고 저장 스레드 종료"""
+        self.flush()
+        with self.lock:
+            self.closed = True
+            self.changed.notify()
@@ -4,41 +4,48 @@ CHAT_ID = "1748799133"
 channel_id = '1748799133'  # 그룹 채널 id는 음수 
 # channel_id = '-1002204342572'  # 그룹 채널 id는 음수 
 
-import requests
+import atexit
+import os
+import threading
 from datetime import datetime
 import pytz
+from telegram_notifier import DEFAULT_API_BASE, TelegramNotifier
 
 KST = pytz.timezone('Asia/Seoul')
+# 로컬 HTTP 서버로 테스트할 때 TELEGRAM_API_BASE=http://127.0.0.1:포트
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", DEFAULT_API_BASE)
+
+_shared_lock = threading.Lock()
+_shared = {'notifier': None}
 
 def get_kst_now():
     """한국 시간(KST)으로 현재 시간을 반환합니다."""
     return datetime.now(KST)
 
+def get_telegram_notifier():
+    """프로세스 공용 전송기 (처음 호출 시 전송 스레드 시작, 프로그램 종료 시 남은 메시지 전송)"""
+    with _shared_lock:
+        if _shared['notifier'] is None:
+            notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, api_base=TELEGRAM_API_BASE)
+            notifier.start()
+            atexit.register(notifier.close)
+            _shared['notifier'] = notifier
+        return _shared['notifier']
+
 def send_telegram_message(message, chat_id=None, parse_mode='HTML'):
-    """텔레그램 메시지를 전송합니다.
+    """텔레그램 메시지를 전송 큐에 넣습니다. (전송은 백그라운드 스레드, 바로 반환)
     
     Args:
         message: 전송할 메시지 내용
         chat_id: 채팅 ID (None이면 기본 CHAT_ID 사용)
         parse_mode: 메시지 파싱 모드 (HTML, Markdown 등)
+    
+    Returns:
+        Future - 결과가 필요하면 .result()로 전송 성공 여부(True/False) 확인
     """
     if chat_id is None:
         chat_id = CHAT_ID
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': parse_mode
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"텔레그램 메시지 전송 실패: {e}")
-        return False
+    return get_telegram_notifier().submit(message, chat_id, parse_mode)
 
 def send_analysis_start_notification(settings_info):
     """프로그램 시작 알림을 전송합니다."""
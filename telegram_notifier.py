@@ -0,0 +1,411 @@
+"""
+텔레그램 비동기 전송기
+
+send_telegram_message가 requests.post(timeout=10)로 직접 보내면 텔레그램 응답이 늦을 때 호출한 스레드
+(매매 경로 포함)가 최대 10초 멈춥니다. TelegramNotifier는 메시지를 큐에 넣기만 하고 바로 반환하며,
+백그라운드 스레드 1개가 연결을 재사용하는 Session으로 순서대로 보냅니다.
+
+- 호출: submit()은 즉시 concurrent.futures.Future를 반환 (무시하면 fire-and-forget, .result()는 True/False)
+- 메모리: 큐 최대 max_queue건, 가득 차면 새 메시지를 버리고 dropped 증가 (Future는 False)
+- 재시도: 429는 응답의 retry_after만큼 기다린 뒤, 네트워크 오류/5xx는 짧게 기다린 뒤 max_retries회까지
+- 묶음 전송: coalesce_window초 안에 같은 채팅으로 들어온 메시지는 4096자 이내에서 한 메시지로 합침
+- 분할: 4096자를 넘는 메시지는 줄 단위(줄이 너무 길면 단어 단위)로 나누고, 나눈 곳에서 열린
+        HTML 태그는 닫았다가 다음 메시지 앞에서 다시 엶 (태그/엔티티 중간에서는 자르지 않음)
+- 속도 제한: 토큰 버킷으로 전체 초당 30건, 채팅당 초당 1건(그룹은 분당 20건) 이내로 보내
+        429가 나기 전에 기다림. 429를 받으면 그 채팅 버킷을 retry_after 동안 멈춤
+- 지표: metrics() - 큐 길이, 전송/실패/버림/재시도 수, 대기+전송 지연(평균/p95/최대), 요청 시간,
+        합친/나눈 메시지 수, 속도 제한 대기 시간
+- 테스트: api_base에 로컬 HTTP 서버 주소를 주면 /bot{token}/sendMessage로 그대로 보냄
+
+사용 예:
+    notifier = TelegramNotifier(token)
+    notifier.start()
+    future = notifier.submit("메시지", chat_id)
+    notifier.close()    # 남은 메시지를 보내고 종료
+"""
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_BASE = "https://api.telegram.org"
+# 지연 통계에 보관하는 최근 전송 수
+LATENCY_SAMPLES = 500
+# sendMessage 본문 최대 길이
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n"
+# 한 번에 모아 처리하는 최대 메시지 수
+COALESCE_MAX_ITEMS = 200
+
+# 텔레그램 안내 기준 전송 한도 (초당 건수, 버스트)
+GLOBAL_RATE = (30.0, 30)
+CHAT_RATE = (1.0, 3)
+GROUP_CHAT_RATE = (20 / 60, 3)
+
+# HTML 태그, 엔티티, 공백, 나머지 텍스트
+_HTML_TOKEN = re.compile(r'<[^>]*>|&#?\w+;|\s+|[^<&\s]+|[<&]')
+_HTML_TAG = re.compile(r'<(/?)([a-zA-Z-]+)[^>]*>')
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 capacity개까지 쌓이는 토큰 버킷 (전송 스레드 전용)"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """토큰 1개를 쓸 수 있을 때까지 남은 시간 (초, 0이면 바로 가능)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """429 retry_after 동안 전송 중지 (쌓인 토큰도 비움)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+def _is_group_chat(chat_id):
+    # 그룹/채널 id는 음수
+    return str(chat_id).startswith('-')
+
+
+def _apply_tags(stack, text):
+    """text의 열고 닫는 태그를 반영한 열린 태그 목록 [(이름, 여는 태그), ...]"""
+    stack = list(stack)
+    for match in _HTML_TAG.finditer(text):
+        name = match.group(2).lower()
+        if not match.group(1):
+            stack.append((name, match.group(0)))
+            continue
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index][0] == name:
+                del stack[index:]
+                break
+    return stack
+
+
+def _closing_tags(stack):
+    return "".join(f"</{name}>" for name, _ in reversed(stack))
+
+
+def _split_units(text, line_limit, token_limit):
+    """줄 단위 조각. line_limit보다 긴 줄은 태그/엔티티를 자르지 않는 단어 단위로"""
+    units = []
+    for line in text.splitlines(keepends=True):
+        if len(line) <= line_limit:
+            units.append(line)
+            continue
+        for token in _HTML_TOKEN.findall(line):
+            # 공백 없이 긴 텍스트는 강제로 자름
+            while len(token) > token_limit:
+                units.append(token[:token_limit])
+                token = token[token_limit:]
+            units.append(token)
+    return units
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH, parse_mode='HTML'):
+    """limit자를 넘는 메시지를 여러 개로 나눔 (HTML이면 나눈 곳의 열린 태그를 닫고 다음 조각에서 다시 엶)
+
+    Returns:
+        [메시지, ...] (빈 조각 제외)
+    """
+    if len(text) <= limit:
+        return [text]
+    html = (parse_mode or '').upper() == 'HTML'
+    # 다시 여는 태그/닫는 태그가 들어갈 여유
+    units = _split_units(text, limit // 2, limit // 4) if html else _split_units(text, limit, limit)
+    chunks = []
+    stack = []
+    body, length = "", 0
+    for unit in units:
+        next_stack = _apply_tags(stack, unit) if html else stack
+        if body.strip() and length + len(unit) + len(_closing_tags(next_stack)) > limit:
+            chunks.append(body + _closing_tags(stack))
+            body = "".join(tag for _, tag in stack)
+            length = len(body)
+        body += unit
+        length += len(unit)
+        stack = next_stack
+    chunks.append(body + _closing_tags(stack))
+    return [chunk.strip("\n") for chunk in chunks if chunk.strip()]
+
+
+class TelegramNotifier:
+    """텔레그램 메시지 큐 + 백그라운드 전송 스레드
+
+    Args:
+        token: 봇 토큰
+        api_base: API 주소 (테스트 시 로컬 HTTP 서버)
+        max_queue: 전송 대기 최대 건수
+        timeout: 요청 1회 타임아웃 (초)
+        max_retries: 실패 시 재시도 횟수
+        retry_delay: 네트워크 오류/5xx 재시도 대기 (초, 시도마다 2배)
+        coalesce_window: 첫 메시지 후 같은 채팅 메시지를 모으는 시간 (초, 0이면 이미 쌓인 메시지만 합침)
+        max_length: 메시지 1건 최대 길이
+    """
+    def __init__(self, token, api_base=DEFAULT_API_BASE, max_queue=1000, timeout=10, max_retries=3, retry_delay=1.0, coalesce_window=0.3, max_length=MAX_MESSAGE_LENGTH):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.coalesce_window = coalesce_window
+        self.max_length = max_length
+        self.global_bucket = TokenBucket(*GLOBAL_RATE)
+        self.chat_buckets = {}
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        # 전송 스레드가 1개이므로 연결 1개를 계속 재사용
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats_lock = threading.Lock()
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'retries': 0, 'rate_limited': 0,
+                      'requests': 0, 'coalesced': 0, 'split': 0, 'throttle_sec': 0.0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.request_times = deque(maxlen=LATENCY_SAMPLES)
+
+    # ------------------------------------------------------------------
+    # 호출 (아무 스레드)
+    # ------------------------------------------------------------------
+    def submit(self, text, chat_id, parse_mode='HTML'):
+        """메시지를 전송 큐에 넣고 바로 반환
+
+        Returns:
+            Future - 전송 완료 시 True, 실패/버림 시 False
+        """
+        future = Future()
+        item = {'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode, 'queued_at': time.monotonic(), 'future': future}
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._count('dropped')
+            future.set_result(False)
+            return future
+        self._count('queued')
+        return future
+
+    def send(self, text, chat_id, parse_mode='HTML', timeout=None):
+        """전송이 끝날 때까지 기다림 (True/False, timeout초가 지나면 False)"""
+        try:
+            return self.submit(text, chat_id, parse_mode).result(timeout)
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # 전송 (백그라운드 스레드)
+    # ------------------------------------------------------------------
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(*(GROUP_CHAT_RATE if _is_group_chat(chat_id) else CHAT_RATE))
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _wait_for_token(self, chat_id):
+        """전체/채팅 버킷에 토큰이 생길 때까지 대기 후 1개씩 사용"""
+        chat_bucket = self._chat_bucket(chat_id)
+        while True:
+            wait = max(self.global_bucket.wait_time(), chat_bucket.wait_time())
+            if wait <= 0:
+                break
+            self._count('throttle_sec', wait)
+            time.sleep(wait)
+        self.global_bucket.consume()
+        chat_bucket.consume()
+
+    def _post(self, chat_id, text, parse_mode):
+        """sendMessage 1회 (속도 제한 대기, 재시도 포함). 성공하면 True"""
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+            self._wait_for_token(chat_id)
+            started = time.monotonic()
+            wait = self.retry_delay * (2 ** attempt)
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"텔레그램 메시지 전송 실패: {e}")
+            else:
+                with self.stats_lock:
+                    self.stats['requests'] += 1
+                    self.request_times.append(time.monotonic() - started)
+                if response.status_code == 200:
+                    return True
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                    try:
+                        wait = float(response.json().get('parameters', {}).get('retry_after', wait))
+                    except ValueError:
+                        pass
+                    # 다음 시도는 버킷 대기로 retry_after만큼 늦춰짐
+                    self._chat_bucket(chat_id).pause(wait)
+                    continue
+                if response.status_code < 500:
+                    # 잘못된 요청(400 등)은 다시 보내도 같은 결과
+                    print(f"텔레그램 메시지 전송 실패: {response.status_code} {response.text[:200]}")
+                    return False
+            if attempt < self.max_retries:
+                time.sleep(wait)
+        return False
+
+    def _collect(self, first):
+        """첫 메시지 후 coalesce_window초 동안 들어온 메시지를 모음"""
+        items = [first]
+        deadline = time.monotonic() + self.coalesce_window
+        while len(items) < COALESCE_MAX_ITEMS:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _build_messages(self, items):
+        """같은 (채팅, parse_mode) 메시지를 max_length 이내로 합치고, 긴 메시지는 나눔
+
+        Returns:
+            [(chat_id, parse_mode, text, [item, ...]), ...] (채팅별 들어온 순서)
+        """
+        groups = {}
+        for item in items:
+            groups.setdefault((item['chat_id'], item['parse_mode']), []).append(item)
+        messages = []
+        for (chat_id, parse_mode), group in groups.items():
+            text, members = None, []
+            for item in group:
+                if text is not None and len(text) + len(COALESCE_SEPARATOR) + len(item['text']) <= self.max_length:
+                    text += COALESCE_SEPARATOR + item['text']
+                    members.append(item)
+                    self._count('coalesced')
+                    continue
+                if text is not None:
+                    messages.append((chat_id, parse_mode, text, members))
+                text, members = item['text'], [item]
+                if len(text) > self.max_length:
+                    parts = split_message(text, self.max_length, parse_mode)
+                    self._count('split', len(parts) - 1)
+                    messages.extend((chat_id, parse_mode, part, members) for part in parts)
+                    text, members = None, []
+            if text is not None:
+                messages.append((chat_id, parse_mode, text, members))
+        return messages
+
+    def _resolve(self, item, ok):
+        with self.stats_lock:
+            self.stats['sent' if ok else 'failed'] += 1
+            if ok:
+                self.latencies.append(time.monotonic() - item['queued_at'])
+        item['future'].set_result(ok)
+
+    def _deliver(self, items):
+        messages = self._build_messages(items)
+        # 메시지 1건은 자신이 들어간 전송(합친 메시지/나눈 조각)이 모두 성공해야 성공,
+        # 마지막 전송이 끝나는 즉시 Future 완료
+        remaining = {}
+        results = {}
+        for _, _, _, members in messages:
+            for item in members:
+                remaining[id(item)] = remaining.get(id(item), 0) + 1
+                results[id(item)] = True
+        for chat_id, parse_mode, text, members in messages:
+            ok = False
+            try:
+                ok = self._post(chat_id, text, parse_mode)
+            except Exception as e:
+                print(f"텔레그램 메시지 전송 오류: {e}")
+            for item in members:
+                results[id(item)] = results[id(item)] and ok
+                remaining[id(item)] -= 1
+                if remaining[id(item)] == 0:
+                    self._resolve(item, results[id(item)])
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                continue
+            items = self._collect(first)
+            try:
+                self._deliver(items)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def flush(self, timeout=None):
+        """큐가 빌 때까지 대기. 시간 안에 모두 보냈으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=5):
+        """남은 메시지를 timeout초까지 보내고 전송 스레드 종료"""
+        self.flush(timeout)
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # 지표
+    # ------------------------------------------------------------------
+    def metrics(self):
+        """{'queue_depth', 'queued', 'sent', 'failed', 'dropped', 'retries', 'rate_limited', 'requests',
+            'coalesced', 'split', 'throttle_sec', 'latency_avg', 'latency_p95', 'latency_max', 'request_avg'}
+        (sent/failed는 submit한 메시지 기준, requests는 실제 sendMessage 응답 수, 지연은 초, 기록이 없으면 None)"""
+        with self.stats_lock:
+            metrics = dict(self.stats)
+            latencies = sorted(self.latencies)
+            request_times = list(self.request_times)
+        metrics['queue_depth'] = self.queue.qsize()
+        if latencies:
+            metrics['latency_avg'] = sum(latencies) / len(latencies)
+            metrics['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            metrics['latency_max'] = latencies[-1]
+        else:
+            metrics['latency_avg'] = metrics['latency_p95'] = metrics['latency_max'] = None
+        metrics['request_avg'] = sum(request_times) / len(request_times) if request_times else None
+        return metrics
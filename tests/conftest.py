@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# 저장소 루트 모듈(tick_size, order_execution 등)을 import할 수 있도록
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 테스트 중 만들어지는 장부/기록 파일이 저장소 폴더에 쓰이지 않도록
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="upbit-tests-"))
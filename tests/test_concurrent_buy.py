@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("tkinter")
+
+import auto_trading_system_gui as gui
+from paper_trading import PaperUpbit, SyntheticOrderbooks, build_coin_list
+
+MARKETS = ["KRW-AAA", "KRW-BBB", "KRW-CCC"]
+
+
+class _MalformedFillBroker(PaperUpbit):
+    """KRW-BBB 주문 조회 결과의 체결 가격이 숫자가 아닌 모의 브로커 (체결 확인 단계에서 예외 발생)"""
+    def get_order(self, ticker_or_uuid, *args, **kwargs):
+        result = super().get_order(ticker_or_uuid, *args, **kwargs)
+        if isinstance(result, dict) and result.get('market') == "KRW-BBB":
+            result['trades'] = [dict(trade, price='N/A', funds='N/A') for trade in result['trades']]
+        return result
+
+
+def test_one_coin_error_does_not_drop_other_results():
+    orderbooks = SyntheticOrderbooks(prices={market: 1000 for market in MARKETS}, volatility=0.0, seed=1)
+    broker = _MalformedFillBroker(krw=1_000_000, orderbooks=orderbooks, fee_rate=0.0, seed=1)
+    coin_list = build_coin_list(broker, MARKETS)
+    purchased = {}
+
+    results = gui._buy_coins_concurrently(broker, coin_list, 100_000, sell_percentage=3, sell_ratio=0.5, purchased_coins_dict=purchased, snapshot_max_age=60)
+
+    by_coin = {result['coin']: result for result in results}
+    assert set(by_coin) == set(MARKETS)
+    assert by_coin["KRW-BBB"]['status'] == 'partial_fail'
+    assert by_coin["KRW-BBB"]['buy_order']
+    assert by_coin["KRW-AAA"]['status'] == by_coin["KRW-CCC"]['status'] == 'success'
+    assert {"KRW-AAA", "KRW-CCC"} <= set(purchased)
+    assert purchased["KRW-AAA"]['sell_order_uuid']
+
+
+def test_stale_orderbook_snapshots_are_refreshed_before_sizing():
+    orderbooks = SyntheticOrderbooks(prices={market: 1000 for market in MARKETS}, volatility=0.0, seed=1)
+    broker = PaperUpbit(krw=1_000_000, orderbooks=orderbooks, fee_rate=0.0, seed=1)
+    coin_list = build_coin_list(broker, MARKETS)
+    # KRW-AAA: 오래되고 얕은 스냅샷, KRW-BBB: 최근 스냅샷
+    coin_list[0] = dict(coin_list[0], asks=[(1000, 1.0)], snapshot_time=coin_list[0]['snapshot_time'] - 60)
+    logger = _Logger()
+
+    refreshed = gui.refresh_stale_snapshots(coin_list, 3.0, upbit=broker, logger=logger)
+
+    assert refreshed[0]['asks'] == broker.get_orderbook("KRW-AAA")['asks']
+    assert refreshed[0]['snapshot_time'] > coin_list[0]['snapshot_time']
+    assert refreshed[1] is coin_list[1] and refreshed[2] is coin_list[2]
+    assert coin_list[0]['asks'] == [(1000, 1.0)]
+    assert gui.refresh_stale_snapshots(coin_list, None, upbit=broker) is coin_list
+
+    purchased = {}
+    results = gui.buy_coins_from_list(broker, coin_list, sell_percentage=3, sell_ratio=0.5, investment_ratio=30, logger=logger, purchased_coins_dict=purchased, concurrent=True, snapshot_max_age=3.0, max_slippage=0.3, depth_allocation=True)
+    # 오래된 얕은 스냅샷(한도 약 1,000원)으로 배분했다면 KRW-AAA는 제외되었을 것
+    assert {result['coin'] for result in results if result['status'] == 'success'} == set(MARKETS)
+
+
+class _Logger:
+    def log(self, message, level="INFO"):
+        pass
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from depth_allocation import allocate_by_depth, water_fill
+
+DEEP = [(1000, 1000)]
+# 슬리피지 0.3% 한도(1003원) 안에서 약 5,700원만 살 수 있는 얕은 호가
+SHALLOW = [(1000, 5.5), (1100, 100)]
+
+
+def _coins(*ladders):
+    return [{'coin': f"KRW-C{i}", 'asks': ladder} for i, ladder in enumerate(ladders)]
+
+
+def test_water_fill_caps_shallow_coins_and_spreads_the_rest():
+    amounts = water_fill(np.array([1000.0, np.inf, 50_000.0]), 30_000)
+    assert amounts.tolist() == [1000.0, 14_500.0, 14_500.0]
+
+
+def test_coin_under_min_order_is_dropped_and_its_share_reinvested():
+    allocation = allocate_by_depth(_coins(DEEP, DEEP, SHALLOW), 12_000, max_slippage=0.3)
+
+    amounts = [allocation[f"KRW-C{i}"]['amount'] for i in range(3)]
+    assert amounts == [6000.0, 6000.0, 0.0]
+    assert sum(amounts) == 12_000
+
+
+def test_small_budget_keeps_as_many_coins_as_min_order_allows():
+    allocation = allocate_by_depth(_coins(DEEP, DEEP, DEEP), 14_000, max_slippage=0.3)
+    amounts = [allocation[f"KRW-C{i}"]['amount'] for i in range(3)]
+    # 후순위 코인부터 제외
+    assert amounts == [7000.0, 7000.0, 0.0]
+
+
+def test_full_budget_with_shallow_coin_above_min_order():
+    allocation = allocate_by_depth(_coins(DEEP, SHALLOW), 100_000, max_slippage=0.3)
+    shallow = allocation["KRW-C1"]
+    assert shallow['amount'] == pytest.approx(shallow['capacity'])
+    assert allocation["KRW-C0"]['amount'] + shallow['amount'] == pytest.approx(100_000)
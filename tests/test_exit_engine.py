@@ -0,0 +1,59 @@
+from exit_engine import ExitEngine
+
+COIN = "KRW-AAA"
+POSITIONS = {COIN: {'buy_price': 1000.0, 'coin_balance': 10.0}}
+
+
+def _engine(**rules):
+    engine = ExitEngine(**rules)
+    engine.sync(POSITIONS)
+    return engine
+
+
+def test_failed_stop_keeps_state_until_aborted():
+    engine = _engine(stop_loss_pct=5, trailing_stop_pct=2)
+    engine.on_price(COIN, 1100)
+    assert engine.get(COIN)['trail_price'] == 1078
+
+    signals = engine.on_price(COIN, 1070)
+    assert [(s['reason'], s['full'], s['volume']) for s in signals] == [('trailing_stop', True, 10.0)]
+    # 매도 결과를 받기 전에는 신호를 다시 내지 않고, 다음 주기 sync()에서도 새로 등록하지 않음
+    assert engine.on_price(COIN, 1060) == []
+    engine.sync(POSITIONS)
+    assert engine.get(COIN)['high'] == 1100
+
+    # 매도 실패: 최고가/트레일링 스탑 가격을 그대로 두고 다시 신호
+    engine.abort_exit(COIN, signals)
+    state = engine.get(COIN)
+    assert (state['high'], state['trail_price'], state['exiting']) == (1100, 1078, False)
+    assert engine.on_price(COIN, 1070)[0]['reason'] == 'trailing_stop'
+
+    engine.confirm_exit(COIN)
+    assert engine.get(COIN) is None
+
+
+def test_failed_take_profit_restores_levels():
+    engine = _engine(take_profit_levels=[[2, 0.5], [4, 0.5]])
+
+    signals = engine.on_price(COIN, 1050)
+    assert [(s['level'], s['volume'], s['full']) for s in signals] == [(1, 5.0, False), (2, 5.0, True)]
+    assert engine.get(COIN)['remaining'] == 0
+
+    # 첫 단계 매도가 실패하면 두 신호 모두 되돌림
+    engine.abort_exit(COIN, signals)
+    state = engine.get(COIN)
+    assert (state['remaining'], state['next_level'], state['exiting']) == (10.0, 0, False)
+
+    # 첫 단계만 체결되고 둘째 단계가 실패한 경우
+    signals = engine.on_price(COIN, 1050)
+    engine.abort_exit(COIN, signals[1:])
+    state = engine.get(COIN)
+    assert (state['remaining'], state['next_level']) == (5.0, 1)
+    assert [(s['level'], s['volume']) for s in engine.on_price(COIN, 1045)] == [(2, 5.0)]
+
+
+def test_sync_drops_sold_coin():
+    engine = _engine(stop_loss_pct=5)
+    assert engine.on_price(COIN, 940)[0]['reason'] == 'stop_loss'
+    engine.sync({})
+    assert engine.get(COIN) is None
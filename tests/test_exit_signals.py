@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+import auto_trading_system_gui as gui
+from exit_engine import ExitEngine
+from order_manager import OrderManager
+from paper_trading import PaperUpbit, SyntheticOrderbooks
+from position_ledger import PositionLedger
+
+COIN = "KRW-AAA"
+
+
+class _Logger:
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message, level="INFO"):
+        self.messages.append((level, message))
+
+
+class _RejectingSellBroker(PaperUpbit):
+    """매도 주문을 거절하는 모의 브로커"""
+    def sell_market_order(self, ticker, volume, *args, **kwargs):
+        return {'error': {'name': 'under_min_total_market_ask', 'message': '매도 거절'}}
+
+
+def _app(monkeypatch, broker_class):
+    orderbooks = SyntheticOrderbooks(prices={COIN: 1000}, volatility=0.0, seed=1)
+    broker = broker_class(krw=1_000_000, orderbooks=orderbooks, fee_rate=0.0, seed=1)
+    broker.buy_market_order(COIN, 100_000)
+    balance = float(broker.get_balance(COIN))
+    monkeypatch.setattr(gui, "get_upbit_client", lambda: broker)
+
+    app = gui.TradingGUI.__new__(gui.TradingGUI)
+    app.logger = _Logger()
+    app.order_manager = OrderManager()
+    app.stop_loss_lock = threading.Lock()
+    app.stop_loss_in_progress = set()
+    app.purchased_coins = PositionLedger({COIN: {'buy_price': 1000.0, 'coin_balance': balance, 'buy_quantity': balance}}, name="purchased_coins")
+    app.sold_coins = PositionLedger(name="sold_coins")
+    app.record_profit_fill = lambda *args, **kwargs: None
+    app.exit_engine = ExitEngine(stop_loss_pct=5, trailing_stop_pct=2)
+    app.exit_engine.sync(app.purchased_coins.snapshot())
+    return app, broker
+
+
+def _trailing_stop(app):
+    app.exit_engine.on_price(COIN, 1100)
+    signals = app.exit_engine.on_price(COIN, 1070)
+    assert [signal['reason'] for signal in signals] == ['trailing_stop']
+    return signals
+
+
+def test_failed_full_exit_keeps_position_and_exit_state(monkeypatch):
+    app, broker = _app(monkeypatch, _RejectingSellBroker)
+    signals = _trailing_stop(app)
+    aborted = []
+    original_abort = app.exit_engine.abort_exit
+    monkeypatch.setattr(app.exit_engine, "abort_exit", lambda coin, signals=(): aborted.append(coin) or original_abort(coin, signals))
+
+    assert app.execute_exit_signals(COIN, app.purchased_coins[COIN], signals) is False
+
+    assert aborted == [COIN]
+    assert COIN in app.purchased_coins and COIN not in app.sold_coins
+    assert float(broker.get_balance(COIN)) > 0
+    state = app.exit_engine.get(COIN)
+    assert (state['exiting'], state['high'], state['trail_price']) == (False, 1100, 1078)
+    assert not app.stop_loss_in_progress
+
+
+def test_successful_full_exit_removes_position(monkeypatch):
+    app, broker = _app(monkeypatch, PaperUpbit)
+    signals = _trailing_stop(app)
+
+    assert app.execute_exit_signals(COIN, app.purchased_coins[COIN], signals) is True
+
+    assert COIN not in app.purchased_coins
+    assert app.sold_coins[COIN]['sell_reason'] == '트레일링 스탑'
+    assert app.exit_engine.get(COIN) is None
+    assert float(broker.get_balance(COIN) or 0) == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from fill_tracker import LocalOrderSource, PollingFillTracker, compute_vwap
+
+
+def test_compute_vwap_uses_trades_then_executed_fields():
+    order = {'trades': [{'price': '700', 'volume': '10', 'funds': '7000'}, {'price': '701', 'volume': '5'}]}
+    assert compute_vwap(order) == {'avg_price': pytest.approx(10505 / 15), 'volume': 15.0, 'funds': 10505.0}
+    assert compute_vwap({'executed_volume': '2', 'executed_funds': '3000'})['avg_price'] == 1500
+    assert compute_vwap(None) == {'avg_price': None, 'volume': 0.0, 'funds': 0.0}
+
+
+def test_wait_returns_as_soon_as_the_order_is_filled():
+    source = LocalOrderSource()
+    uuid = source.add_order("KRW-XRP", "bid", trades=[(700, 10), (701, 5)], fill_delay=0.3)
+    fill = PollingFillTracker(source).wait(uuid, timeout=5)
+
+    assert (fill['state'], fill['done'], fill['executed_volume']) == ('done', True, 15.0)
+    assert fill['avg_price'] == pytest.approx(10505 / 15)
+    # 고정 sleep이 아니라 체결 직후 (백오프 간격 이내) 반환
+    assert 300 <= fill['elapsed_ms'] < 300 + 500
+
+
+def test_wait_times_out_with_last_state():
+    source = LocalOrderSource()
+    uuid = source.add_order("KRW-XRP", "ask", trades=[(700, 1)], fill_delay=5)
+    fill = PollingFillTracker(source).wait(uuid, timeout=0.2)
+    assert (fill['state'], fill['done'], fill['executed_volume']) == ('wait', False, 0.0)
+
+
+def test_wait_many_checks_pending_orders_in_one_query():
+    source = LocalOrderSource()
+    done = source.add_order("KRW-AAA", "bid", trades=[(100, 1)])
+    late = source.add_order("KRW-BBB", "bid", trades=[(200, 2)], fill_delay=0.2)
+    cancelled = source.add_order("KRW-CCC", "bid", trades=[(300, 3)], fill_delay=5)
+    source.cancel_orders_by_uuids([cancelled])
+    queries = source.query_count
+
+    fills = PollingFillTracker(source).wait_many([done, late, cancelled, done], timeout=5)
+
+    assert list(fills) == [done, late, cancelled]
+    assert [fills[u]['state'] for u in (done, late, cancelled)] == ['done', 'done', 'cancel']
+    assert fills[cancelled]['executed_volume'] == 0
+    # 주문 수만큼이 아니라 조회 주기마다 1회
+    assert source.query_count - queries < 10
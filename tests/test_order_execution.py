@@ -0,0 +1,89 @@
+import pytest
+
+from order_execution import LocalExchange, flatten, slippage_limit_price, sliced_buy
+from order_manager import OrderManager
+from paper_trading import PaperUpbit, SyntheticOrderbooks
+from tick_size import quantize
+
+
+@pytest.mark.parametrize("best_ask, max_slippage, expected", [
+    (60_000, 0.3, 60_180),
+    (60_010, 0.05, 60_040),
+    (500, 1.37, 506.8),
+    (1_234_500, 0.01, 1_234_500),
+])
+def test_slippage_limit_price(best_ask, max_slippage, expected):
+    assert slippage_limit_price(best_ask, max_slippage) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("best_ask", [100_020, 1_000_010.0, 2_000_001, 99.99, 12_345.6])
+def test_slippage_limit_price_never_below_best_ask(best_ask):
+    # 호가 단위 사이의 기준가 + 작은 슬리피지는 내림하면 기준가 아래로 내려갈 수 있음
+    limit = slippage_limit_price(best_ask, 0.001)
+    assert limit >= best_ask
+    assert limit == quantize(limit)
+
+
+def test_sliced_buy_fills_when_limit_rounds_below_best_ask():
+    exchange = LocalExchange(krw=1_000_000)
+    exchange.set_orderbook("KRW-AAA", asks=[(100_050, 1.0)], bids=[(100_000, 1.0)])
+    # 100,020 × 1.0001 = 100,030 → 내림하면 100,000 (최우선 매도호가 100,050 아래)
+    result = sliced_buy(exchange, "KRW-AAA", 100_000, 100_020, max_slippage=0.01, slices=2, timeout=1)
+    assert result['limit_price'] == 100_050
+    assert result['executed_volume'] > 0
+
+
+def _paper_broker(price=1000, krw=1_000_000):
+    orderbooks = SyntheticOrderbooks(prices={"KRW-AAA": price}, volatility=0.0, seed=1)
+    return PaperUpbit(krw=krw, orderbooks=orderbooks, fee_rate=0.0, seed=1)
+
+
+def test_flatten_cancels_exchange_orders_missing_from_local_table():
+    broker = _paper_broker()
+    broker.buy_market_order("KRW-AAA", 100_000)
+    held = broker.get_balance("KRW-AAA")
+    # 이 프로세스의 OrderManager가 모르는 지정가 익절 주문 (재시작 전 또는 다른 곳에서 낸 주문)
+    resting = broker.sell_limit_order("KRW-AAA", 1_200, held)
+    order_manager = OrderManager()
+
+    report = flatten(broker, "KRW-AAA", order_manager=order_manager, cancel_timeout=1, fill_timeout=2)
+
+    assert report['cancelled'] == [resting['uuid']]
+    assert report['success']
+    assert report['volume'] == pytest.approx(held)
+    assert broker.get_balance("KRW-AAA") == pytest.approx(0)
+    assert order_manager.get(resting['uuid'])['tag'] == 'external'
+
+
+class _FixedFillTracker:
+    """매도 주문 체결 확인 결과를 정해진 값으로 돌려주는 체결 확인기"""
+    def __init__(self, state, executed_volume, order_known=True):
+        self.state = state
+        self.executed_volume = executed_volume
+        self.order_known = order_known
+
+    def wait_many(self, uuids, timeout=10):
+        return {uuid: {
+            'uuid': uuid, 'state': self.state if self.order_known else '', 'done': self.state == 'done',
+            'avg_price': 999.0 if self.executed_volume else None, 'executed_volume': self.executed_volume,
+            'funds': 999.0 * self.executed_volume, 'order': {'uuid': uuid, 'state': self.state} if self.order_known else None,
+            'elapsed_ms': 1.0,
+        } for uuid in uuids}
+
+
+@pytest.mark.parametrize("state, executed_volume, order_known, success", [
+    ('done', 100.0, True, True),
+    ('cancel', 40.0, True, True),
+    ('wait', 0.0, True, False),
+    ('cancel', 0.0, True, False),
+    ('', 0.0, False, False),
+])
+def test_flatten_reports_success_only_for_known_fills(state, executed_volume, order_known, success):
+    broker = _paper_broker()
+    broker.buy_market_order("KRW-AAA", 100_000)
+
+    report = flatten(broker, "KRW-AAA", fill_tracker=_FixedFillTracker(state, executed_volume, order_known))
+
+    assert report['sell_uuid']
+    assert report['success'] is success
+    assert (report['reason'] is None) is success
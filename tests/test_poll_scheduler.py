@@ -0,0 +1,36 @@
+import pytest
+
+from exit_engine import ExitEngine
+from poll_scheduler import PollScheduler
+
+
+def _scheduler():
+    return PollScheduler(min_interval=1.0, max_interval=30.0, default_volatility_pct=0.1)
+
+
+@pytest.mark.parametrize("price, stop_prices, take_profit_prices", [
+    (940, [950], []),        # 손절가 아래로 내려감
+    (950, [950], []),        # 손절가에 닿음
+    (1060, [950], [1050]),   # 지정가 매도가 위로 올라감
+])
+def test_crossed_trigger_polls_at_min_interval(price, stop_prices, take_profit_prices):
+    scheduler = _scheduler()
+    interval = scheduler.update("KRW-AAA", price, stop_prices, take_profit_prices, now=0)
+    assert interval == 1.0
+    assert scheduler.stats(now=0)['coins']["KRW-AAA"]['distance_pct'] == 0
+
+
+def test_distance_is_measured_towards_trigger():
+    scheduler = _scheduler()
+    scheduler.update("KRW-AAA", 1000, stop_prices=[950], take_profit_prices=[1020], now=0)
+    assert scheduler.stats(now=0)['coins']["KRW-AAA"]['distance_pct'] == pytest.approx(2.0)
+    # 멀리 있는 트리거만 있으면 최대 간격
+    assert scheduler.update("KRW-BBB", 1000, stop_prices=[500], now=0) == 30.0
+
+
+def test_exit_engine_trigger_levels_split_by_direction():
+    engine = ExitEngine(stop_loss_pct=5, trailing_stop_pct=2, take_profit_levels=[[3, 0.5]])
+    engine.open("KRW-AAA", 1000.0, 10.0, opened_at=0)
+    engine.on_price("KRW-AAA", 1020)
+    assert engine.trigger_levels("KRW-AAA") == ([950, 999.6], [1030], None)
+    assert engine.trigger_levels("KRW-ZZZ") == ([], [], None)
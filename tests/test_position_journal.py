@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from order_execution import flatten_many
+from order_manager import OrderManager
+from paper_trading import PaperUpbit, SyntheticOrderbooks
+from position_journal import PositionJournal, reconcile_positions
+from position_ledger import PositionLedger
+
+KST = pytz.timezone('Asia/Seoul')
+MARKETS = ["KRW-AAA", "KRW-BBB", "KRW-CCC", "KRW-DDD"]
+
+
+def _open_journal(path):
+    journal = PositionJournal(path=str(path))
+    state = journal.replay()
+    purchased = PositionLedger(state.get('purchased_coins'), name='purchased_coins', journal=journal)
+    sold = PositionLedger(state.get('sold_coins'), name='sold_coins', journal=journal)
+    return journal, purchased, sold
+
+
+def test_replay_restores_ledgers_after_crash(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal, purchased, sold = _open_journal(path)
+    buy_time = datetime(2026, 1, 2, 9, 0, 5, tzinfo=pytz.utc).astimezone(KST)
+    purchased["KRW-AAA"] = {'buy_price': 1000.0, 'coin_balance': 10.0, 'buy_time': buy_time}
+    purchased["KRW-BBB"] = {'buy_price': 2000.0, 'coin_balance': 5.0}
+    purchased.update_fields("KRW-AAA", coin_balance=7.5)
+    purchased.pop("KRW-BBB")
+    sold["KRW-BBB"] = {'sell_reason': '손절'}
+    journal.flush()
+    # 비정상 종료: close() 없이 마지막 줄이 잘린 채로 남음
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "set", "ledger": "purchased_coins", "key": "KRW-ZZZ", "val')
+
+    restored, purchased2, sold2 = _open_journal(path)
+
+    assert dict(purchased2["KRW-AAA"]) == {'buy_price': 1000.0, 'coin_balance': 7.5, 'buy_time': buy_time}
+    assert "KRW-BBB" not in purchased2 and "KRW-ZZZ" not in purchased2
+    assert dict(sold2["KRW-BBB"]) == {'sell_reason': '손절'}
+    assert restored.stats['replayed_events'] == 5
+    journal.close()
+    restored.close()
+
+
+def test_compact_keeps_state_in_one_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal, purchased, _ = _open_journal(path)
+    for step in range(50):
+        purchased["KRW-AAA"] = {'coin_balance': float(step)}
+    journal.compact()
+    journal.close()
+
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    restored, purchased2, _ = _open_journal(path)
+    assert purchased2["KRW-AAA"]['coin_balance'] == 49.0
+    restored.close()
+
+
+@pytest.fixture
+def restarted(tmp_path):
+    """매수 + 지정가 익절 주문 후 재시작한 상태 (브로커, 복원된 장부, 저널)"""
+    orderbooks = SyntheticOrderbooks(prices={market: 1000 for market in MARKETS}, volatility=0.0, seed=1)
+    broker = PaperUpbit(krw=1_000_000, orderbooks=orderbooks, fee_rate=0.0, seed=1)
+    journal, purchased, _ = _open_journal(tmp_path / "journal.jsonl")
+    for market in MARKETS:
+        broker.buy_market_order(market, 100_000)
+        volume = broker.get_balance(market)
+        order = broker.sell_limit_order(market, 1_200, volume / 2)
+        purchased[market] = {'buy_price': broker.get_avg_buy_price(market), 'coin_balance': volume,
+                             'sell_order_uuid': order['uuid'], 'sell_price_limit': 1_200, 'sell_volume': volume / 2}
+    # 재시작 사이: BBB는 밖에서 전량 매도, CCC는 익절 주문 취소, DDD는 일부 매도
+    broker.cancel_order(purchased["KRW-BBB"]['sell_order_uuid'])
+    broker.sell_market_order("KRW-BBB", broker.get_balance("KRW-BBB"))
+    broker.cancel_order(purchased["KRW-CCC"]['sell_order_uuid'])
+    broker.sell_market_order("KRW-DDD", broker.get_balance("KRW-DDD") / 2)
+    journal.flush()
+
+    restored, purchased2, _ = _open_journal(tmp_path / "journal.jsonl")
+    yield broker, purchased, purchased2
+    journal.close()
+    restored.close()
+
+
+def test_reconcile_matches_exchange_state(restarted):
+    broker, before, purchased = restarted
+    order_manager = OrderManager()
+
+    summary = reconcile_positions(broker, purchased, order_manager=order_manager)
+
+    assert summary['removed'] == ["KRW-BBB"]
+    assert summary['adjusted'] == ["KRW-DDD"]
+    assert summary['orders_cleared'] == ["KRW-CCC"]
+    assert sorted(summary['orders_registered']) == ["KRW-AAA", "KRW-DDD"]
+    assert purchased["KRW-CCC"]['sell_order_uuid'] is None
+    assert purchased["KRW-DDD"]['coin_balance'] == pytest.approx(before["KRW-DDD"]['coin_balance'] * 0.75)
+    registered = order_manager.open_orders(market="KRW-AAA")
+    assert [order['uuid'] for order in registered] == [before["KRW-AAA"]['sell_order_uuid']]
+    assert registered[0]['tag'] == 'take_profit'
+
+
+def test_flatten_after_restart_cancels_take_profit_and_sells_all(restarted):
+    broker, before, purchased = restarted
+    order_manager = OrderManager()
+    reconcile_positions(broker, purchased, order_manager=order_manager)
+
+    reports = flatten_many(broker, list(purchased), order_manager=order_manager, cancel_timeout=1, fill_timeout=2)
+
+    for coin in ("KRW-AAA", "KRW-DDD"):
+        assert reports[coin]['cancelled'] == [before[coin]['sell_order_uuid']]
+        assert order_manager.get(before[coin]['sell_order_uuid'])['tag'] == 'take_profit'
+    for coin in purchased:
+        assert reports[coin]['success']
+        assert broker.get_balance(coin) == pytest.approx(0)
+    assert order_manager.open_orders() == []
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+websockets = pytest.importorskip("websockets")
+
+from risk_engine import RiskEngine
+
+COIN = "KRW-AAA"
+POSITIONS = {COIN: {'buy_price': 1000.0}}
+
+
+class _Logger:
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message, level="INFO"):
+        self.messages.append((level, message))
+
+
+class _FrameServer:
+    """구독 메시지를 받으면 frames를 순서대로 보내는 로컬 WebSocket 서버"""
+    def __init__(self, frames):
+        self.frames = frames
+        self.uri = None
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _handler(self, websocket):
+        await websocket.recv()
+        for frame in self.frames:
+            await websocket.send(frame)
+        await websocket.wait_closed()
+
+    async def _serve(self):
+        async with websockets.serve(self._handler, '127.0.0.1', 0) as server:
+            self.uri = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            self.ready.set()
+            while not self.stop_event.is_set():
+                await asyncio.sleep(0.05)
+
+    def __enter__(self):
+        self.thread.start()
+        self.ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join(2)
+
+
+def test_malformed_frame_does_not_stop_receiving():
+    triggered = threading.Event()
+    frames = [b'{"code": "KRW-AAA", "trade_p', b'[]', json.dumps({'code': COIN, 'trade_price': 900}).encode()]
+    logger = _Logger()
+    with _FrameServer(frames) as server:
+        engine = RiskEngine(lambda coin, event: triggered.set(), stop_loss_pct=5, uri=server.uri, logger=logger)
+        engine.set_positions(POSITIONS)
+        engine.start()
+        try:
+            assert triggered.wait(5)
+            assert engine.thread.is_alive()
+        finally:
+            engine.stop()
+    assert sum('메시지 처리 오류' in message for _, message in logger.messages) == 2
+
+
+def _wait_for_events(engine, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(engine.events) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(engine.events) == count
+
+
+def test_failed_trigger_is_watched_again():
+    results = [False, True]
+    calls = []
+
+    def on_trigger(coin, event):
+        calls.append(event['price'])
+        return results[len(calls) - 1]
+
+    engine = RiskEngine(on_trigger, stop_loss_pct=5, logger=_Logger())
+    try:
+        engine.set_positions(POSITIONS)
+        assert engine.on_tick(COIN, 940)['reason'] == 'stop_loss'
+        _wait_for_events(engine, 1)
+        # 매도 실패 → 다음 set_positions()에서 다시 감시
+        assert engine.on_tick(COIN, 930) is None
+        engine.set_positions(POSITIONS)
+        assert engine.on_tick(COIN, 930)['reason'] == 'stop_loss'
+        _wait_for_events(engine, 2)
+        # 매도 성공 → 보유 목록에 남아 있어도 다시 감시하지 않음
+        engine.set_positions(POSITIONS)
+        assert engine.watched_coins() == []
+        assert calls == [940, 930]
+    finally:
+        engine.stop()
@@ -0,0 +1,90 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from run_journal import ORDER_ENDPOINT, RunJournal, carry_journal, query_runs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # 본문의 "fail"이 남은 횟수만큼 500 응답
+    failures = {}
+
+    def do_GET(self):
+        self._reply(200, b'[]')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        market = json.loads(body)['market']
+        if self.failures.get(market, 0) > 0:
+            self.failures[market] -= 1
+            self._reply(500, b'{"error": "busy"}')
+        else:
+            self._reply(201, b'{"uuid": "x"}')
+
+    def _reply(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _order(base, market):
+    return requests.post(f"{base}/v1/orders", json={'market': market, 'side': 'bid'}, timeout=5)
+
+
+def test_retries_counted_only_for_repeated_requests(server, tmp_path):
+    _Handler.failures = {'KRW-AAA': 1}
+    journal = RunJournal(path=str(tmp_path / "runs.jsonl"))
+    journal.start()
+    assert _order(server, 'KRW-AAA').status_code == 500
+    # 실패 뒤에 나간 다른 코인 주문은 재시도가 아님
+    _order(server, 'KRW-BBB')
+    _order(server, 'KRW-CCC')
+    assert _order(server, 'KRW-AAA').status_code == 201
+    record = journal.finish()
+
+    orders = record['api'][ORDER_ENDPOINT]
+    assert (orders['requests'], orders['errors'], orders['retries']) == (4, 1, 1)
+    assert query_runs(path=journal.path)[0]['run_id'] == record['run_id']
+
+
+def test_records_only_scan_thread_and_carried_workers(server, tmp_path):
+    _Handler.failures = {}
+    journal = RunJournal(path=str(tmp_path / "runs.jsonl"))
+    journal.start()
+    requests.get(f"{server}/v1/market/all", timeout=5)
+
+    # 다른 스레드(가격 모니터링 등)의 요청은 제외
+    monitor = threading.Thread(target=lambda: [requests.get(f"{server}/v1/ticker", timeout=5) for _ in range(3)])
+    monitor.start()
+    monitor.join()
+
+    # 스캔 스레드에서 넘긴 병렬 주문은 포함
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(carry_journal(lambda market: _order(server, market)), ['KRW-AAA', 'KRW-BBB', 'KRW-CCC']))
+    record = journal.finish()
+
+    assert set(record['api']) == {'GET /v1/market/all', ORDER_ENDPOINT}
+    assert record['api'][ORDER_ENDPOINT]['requests'] == 3
+    assert record['api_totals']['requests'] == 4
+
+    # 기록이 끝난 뒤의 요청은 남지 않음
+    requests.get(f"{server}/v1/market/all", timeout=5)
+    assert journal.endpoints['GET /v1/market/all']['requests'] == 1
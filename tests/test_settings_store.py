@@ -0,0 +1,105 @@
+import json
+import os
+import time
+
+import pytest
+
+from settings_store import SettingsStore
+
+
+def _write_config(path, values):
+    path.write_text(json.dumps(values, ensure_ascii=False), encoding="utf-8")
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_load_converts_types_and_keeps_unknown_keys(tmp_path):
+    path = tmp_path / "trading_config.json"
+    _write_config(path, {"stop_loss": "4.5", "hour": "8", "auto_trade": "true", "max_coins": "3.5", "legacy_key": [1, 2]})
+    store = SettingsStore(str(path))
+    try:
+        assert store["stop_loss"] == 4.5
+        assert store["hour"] == 8 and store.display("hour") == "08"
+        assert store["auto_trade"] is True
+        # 정수가 아닌 값은 기본값 사용 + 오류 기록
+        assert store["max_coins"] == 10
+        assert len(store.errors) == 1 and store.errors[0].startswith("max_coins")
+        assert store.get("legacy_key") == [1, 2]
+    finally:
+        store.close()
+
+
+def test_load_broken_file_uses_defaults(tmp_path):
+    path = tmp_path / "trading_config.json"
+    path.write_text('{"stop_loss": 4', encoding="utf-8")
+    store = SettingsStore(str(path))
+    try:
+        assert store["stop_loss"] == 5.0
+        assert store.errors and "로드 오류" in store.errors[0]
+    finally:
+        store.close()
+
+
+def test_rapid_changes_are_saved_once(tmp_path):
+    path = tmp_path / "trading_config.json"
+    store = SettingsStore(str(path), save_delay=0.2)
+    try:
+        # 입력 중인 값("", "-")은 무시하고 마지막 정상 값 유지
+        for text in ["0", "0.", "0.5", "", "-", "0.7"]:
+            store.set_from_input("slippage", text)
+        store.set_from_input("stop_loss", "3")
+        assert store["slippage"] == 0.7
+        assert not path.exists()
+
+        assert _wait_for(lambda: store.stats['saves'] == 1)
+        time.sleep(0.3)
+        assert store.stats == {'changes': 4, 'saves': 1}
+        saved = json.loads(path.read_text(encoding="utf-8"))
+        assert (saved["slippage"], saved["stop_loss"]) == (0.7, 3.0)
+        # 임시 파일이 남지 않음
+        assert os.listdir(tmp_path) == ["trading_config.json"]
+    finally:
+        store.close()
+
+
+def test_write_failure_keeps_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "trading_config.json"
+    _write_config(path, {"stop_loss": 4.0})
+    store = SettingsStore(str(path), save_delay=60)
+    try:
+        store.set("stop_loss", 2.0)
+
+        def fail_fsync(fd):
+            raise OSError("disk full")
+        monkeypatch.setattr(os, "fsync", fail_fsync)
+        store.flush()
+        assert json.loads(path.read_text(encoding="utf-8")) == {"stop_loss": 4.0}
+        assert os.listdir(tmp_path) == ["trading_config.json"]
+
+        monkeypatch.undo()
+        store.flush()
+        assert json.loads(path.read_text(encoding="utf-8"))["stop_loss"] == 2.0
+    finally:
+        store.close()
+
+
+def test_close_saves_pending_changes(tmp_path):
+    path = tmp_path / "trading_config.json"
+    store = SettingsStore(str(path), save_delay=60)
+    assert store.set("max_coins", 4)
+    assert store.set("max_coins", 4) is False
+    with pytest.raises(ValueError):
+        store.set("max_coins", "many")
+    store.close()
+    store.writer.join(timeout=1)
+    assert not store.writer.is_alive()
+    reloaded = SettingsStore(str(path))
+    assert reloaded["max_coins"] == 4
+    reloaded.close()
@@ -0,0 +1,142 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from telegram_notifier import TelegramNotifier, split_message
+
+TOKEN = "123:test"
+
+
+class _TelegramServer(ThreadingHTTPServer):
+    """sendMessage 요청을 기록하고, responses에 넣은 (상태 코드, 본문)을 순서대로 응답 (없으면 200)"""
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.received = []
+        self.responses = []
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        server = self.server
+        time.sleep(server.delay)
+        with server.lock:
+            server.received.append((self.path, body))
+            status, payload = server.responses.pop(0) if server.responses else (200, {'ok': True})
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = _TelegramServer()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _notifier(server, **kwargs):
+    kwargs.setdefault('coalesce_window', 0)
+    notifier = TelegramNotifier(TOKEN, api_base=server.base, timeout=5, retry_delay=0.05, **kwargs)
+    notifier.start()
+    return notifier
+
+
+def test_submit_returns_without_waiting_for_telegram(server):
+    server.delay = 0.5
+    notifier = _notifier(server)
+    try:
+        started = time.monotonic()
+        future = notifier.submit("매수 완료", 1)
+        assert time.monotonic() - started < 0.1
+        assert future.result(timeout=5) is True
+        assert server.received == [(f"/bot{TOKEN}/sendMessage", {'chat_id': 1, 'text': "매수 완료", 'parse_mode': 'HTML'})]
+    finally:
+        notifier.close()
+
+
+def test_rate_limited_message_is_retried_after_retry_after(server):
+    server.responses = [(429, {'ok': False, 'parameters': {'retry_after': 0.2}})]
+    notifier = _notifier(server)
+    try:
+        started = time.monotonic()
+        assert notifier.send("손절", 1, timeout=5) is True
+        assert time.monotonic() - started >= 0.2
+        assert len(server.received) == 2
+        metrics = notifier.metrics()
+        assert (metrics['rate_limited'], metrics['retries'], metrics['sent']) == (1, 1, 1)
+    finally:
+        notifier.close()
+
+
+def test_bad_request_is_not_retried(server):
+    server.responses = [(400, {'ok': False, 'description': "can't parse entities"})]
+    notifier = _notifier(server)
+    try:
+        assert notifier.send("<b>깨진 태그", 1, timeout=5) is False
+        assert len(server.received) == 1
+        assert notifier.metrics()['failed'] == 1
+    finally:
+        notifier.close()
+
+
+def test_messages_within_window_are_coalesced(server):
+    notifier = _notifier(server, coalesce_window=0.3)
+    try:
+        futures = [notifier.submit(f"코인 {i}", 1) for i in range(5)]
+        futures.append(notifier.submit("다른 채팅", 2))
+        assert all(future.result(timeout=5) for future in futures)
+        texts = {body['chat_id']: body['text'] for _, body in server.received}
+        assert len(server.received) == 2
+        assert texts[1] == "\n\n".join(f"코인 {i}" for i in range(5))
+        assert texts[2] == "다른 채팅"
+        assert notifier.metrics()['coalesced'] == 4
+    finally:
+        notifier.close()
+
+
+def test_long_message_is_split_with_balanced_tags(server):
+    lines = [f"<b>{i:02d}</b> <a href=\"https://upbit.com/{i}\">KRW-{i:02d}</a> &amp; 상승" for i in range(6)]
+    text = "<pre>" + "\n".join(lines) + "</pre>"
+    notifier = _notifier(server, max_length=200)
+    try:
+        assert notifier.send(text, 1, timeout=5) is True
+        parts = [body['text'] for _, body in server.received]
+        assert len(parts) > 1
+        assert notifier.metrics()['split'] == len(parts) - 1
+        for part in parts:
+            assert len(part) <= 200
+            assert part.startswith("<pre>") and part.endswith("</pre>")
+            for tag in ("pre", "b", "a"):
+                assert len(re.findall(rf"<{tag}[ >]", part)) == part.count(f"</{tag}>")
+        # 다시 연 태그를 빼면 원래 내용과 같음
+        joined = "\n".join(part[len("<pre>"):-len("</pre>")].strip("\n") for part in parts)
+        assert joined == "\n".join(lines)
+    finally:
+        notifier.close()
+
+
+def test_split_message_keeps_short_text_and_entities():
+    assert split_message("짧은 메시지", limit=100) == ["짧은 메시지"]
+    parts = split_message("&amp;" * 40, limit=50)
+    assert all(len(part) <= 50 and not re.search(r"&[a-z]*$", part) for part in parts)
+    assert "".join(parts) == "&amp;" * 40
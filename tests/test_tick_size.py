@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from tick_size import KRW_TICK_BANDS, quantize, tick_size
+
+pyupbit = pytest.importorskip("pyupbit")
+
+
+def _off_grid(price):
+    # 호가 단위 위의 가격은 pyupbit 쪽 부동소수점 나눗셈 오차로 내림/올림이 흔들리므로 단위 사이 가격으로 비교
+    return float(quantize(price)) + tick_size(price) * 0.37
+
+
+# 구간 경계 바로 아래/위와 구간 중간 가격
+EDGE_PRICES = sorted({
+    _off_grid(price)
+    for lower, _ in KRW_TICK_BANDS[1:]
+    for price in (lower * 0.999, lower, lower * 1.37)
+})
+
+
+@pytest.mark.parametrize("price", EDGE_PRICES)
+def test_tick_size_matches_pyupbit(price):
+    # pyupbit.get_tick_size는 조정된 가격을 반환하므로 올림과 내림의 차이가 호가 단위
+    expected = pyupbit.get_tick_size(price, "ceil") - pyupbit.get_tick_size(price, "floor")
+    assert tick_size(price) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("price", EDGE_PRICES)
+@pytest.mark.parametrize("method", ["floor", "ceil"])
+def test_quantize_matches_pyupbit(price, method):
+    assert quantize(price, method) == pytest.approx(pyupbit.get_tick_size(price, method))
+
+
+@pytest.mark.parametrize("lower, tick", KRW_TICK_BANDS)
+def test_band_lower_bound_uses_band_tick(lower, tick):
+    assert tick_size(lower) == tick
+
+
+def test_quantize_examples():
+    assert quantize(60000 * 1.0137) == 60820
+    assert quantize(500 * 1.0137) == pytest.approx(506.8)
+    assert quantize(2_345_678) == 2_345_000
+    assert quantize(1_234_567) == 1_234_500
+    assert quantize(1_234_567, 'ceil') == 1_235_000
+    assert isinstance(quantize(12_345.6), int)
+
+
+def test_quantize_array_matches_scalar():
+    prices = np.array(EDGE_PRICES)
+    np.testing.assert_allclose(quantize(prices, 'ceil'), [quantize(p, 'ceil') for p in EDGE_PRICES])
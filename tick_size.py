@@ -0,0 +1,69 @@
+"""
+업비트 원화 마켓 호가 단위 (주문 가격 단위)
+
+KRW_TICK_BANDS: (가격 하한, 호가 단위) - 가격 하한 오름차순 (업비트 원화 마켓 기준, pyupbit.get_tick_size와 같은 구간)
+quantize(): 가격(스칼라 또는 배열)을 호가 단위로 내림/올림/반올림합니다.
+
+지정가 주문 가격, 분할 매수 한도 가격, 손절 가격 계산에 공통으로 사용합니다.
+"""
+import numpy as np
+
+KRW_TICK_BANDS = (
+    (0, 0.00000001),
+    (0.0001, 0.0000001),
+    (0.001, 0.000001),
+    (0.01, 0.00001),
+    (0.1, 0.0001),
+    (1, 0.001),
+    (10, 0.01),
+    (100, 0.1),
+    (1000, 1),
+    (10000, 10),
+    (100000, 50),
+    (500000, 100),
+    (1000000, 500),
+    (2000000, 1000),
+)
+
+_LOWER_BOUNDS = np.array([band[0] for band in KRW_TICK_BANDS], dtype=float)
+_TICKS = np.array([band[1] for band in KRW_TICK_BANDS], dtype=float)
+# 부동소수점 오차 제거용 소수 자릿수 (호가 단위 0.01 → 2자리)
+_DECIMALS = np.maximum(0, -np.floor(np.log10(_TICKS))).astype(int)
+_EPS = 1e-9
+
+_ROUNDERS = {
+    'floor': lambda steps: np.floor(steps + _EPS),
+    'ceil': lambda steps: np.ceil(steps - _EPS),
+    'round': lambda steps: np.floor(steps + 0.5),
+}
+
+
+def tick_size(price):
+    """가격에 해당하는 호가 단위 (스칼라 또는 배열)"""
+    prices = np.asarray(price, dtype=float)
+    ticks = _TICKS[np.searchsorted(_LOWER_BOUNDS, prices, side='right') - 1]
+    return float(ticks) if ticks.ndim == 0 else ticks
+
+
+def quantize(price, method='floor'):
+    """가격을 호가 단위에 맞춥니다.
+
+    Args:
+        price: 가격 (스칼라, 리스트 또는 numpy 배열)
+        method: 'floor'(내림), 'ceil'(올림), 'round'(반올림)
+
+    Returns:
+        스칼라 입력이면 주문 가격 그대로 쓸 수 있는 값 (호가 단위가 1원 이상이면 int, 아니면 float),
+        배열 입력이면 numpy 배열
+    """
+    prices = np.asarray(price, dtype=float)
+    band = np.searchsorted(_LOWER_BOUNDS, prices, side='right') - 1
+    ticks = _TICKS[band]
+    quantized = _ROUNDERS[method](prices / ticks) * ticks
+
+    # 부동소수점 오차 정리 (구간별 자릿수로 반올림)
+    scale = 10.0 ** _DECIMALS[band]
+    quantized = np.round(quantized * scale) / scale
+    if quantized.ndim == 0:
+        return int(quantized) if ticks >= 1 else float(quantized)
+    return quantized
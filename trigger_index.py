@@ -0,0 +1,231 @@
+"""
+가격 트리거 인덱스
+
+마켓별로 손절 가격(오름차순)과 익절 가격(오름차순)을 정렬된 리스트로 유지하여,
+체결가 1건이 들어오면 실제로 가격을 넘어선 트리거만 꺼냅니다.
+
+- 손절: 가격 <= stop_price 인 트리거 → 손절 리스트의 뒤쪽 구간
+- 익절: 가격 >= take_profit_price 인 트리거 → 익절 리스트의 앞쪽 구간
+
+구간 경계는 bisect로 찾으므로 틱당 비용은 O(log n + 발생한 트리거 수)입니다.
+(전체 포지션을 매 틱마다 확인하는 방식은 O(n))
+
+사용 예:
+    index = TriggerIndex()
+    index.sync(purchased_coins, stop_loss_pct=3)
+    for fired in index.on_tick("KRW-BTC", 95_000_000):
+        ...
+"""
+import itertools
+import math
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from tick_size import quantize
+
+
+class TriggerIndex:
+    """마켓별 정렬 리스트 기반 손절/익절 트리거 인덱스
+
+    트리거 하나는 trigger_id로 식별되며 손절/익절 가격 중 하나라도 넘으면 발생 후 제거됩니다.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # market -> [(가격, 등록 순번, trigger_id), ...] (가격 오름차순)
+        self.stops = {}
+        self.take_profits = {}
+        # trigger_id -> {'market', 'stop_price', 'take_profit_price', 'payload', 'seq'}
+        self.triggers = {}
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def __contains__(self, trigger_id):
+        return trigger_id in self.triggers
+
+    def markets(self):
+        """트리거가 하나 이상 있는 마켓 목록 (WebSocket 구독 대상)"""
+        with self.lock:
+            return sorted({trigger['market'] for trigger in self.triggers.values()})
+
+    @staticmethod
+    def _remove(levels, entry):
+        i = bisect_left(levels, entry)
+        if i < len(levels) and levels[i] == entry:
+            del levels[i]
+
+    def _cancel(self, trigger_id):
+        trigger = self.triggers.pop(trigger_id, None)
+        if trigger is None:
+            return None
+        if trigger['stop_price'] is not None:
+            self._remove(self.stops[trigger['market']], (trigger['stop_price'], trigger['seq'], trigger_id))
+        if trigger['take_profit_price'] is not None:
+            self._remove(self.take_profits[trigger['market']], (trigger['take_profit_price'], trigger['seq'], trigger_id))
+        return trigger
+
+    def add(self, market, trigger_id, stop_price=None, take_profit_price=None, payload=None):
+        """트리거 등록 (같은 trigger_id가 있으면 교체)"""
+        with self.lock:
+            self._cancel(trigger_id)
+            if stop_price is None and take_profit_price is None:
+                return
+            seq = next(self.sequence)
+            self.triggers[trigger_id] = {
+                'market': market,
+                'stop_price': stop_price,
+                'take_profit_price': take_profit_price,
+                'payload': payload,
+                'seq': seq,
+            }
+            if stop_price is not None:
+                insort(self.stops.setdefault(market, []), (stop_price, seq, trigger_id))
+            if take_profit_price is not None:
+                insort(self.take_profits.setdefault(market, []), (take_profit_price, seq, trigger_id))
+
+    def cancel(self, trigger_id):
+        """트리거 취소. 취소했으면 True"""
+        with self.lock:
+            return self._cancel(trigger_id) is not None
+
+    def get(self, trigger_id):
+        with self.lock:
+            trigger = self.triggers.get(trigger_id)
+            return {key: value for key, value in trigger.items() if key != 'seq'} if trigger else None
+
+    def on_tick(self, market, price):
+        """체결가를 넘어선 트리거를 꺼내 반환합니다 (꺼낸 트리거는 인덱스에서 제거).
+
+        Returns:
+            [{'id', 'market', 'reason'('stop_loss'|'take_profit'), 'trigger_price', 'price', 'payload'}, ...]
+        """
+        fired = []
+        with self.lock:
+            stops = self.stops.get(market)
+            if stops and stops[-1][0] >= price:
+                # (price,)는 같은 가격의 어떤 항목보다도 앞에 정렬됨
+                start = bisect_left(stops, (price,))
+                for stop_price, _, trigger_id in stops[start:]:
+                    fired.append((trigger_id, 'stop_loss', stop_price))
+                del stops[start:]
+            take_profits = self.take_profits.get(market)
+            if take_profits and take_profits[0][0] <= price:
+                # (price, inf)는 같은 가격의 어떤 항목보다도 뒤에 정렬됨
+                end = bisect_right(take_profits, (price, math.inf))
+                for take_profit_price, _, trigger_id in take_profits[:end]:
+                    fired.append((trigger_id, 'take_profit', take_profit_price))
+                del take_profits[:end]
+
+            results = []
+            for trigger_id, reason, trigger_price in fired:
+                trigger = self.triggers.pop(trigger_id, None)
+                if trigger is None:
+                    # 같은 틱에서 손절/익절이 동시에 발생한 경우 (이미 처리됨)
+                    continue
+                # 반대쪽 가격 제거
+                other = self.take_profits if reason == 'stop_loss' else self.stops
+                other_price = trigger['take_profit_price'] if reason == 'stop_loss' else trigger['stop_price']
+                if other_price is not None:
+                    self._remove(other[market], (other_price, trigger['seq'], trigger_id))
+                results.append({
+                    'id': trigger_id,
+                    'market': market,
+                    'reason': reason,
+                    'trigger_price': trigger_price,
+                    'price': price,
+                    'payload': trigger['payload'],
+                })
+        return results
+
+    def sync(self, positions, stop_loss_pct=None, take_profit_pct=None, exclude=()):
+        """보유 코인(purchased_coins)에 맞춰 트리거를 추가/교체/취소합니다.
+
+        trigger_id는 코인 이름이며, 매수가가 바뀐 코인만 다시 등록합니다.
+
+        Args:
+            positions: {coin: {'buy_price', ...}}
+            stop_loss_pct: 손절 기준 하락률 (%)
+            take_profit_pct: 익절 기준 상승률 (%)
+            exclude: 등록하지 않을 코인 (이미 트리거된 코인 등)
+        """
+        wanted = {}
+        for coin, info in list(positions.items()):
+            buy_price = info.get('buy_price')
+            if buy_price and coin not in exclude:
+                wanted[coin] = (
+                    quantize(buy_price * (1 - stop_loss_pct / 100), 'floor') if stop_loss_pct else None,
+                    quantize(buy_price * (1 + take_profit_pct / 100), 'ceil') if take_profit_pct else None,
+                    buy_price,
+                )
+        with self.lock:
+            stale = [trigger_id for trigger_id in self.triggers if trigger_id not in wanted]
+            for trigger_id in stale:
+                self._cancel(trigger_id)
+            changed = {
+                coin: prices for coin, prices in wanted.items()
+                if coin not in self.triggers or self.triggers[coin]['payload'] != {'buy_price': prices[2]}
+            }
+        for coin, (stop_price, take_profit_price, buy_price) in changed.items():
+            self.add(coin, coin, stop_price, take_profit_price, payload={'buy_price': buy_price})
+
+
+# ============================================================================
+# 벤치마크
+# ============================================================================
+
+def benchmark(n_triggers=10_000, n_markets=100, n_ticks=10_000, seed=1):
+    """모든 트리거를 매 틱 확인하는 방식과 TriggerIndex의 틱 처리 시간 비교
+
+    트리거 가격은 기준가 대비 손절 -20%~-1%, 익절 +1%~+20%에 흩어져 있고
+    틱은 기준가 ±3% 안에서 발생하므로, 측정 동안 대부분의 트리거가 살아 있습니다.
+
+    Returns:
+        {'triggers', 'ticks', 'naive_us_per_tick', 'index_us_per_tick', 'fired_naive', 'fired_index'}
+    """
+    rng = random.Random(seed)
+    markets = [f"KRW-M{i:03d}" for i in range(n_markets)]
+    base = {market: rng.uniform(100, 100_000) for market in markets}
+    triggers = []
+    for i in range(n_triggers):
+        market = rng.choice(markets)
+        triggers.append((market, f"T{i}", base[market] * rng.uniform(0.80, 0.99), base[market] * rng.uniform(1.01, 1.20)))
+    ticks = [(market, base[market] * rng.uniform(0.97, 1.03)) for market in (rng.choice(markets) for _ in range(n_ticks))]
+
+    # 단순 방식: 틱마다 전체 트리거 확인
+    active = {trigger_id: (market, stop, take) for market, trigger_id, stop, take in triggers}
+    fired_naive = 0
+    started = time.perf_counter()
+    for market, price in ticks:
+        hit = [trigger_id for trigger_id, (m, stop, take) in active.items() if m == market and (price <= stop or price >= take)]
+        for trigger_id in hit:
+            del active[trigger_id]
+        fired_naive += len(hit)
+    naive = time.perf_counter() - started
+
+    index = TriggerIndex()
+    for market, trigger_id, stop, take in triggers:
+        index.add(market, trigger_id, stop, take)
+    fired_index = 0
+    started = time.perf_counter()
+    for market, price in ticks:
+        fired_index += len(index.on_tick(market, price))
+    indexed = time.perf_counter() - started
+
+    return {
+        'triggers': n_triggers,
+        'ticks': n_ticks,
+        'naive_us_per_tick': naive / n_ticks * 1e6,
+        'index_us_per_tick': indexed / n_ticks * 1e6,
+        'fired_naive': fired_naive,
+        'fired_index': fired_index,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"트리거 {result['triggers']:,}개 / 틱 {result['ticks']:,}개")
+    print(f"  전체 확인: {result['naive_us_per_tick']:.1f}µs/틱 (발생 {result['fired_naive']}건)")
+    print(f"  인덱스:    {result['index_us_per_tick']:.2f}µs/틱 (발생 {result['fired_index']}건)")
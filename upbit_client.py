@@ -0,0 +1,277 @@
+"""
+업비트 EXCHANGE API 보조 함수
+
+- UpbitClient : 프로세스 전체에서 재사용하는 인증 클라이언트
+                (HTTP 연결 재사용, JWT 서명 고속 경로, 서명 시간 측정)
+- get_shared_client : API 키 파일이 바뀔 때만 클라이언트를 다시 만듭니다.
+- buy_limit_order_ioc : IOC(immediate-or-cancel) 지정가 매수 (pyupbit 미지원)
+
+pyupbit에 없는 다건(multi-uuid) 주문 조회/취소 API를 제공합니다.
+- GET    /v1/orders/uuids : 주문 최대 100건 상태 조회
+- DELETE /v1/orders/uuids : 주문 최대 20건 일괄 취소
+
+upbit 인자로 pyupbit.Upbit 객체를 받습니다. 같은 이름의 메소드를 가진 객체
+(테스트용 로컬 주문 저장소 등)가 전달되면 그 메소드를 그대로 사용합니다.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid as uuid_lib
+from urllib.parse import urlencode
+
+import pyupbit
+import requests
+from pyupbit.errors import error_handler
+from pyupbit.request_api import _parse
+
+SERVER_URL = "https://api.upbit.com"
+REQUEST_TIMEOUT = 5
+HTTP_POOL_SIZE = 16
+
+GET_UUIDS_LIMIT = 100
+CANCEL_UUIDS_LIMIT = 20
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# {"alg":"HS256","typ":"JWT"} 헤더는 항상 같으므로 미리 인코딩해 둡니다.
+_JWT_HEADER = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+
+class UpbitClient(pyupbit.Upbit):
+    """프로세스 전체에서 재사용하는 인증 클라이언트
+
+    - requests.Session으로 HTTP(S) 연결을 재사용합니다 (요청마다 TLS 핸드셰이크 X).
+    - HMAC 키 상태를 미리 만들어 두고 JWT(HS256)를 직접 조립합니다 (PyJWT 호출 X).
+    - 요청별 서명 시간을 누적하여 signing_stats()로 확인할 수 있습니다.
+
+    자주 쓰는 주문/잔고 메소드만 Session 경로로 덮어쓰고,
+    나머지는 pyupbit.Upbit 구현을 그대로 사용합니다 (서명은 동일하게 고속 경로).
+    """
+    def __init__(self, access, secret):
+        super().__init__(access, secret)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self._hmac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self._stats_lock = threading.Lock()
+        self._sign_count = 0
+        self._sign_total_ns = 0
+        self._sign_max_ns = 0
+
+    def _request_headers(self, query=None):
+        started = time.perf_counter_ns()
+        payload = {"access_key": self.access, "nonce": str(uuid_lib.uuid4())}
+        if query is not None:
+            query_string = urlencode(query, doseq=True).replace("%5B%5D=", "[]=")
+            payload["query_hash"] = hashlib.sha512(query_string.encode()).hexdigest()
+            payload["query_hash_alg"] = "SHA512"
+        signing_input = _JWT_HEADER + b"." + _b64url(json.dumps(payload, separators=(",", ":")).encode())
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        token = (signing_input + b"." + _b64url(mac.digest())).decode()
+        elapsed = time.perf_counter_ns() - started
+        with self._stats_lock:
+            self._sign_count += 1
+            self._sign_total_ns += elapsed
+            if elapsed > self._sign_max_ns:
+                self._sign_max_ns = elapsed
+        return {"Authorization": f"Bearer {token}"}
+
+    def signing_stats(self):
+        """서명 통계 {'count', 'avg_us', 'max_us'}"""
+        with self._stats_lock:
+            count = self._sign_count
+            return {
+                'count': count,
+                'avg_us': self._sign_total_ns / count / 1000 if count else 0.0,
+                'max_us': self._sign_max_ns / 1000,
+            }
+
+    # ------------------------------------------------------------------
+    # Session 경로 (pyupbit과 같은 반환 형식: contain_req=False면 결과만)
+    # ------------------------------------------------------------------
+    def _send(self, method, path, data=None):
+        headers = self._request_headers(data)
+        if method == "GET":
+            send = error_handler(self.session.get)
+            resp = send(SERVER_URL + path, headers=headers, params=data, timeout=REQUEST_TIMEOUT)
+        else:
+            send = error_handler(self.session.post if method == "POST" else self.session.delete)
+            resp = send(SERVER_URL + path, headers=headers, json=data, timeout=REQUEST_TIMEOUT)
+        return resp.json(), _parse(resp.headers.get("Remaining-Req", ""))
+
+    def _call(self, method, path, data=None, contain_req=False):
+        try:
+            result = self._send(method, path, data)
+            return result if contain_req else result[0]
+        except Exception as x:
+            print(x.__class__.__name__)
+            return None
+
+    def get_balances(self, contain_req=False):
+        return self._call("GET", "/v1/accounts", None, contain_req)
+
+    def get_order(self, ticker_or_uuid, state='wait', page=1, limit=100, contain_req=False):
+        if ticker_or_uuid.count("-") == 4:
+            return self._call("GET", "/v1/order", {'uuid': ticker_or_uuid}, contain_req)
+        data = {'market': ticker_or_uuid, 'state': state, 'page': page, 'limit': limit, 'order_by': 'desc'}
+        return self._call("GET", "/v1/orders", data, contain_req)
+
+    def cancel_order(self, uuid, contain_req=False):
+        return self._call("DELETE", "/v1/order", {"uuid": uuid}, contain_req)
+
+    def buy_limit_order(self, ticker, price, volume, contain_req=False):
+        data = {"market": ticker, "side": "bid", "volume": str(volume), "price": str(price), "ord_type": "limit"}
+        return self._call("POST", "/v1/orders", data, contain_req)
+
+    def buy_market_order(self, ticker, price, contain_req=False):
+        data = {"market": ticker, "side": "bid", "price": str(price), "ord_type": "price"}
+        return self._call("POST", "/v1/orders", data, contain_req)
+
+    def sell_market_order(self, ticker, volume, contain_req=False):
+        data = {"market": ticker, "side": "ask", "volume": str(volume), "ord_type": "market"}
+        return self._call("POST", "/v1/orders", data, contain_req)
+
+    def sell_limit_order(self, ticker, price, volume, contain_req=False):
+        data = {"market": ticker, "side": "ask", "volume": str(volume), "price": str(price), "ord_type": "limit"}
+        return self._call("POST", "/v1/orders", data, contain_req)
+
+
+_shared_lock = threading.Lock()
+_shared = {'signature': None, 'client': None}
+
+
+def _key_file_signature(key_file):
+    """환경 변수 키와 키 파일의 (mtime, 크기)로 자격 증명 변경 여부를 판단합니다."""
+    try:
+        stat = os.stat(key_file) if key_file else None
+        file_sig = (key_file, stat.st_mtime_ns, stat.st_size) if stat else None
+    except OSError:
+        file_sig = None
+    return (os.getenv("UPBIT_API_KEY"), os.getenv("UPBIT_SECRET_KEY"), file_sig)
+
+
+def get_shared_client(load_keys, key_file=None):
+    """프로세스 공용 UpbitClient를 반환합니다.
+
+    자격 증명은 처음 한 번만 읽고, 이후에는 키 파일(또는 환경 변수)이
+    바뀐 경우에만 load_keys()를 다시 호출합니다. 키가 같으면 기존 클라이언트(연결 포함)를 유지합니다.
+
+    Args:
+        load_keys: (api_key, secret_key)를 반환하는 함수
+        key_file: 변경 감지에 사용할 키 파일 경로
+
+    Returns:
+        UpbitClient (키를 읽을 수 없으면 None)
+    """
+    signature = _key_file_signature(key_file)
+    with _shared_lock:
+        if _shared['client'] is not None and _shared['signature'] == signature:
+            return _shared['client']
+        api_key, secret_key = load_keys()
+        if not api_key or not secret_key:
+            _shared['signature'] = None
+            _shared['client'] = None
+            return None
+        client = _shared['client']
+        if client is None or client.access != api_key or client.secret != secret_key:
+            client = UpbitClient(api_key, secret_key)
+        _shared['signature'] = signature
+        _shared['client'] = client
+        return client
+
+
+def _uuids_query(uuids):
+    """uuids[]=a&uuids[]=b 형식의 쿼리 (query_hash 계산과 요청 URL에 같은 문자열 사용)"""
+    return {'uuids[]': list(uuids)}, "&".join(f"uuids[]={u}" for u in uuids)
+
+
+def get_orders_by_uuids(upbit, uuids):
+    """여러 주문의 상태를 한 번에 조회합니다.
+
+    Returns:
+        {uuid: order dict} (조회되지 않은 uuid는 포함되지 않음)
+    """
+    uuids = [u for u in dict.fromkeys(uuids) if u]
+    if not uuids:
+        return {}
+    if hasattr(upbit, 'get_orders_by_uuids'):
+        return upbit.get_orders_by_uuids(uuids)
+
+    orders = {}
+    for chunk in _chunks(uuids, GET_UUIDS_LIMIT):
+        query, query_string = _uuids_query(chunk)
+        headers = upbit._request_headers(query)
+        session = getattr(upbit, 'session', requests)
+        response = session.get(f"{SERVER_URL}/v1/orders/uuids?{query_string}", headers=headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        for order in response.json():
+            if isinstance(order, dict) and order.get('uuid'):
+                orders[order['uuid']] = order
+    return orders
+
+
+def cancel_orders_by_uuids(upbit, uuids):
+    """여러 주문을 한 번에 취소합니다.
+
+    Returns:
+        {'cancelled': [uuid, ...], 'failed': [uuid, ...]}
+    """
+    uuids = [u for u in dict.fromkeys(uuids) if u]
+    result = {'cancelled': [], 'failed': []}
+    if not uuids:
+        return result
+    if hasattr(upbit, 'cancel_orders_by_uuids'):
+        return upbit.cancel_orders_by_uuids(uuids)
+
+    for chunk in _chunks(uuids, CANCEL_UUIDS_LIMIT):
+        query, query_string = _uuids_query(chunk)
+        headers = upbit._request_headers(query)
+        session = getattr(upbit, 'session', requests)
+        try:
+            response = session.delete(f"{SERVER_URL}/v1/orders/uuids?{query_string}", headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            result['failed'].extend(chunk)
+            continue
+        for order in (data.get('success') or {}).get('orders', []):
+            result['cancelled'].append(order.get('uuid'))
+        for order in (data.get('failed') or {}).get('orders', []):
+            result['failed'].append(order.get('uuid'))
+    return result
+
+
+def buy_limit_order_ioc(upbit, market, price, volume):
+    """IOC 지정가 매수: price 이하 매도호가와 즉시 체결하고 남은 수량은 바로 취소됩니다.
+
+    Returns:
+        주문 응답 dict (오류 시 'error' 키 포함)
+    """
+    if hasattr(upbit, 'buy_limit_order_ioc'):
+        return upbit.buy_limit_order_ioc(market, price, volume)
+
+    data = {
+        "market": market,
+        "side": "bid",
+        "volume": f"{volume:.8f}".rstrip("0").rstrip("."),
+        "price": f"{price:f}".rstrip("0").rstrip("."),
+        "ord_type": "limit",
+        "time_in_force": "ioc",
+    }
+    headers = upbit._request_headers(data)
+    session = getattr(upbit, 'session', requests)
+    response = session.post(f"{SERVER_URL}/v1/orders", headers=headers, json=data, timeout=REQUEST_TIMEOUT)
+    return response.json()
@@ -160,123 +160,25 @@ def filter_by_day_candle(*args, **kwargs):
 def load_api_keys_from_json(*args, **kwargs):
     return _get_auto_trading_module().load_api_keys_from_json(*args, **kwargs)
 
+def get_upbit_client(*args, **kwargs):
+    return _get_auto_trading_module().get_upbit_client(*args, **kwargs)
+
 def buy_coins_from_list(*args, **kwargs):
     return _get_auto_trading_module().buy_coins_from_list(*args, **kwargs)
 
-def cancel_all_orders_and_sell_all(upbit, coin, logger=None, return_sell_price=False):
-    """특정 코인의 모든 미체결 주문 취소 후 전량 매도 (utils 버전)"""
-    module = _get_auto_trading_module()
-    # TradingGUI 클래스의 메서드를 사용하기 위해 인스턴스 생성이 필요하지만,
-    # 여기서는 직접 함수로 구현
+def cancel_all_orders_and_sell_all(upbit, coin, logger=None, return_sell_price=False, order_manager=None):
+    """특정 코인의 모든 미체결 주문 취소 후 전량 매도 (order_execution.flatten 사용)
+
+    order_manager가 있으면 미체결 주문을 로컬 주문 테이블에서 조회하고 취소/매도 결과를 기록합니다.
+    """
+    from order_execution import flatten
+    coin_symbol = coin.replace("KRW-", "")
     try:
-        coin_symbol = coin.replace("KRW-", "")
-        
-        # 모든 미체결 주문 조회 및 취소
-        orders = upbit.get_order(coin)
-        if orders:
-            if isinstance(orders, list):
-                for order in orders:
-                    uuid = order.get('uuid', '')
-                    if uuid:
-                        try:
-                            upbit.cancel_order(uuid)
-                            if logger:
-                                logger.log(f"  {coin_symbol}: 미체결 주문 취소 (UUID: {uuid[:8]}...)", "INFO")
-                        except Exception as e:
-                            if logger:
-                                logger.log(f"  {coin_symbol}: 주문 취소 실패: {e}", "ERROR")
-            else:
-                uuid = orders.get('uuid', '')
-                if uuid:
-                    try:
-                        upbit.cancel_order(uuid)
-                        if logger:
-                            logger.log(f"  {coin_symbol}: 미체결 주문 취소 (UUID: {uuid[:8]}...)", "INFO")
-                    except Exception as e:
-                        if logger:
-                            logger.log(f"  {coin_symbol}: 주문 취소 실패: {e}", "ERROR")
-        
-        import time
-        time.sleep(1)
-        
-        # 전량 매도
-        coin_balance = upbit.get_balance(coin)
-        if coin_balance and float(coin_balance) > 0:
-            try:
-                import pyupbit
-                # 매도 전 현재가 확인 (매도 가격 추정용)
-                current_price = pyupbit.get_current_price(coin)
-                
-                sell_result = upbit.sell_market_order(coin, float(coin_balance))
-                if sell_result:
-                    if logger:
-                        logger.log(f"  {coin_symbol}: 전량 매도 주문 성공 (수량: {coin_balance})", "SUCCESS")
-                    
-                    # 매도 가격 및 매도 금액 확인 (실제 체결 내역에서 가져오기)
-                    sell_price = current_price if current_price else None
-                    sell_amount = 0
-                    sell_quantity = float(coin_balance)
-                    
-                    if sell_result and isinstance(sell_result, dict):
-                        uuid = sell_result.get('uuid', '')
-                        if uuid:
-                            time.sleep(2)  # 체결 대기
-                            try:
-                                done_orders = upbit.get_order(uuid, state="done")
-                                if done_orders:
-                                    order = done_orders[0] if isinstance(done_orders, list) else done_orders
-                                    executed_volume = float(order.get('executed_volume', 0))
-                                    
-                                    # 체결 내역(trades)에서 실제 평균 매도가 계산
-                                    if executed_volume > 0:
-                                        trades = order.get('trades', [])
-                                        if trades and len(trades) > 0:
-                                            total_revenue = 0
-                                            total_volume = 0
-                                            for trade in trades:
-                                                price = float(trade.get('price', 0))
-                                                volume = float(trade.get('volume', 0))
-                                                total_revenue += price * volume
-                                                total_volume += volume
-                                            
-                                            if total_volume > 0:
-                                                sell_price = total_revenue / total_volume
-                                                sell_amount = total_revenue
-                                                sell_quantity = total_volume
-                                            else:
-                                                # funds 필드 사용
-                                                funds = float(order.get('funds', 0))
-                                                if funds > 0:
-                                                    sell_price = funds / executed_volume
-                                                    sell_amount = funds
-                                                    sell_quantity = executed_volume
-                                    else:
-                                        # funds 필드 사용
-                                        funds = float(order.get('funds', 0))
-                                        if funds > 0 and executed_volume > 0:
-                                            sell_price = funds / executed_volume
-                                            sell_amount = funds
-                                            sell_quantity = executed_volume
-                            except Exception as e:
-                                if logger:
-                                    logger.log(f"  {coin_symbol}: 매도 체결 내역 조회 실패: {e}", "WARNING")
-                    
-                    if return_sell_price:
-                        return (True, sell_price, sell_amount)
-                    return True
-                else:
-                    if logger:
-                        logger.log(f"  {coin_symbol}: 전량 매도 주문 실패", "ERROR")
-                    return (False, None, None) if return_sell_price else False
-            except Exception as e:
-                if logger:
-                    logger.log(f"  {coin_symbol}: 전량 매도 중 오류: {e}", "ERROR")
-                return (False, None, None) if return_sell_price else False
-        else:
-            if logger:
-                logger.log(f"  {coin_symbol}: 매도할 수량이 없습니다.", "INFO")
-            return (False, None, None) if return_sell_price else False
+        report = flatten(upbit, coin, order_manager=order_manager, logger=logger)
     except Exception as e:
         if logger:
             logger.log(f"  {coin_symbol}: cancel_all_orders_and_sell_all 오류: {e}", "ERROR")
         return (False, None, None) if return_sell_price else False
+    if return_sell_price:
+        return (True, report['avg_price'], report['funds']) if report['success'] else (False, None, None)
+    return report['success']